@@ -0,0 +1,328 @@
+"""Argument-level policy rules, compiled for the authorize gate.
+
+``policy.json`` may carry ``argument_rules``: constraints on the arguments
+of a tool, optionally limited to some roles.  The key of each constraint
+names the argument it checks:
+
+- ``path`` — absolute path prefixes to ``allow`` / ``deny``.  Paths are
+  normalized (``..``, ``.``, repeated slashes) and matched by whole
+  components in a trie, so ``/data`` covers ``/data/x`` but not
+  ``/database``.  The most specific matching prefix decides.  Symlinks are
+  not resolved.
+- ``url`` — hosts to ``allow`` / ``deny``, as domain names (matching the
+  domain and its subdomains) or CIDR ranges, plus the permitted
+  ``schemes``.  Domains are matched label by label from the most specific
+  suffix down, and addresses by longest prefix.  Numeric host spellings
+  such as ``2130706433`` or ``0x7f.1`` are read as the IPv4 address they
+  denote, and IPv4-mapped IPv6 addresses as their IPv4 address.
+  Non-ASCII names, in entries and in URLs, are compared in their IDNA
+  form.  A URL whose authority holds a backslash, whitespace or a control
+  character is rejected, since HTTP clients disagree with ``urlsplit``
+  about where its host ends.  Names are not resolved through DNS.
+- ``command`` — programs (the first word) to ``allow`` when the command
+  contains no shell metacharacters, and regular expression ``patterns``,
+  one of which must match the whole command otherwise.
+
+Within a constraint ``deny`` wins over ``allow`` on an equally specific
+match; with no matching entry the value is allowed only if ``allow`` is
+empty.  Every rule that applies to a (role, tool) pair must pass.  Each
+check costs a handful of dict lookups whatever the number of entries.
+"""
+from __future__ import annotations
+
+import ipaddress
+import posixpath
+import re
+import socket
+from collections.abc import Iterable
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+ARGUMENT_DENIED = "ARGUMENT_DENIED"
+DETAIL_LIMIT = 120              # characters of an offending value quoted in errors
+
+_END = None                     # trie key holding the verdict of the prefix ending at a node
+_SHELL_META = re.compile(r"[;&|`$<>(){}\\\n\r]")
+_NUMERIC_V4 = re.compile(r"(?:0x[0-9a-f]*|\d+)(?:\.(?:0x[0-9a-f]*|\d+)){0,3}")
+_CONTROL = re.compile(r"[\x00-\x1f\x7f]")
+_AMBIGUOUS_AUTHORITY = re.compile(r"[\\\s]")    # WHATWG parsers end the authority at a backslash
+
+
+class ArgumentViolation(Exception):
+    def __init__(self, tool: str, arg: str, reason: str) -> None:
+        self.tool = tool
+        self.arg = arg
+        self.reason = reason
+        super().__init__(f"argument '{arg}' of tool '{tool}' rejected: {reason}")
+
+
+def _quote(value: str) -> str:
+    return repr(value if len(value) <= DETAIL_LIMIT else value[:DETAIL_LIMIT] + "…")
+
+
+# -- rule schema ----------------------------------------------------------------
+
+
+class PathRule(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    allow: list[str] = []
+    deny: list[str] = []
+
+    @field_validator("allow", "deny")
+    @classmethod
+    def _absolute(cls, prefixes: list[str]) -> list[str]:
+        for prefix in prefixes:
+            if not prefix.startswith("/"):
+                raise ValueError(f"path prefix {prefix!r} is not absolute")
+        return prefixes
+
+
+class UrlRule(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    allow: list[str] = []
+    deny: list[str] = []
+    schemes: list[str] = ["http", "https"]
+
+    @field_validator("allow", "deny")
+    @classmethod
+    def _hosts(cls, hosts: list[str]) -> list[str]:
+        for host in hosts:
+            if "/" in host:
+                ipaddress.ip_network(host, strict=False)   # ValueError for a malformed CIDR
+            elif not host.strip("*."):
+                raise ValueError(f"empty host entry {host!r}")
+            else:
+                try:
+                    _idna(host.strip("*."))
+                except UnicodeError:
+                    raise ValueError(f"host entry {host!r} is not a valid domain name") from None
+        return hosts
+
+
+class CommandRule(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    allow: list[str] = []
+    patterns: list[str] = []
+
+    @field_validator("patterns")
+    @classmethod
+    def _compiles(cls, patterns: list[str]) -> list[str]:
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+            except re.error as exc:
+                raise ValueError(f"invalid command pattern {pattern!r}: {exc}") from None
+        return patterns
+
+
+class ArgumentRule(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    tool: str
+    roles: list[str] | None = None
+    path: PathRule | None = None
+    url: UrlRule | None = None
+    command: CommandRule | None = None
+
+
+# -- compiled matchers --------------------------------------------------------------
+
+
+def _normalize(path: str) -> str:
+    if "/." in path or "//" in path:        # only then can normalizing change anything
+        return posixpath.normpath(path)
+    return path
+
+
+class PathMatcher:
+    """Prefix trie over path components."""
+
+    def __init__(self, rule: PathRule) -> None:
+        self._root: dict = {}
+        self._default = not rule.allow
+        for prefixes, verdict in ((rule.allow, True), (rule.deny, False)):
+            for prefix in prefixes:
+                node = self._root
+                for part in _normalize(prefix).split("/"):
+                    if part:
+                        node = node.setdefault(part, {})
+                if node.get(_END) is not False:
+                    node[_END] = verdict
+
+    def __call__(self, value) -> str | None:
+        if not isinstance(value, str) or not value.startswith("/") or "\0" in value:
+            return "path must be an absolute path"
+        verdict, node = self._root.get(_END, self._default), self._root
+        for part in _normalize(value).split("/"):
+            if not part:
+                continue
+            node = node.get(part)
+            if node is None:
+                break
+            verdict = node.get(_END, verdict)
+        return None if verdict else f"path {_quote(value)} is not permitted"
+
+
+_ADDRESS_BITS = {4: 32, 6: 128}
+
+
+def _host_address(host: str) -> tuple[int, int] | None:
+    """``(IP version, address)`` for an address host, None for a domain name.
+
+    The two are told apart by shape rather than by trying to parse and
+    catching the error, which costs more than the whole lookup.
+    """
+    if _NUMERIC_V4.fullmatch(host):
+        try:
+            return 4, int.from_bytes(socket.inet_aton(host), "big")
+        except OSError:
+            return None
+    if ":" not in host:
+        return None
+    try:
+        address = ipaddress.IPv6Address(host)
+    except ValueError:
+        return None
+    if address.ipv4_mapped is not None:
+        return 4, int(address.ipv4_mapped)
+    return 6, int(address)
+
+
+def _idna(host: str) -> str:
+    """``host`` lowercased, in the ASCII form HTTP clients send; ``UnicodeError`` if it has none."""
+    host = host.lower()
+    if host.isascii():
+        return host
+    return host.encode("idna").decode("ascii").lower()
+
+
+def _hostname(netloc: str) -> str | None:
+    """The host part of a ``urlsplit`` netloc, as ``SplitResult.hostname`` finds it, minus the lowercasing."""
+    hostinfo = netloc.rpartition("@")[2]
+    if hostinfo.startswith("["):
+        end = hostinfo.find("]")
+        return hostinfo[1:end] if end > 0 else None
+    return hostinfo.partition(":")[0]
+
+
+class UrlMatcher:
+    """Domain suffix table plus longest-prefix CIDR tables, per IP version."""
+
+    def __init__(self, rule: UrlRule) -> None:
+        self._schemes = frozenset(scheme.lower() for scheme in rule.schemes)
+        self._default = not rule.allow
+        self._domains: dict[str, bool] = {}
+        # version → {prefix length → {network bits → verdict}}, probed longest first
+        self._networks: dict[int, dict[int, dict[int, bool]]] = {4: {}, 6: {}}
+        for hosts, verdict in ((rule.allow, True), (rule.deny, False)):
+            for host in hosts:
+                network = _network(host)
+                if network is None:
+                    table, key = self._domains, _idna(host.lstrip("*").lstrip(".").rstrip("."))
+                else:
+                    table = self._networks[network.version].setdefault(network.prefixlen, {})
+                    key = int(network.network_address) >> (network.max_prefixlen - network.prefixlen)
+                if table.get(key) is not False:
+                    table[key] = verdict
+        self._lengths = {version: sorted(tables, reverse=True) for version, tables in self._networks.items()}
+
+    def _host_verdict(self, host: str) -> bool:
+        address = _host_address(host)
+        if address is not None:
+            version, bits = address
+            tables, width = self._networks[version], _ADDRESS_BITS[version]
+            for length in self._lengths[version]:
+                verdict = tables[length].get(bits >> (width - length))
+                if verdict is not None:
+                    return verdict
+            return self._default
+        suffix = host
+        while True:
+            verdict = self._domains.get(suffix)
+            if verdict is not None:
+                return verdict
+            dot = suffix.find(".")
+            if dot < 0:
+                return self._default
+            suffix = suffix[dot + 1:]
+
+    def __call__(self, value) -> str | None:
+        if not isinstance(value, str):
+            return "url must be a string"
+        value = value.strip()
+        if _CONTROL.search(value):
+            return f"url {_quote(value)} is malformed"
+        try:
+            parts = urlsplit(value)
+        except ValueError:
+            return f"url {_quote(value)} is malformed"
+        if parts.scheme.lower() not in self._schemes:
+            return f"scheme {parts.scheme!r} is not permitted"
+        if _AMBIGUOUS_AUTHORITY.search(parts.netloc):
+            return f"url {_quote(value)} is malformed"
+        host = _hostname(parts.netloc)
+        if not host:
+            return f"url {_quote(value)} has no host"
+        try:
+            # The same mapping HTTP clients apply, so fullwidth or other look-alike forms can't dodge a deny entry.
+            host = _idna(host).rstrip(".")
+        except UnicodeError:
+            return f"host {_quote(host)} is not a valid domain name"
+        return None if self._host_verdict(host) else f"host {_quote(host)} is not permitted"
+
+
+def _network(host: str) -> ipaddress.IPv4Network | ipaddress.IPv6Network | None:
+    try:
+        return ipaddress.ip_network(host, strict=False)
+    except ValueError:
+        return None
+
+
+class CommandMatcher:
+    """Program-name set plus one combined, precompiled pattern alternation."""
+
+    def __init__(self, rule: CommandRule) -> None:
+        self._programs = frozenset(rule.allow)
+        self._patterns = re.compile("|".join(f"(?:{p})" for p in rule.patterns)) if rule.patterns else None
+
+    def __call__(self, value) -> str | None:
+        if not isinstance(value, str) or not value.strip():
+            return "command must be a non-empty string"
+        if self._patterns is not None and self._patterns.fullmatch(value):
+            return None
+        if _SHELL_META.search(value):
+            return f"command {_quote(value)} contains shell metacharacters"
+        program = value.split(None, 1)[0]
+        return None if program in self._programs else f"program {_quote(program)} is not permitted"
+
+
+_MATCHERS = {"path": PathMatcher, "url": UrlMatcher, "command": CommandMatcher}
+
+
+class ArgumentPolicy:
+    """``argument_rules`` compiled into per-tool lists of ``(roles, [(arg, matcher)])``."""
+
+    def __init__(self, rules: Iterable[ArgumentRule] = ()) -> None:
+        self._by_tool: dict[str, list[tuple[frozenset[str] | None, list]]] = {}
+        for rule in rules:
+            checks = [(arg, _MATCHERS[arg](getattr(rule, arg))) for arg in _MATCHERS if getattr(rule, arg) is not None]
+            roles = frozenset(rule.roles) if rule.roles is not None else None
+            self._by_tool.setdefault(rule.tool, []).append((roles, checks))
+
+    def __bool__(self) -> bool:
+        return bool(self._by_tool)
+
+    def check(self, role: str, tool: str, args: dict) -> None:
+        """Raise ``ArgumentViolation`` for the first constraint ``args`` fails."""
+        rules = self._by_tool.get(tool)
+        if rules is None:
+            return
+        for roles, checks in rules:
+            if roles is not None and role not in roles:
+                continue
+            for arg, matcher in checks:
+                if arg not in args:
+                    raise ArgumentViolation(tool, arg, "argument is required by policy")
+                reason = matcher(args[arg])
+                if reason is not None:
+                    raise ArgumentViolation(tool, arg, reason)
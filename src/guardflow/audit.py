@@ -0,0 +1,310 @@
+"""Append-only audit log of pipeline decisions.
+
+Every decision becomes one compact JSON line::
+
+    {"ts":1760000000.123,"actor":"u1","role":"admin","tool":"echo",
+     "outcome":"ok","policy":"3f0c9a1b2d4e","ms":{"validate":0.012,"authorize":0.004}}
+
+``write()`` only puts a dict on a queue.  ``AuditSink``'s writer thread
+drains the queue in batches, writes each batch with a single ``write()``
+(group commit), ``fsync``\\ s at most every ``fsync_interval`` seconds, and
+rotates the file by size like ``RotatingFileHandler`` (``audit.jsonl.1`` is
+the newest backup).  ``read_audit()`` streams records back, oldest first.
+
+The queue holds at most ``max_queue`` records.  When the disk falls that
+far behind, new records are dropped and counted rather than blocking the
+request path; ``guardflow_audit_dropped_total`` reports how many.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections.abc import Iterator, Mapping
+from pathlib import Path
+
+from pydantic import BaseModel, ValidationError
+
+from guardflow import metrics
+from guardflow.arguments import ARGUMENT_DENIED, ArgumentViolation
+from guardflow.decisions import ALLOW, RBAC_DENIED, UNAUTHORIZED_TOOL
+from guardflow.policy import PolicyViolation
+from guardflow.ratelimit import RATE_LIMITED, RateLimited
+from guardflow.rbac import RbacDenial
+from guardflow.sandbox import SandboxBusy, SandboxError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_BACKUPS = 5
+DEFAULT_FSYNC_INTERVAL = 1.0    # seconds; 0 = every batch, None = leave it to the OS
+DEFAULT_BATCH_SIZE = 1024       # records per group commit
+DEFAULT_MAX_QUEUE = 65_536      # records waiting for the writer before new ones are dropped
+
+_STOP = object()
+
+
+def outcome_for(exc: Exception | None) -> str:
+    """The outcome code recorded for a pipeline exception (``ok`` for none)."""
+    if exc is None:
+        return ALLOW
+    if isinstance(exc, ValidationError):
+        return "SCHEMA_REJECTED"
+    if isinstance(exc, PolicyViolation):
+        return UNAUTHORIZED_TOOL
+    if isinstance(exc, RbacDenial):
+        return RBAC_DENIED
+    if isinstance(exc, ArgumentViolation):
+        return ARGUMENT_DENIED
+    if isinstance(exc, RateLimited):
+        return RATE_LIMITED
+    if isinstance(exc, SandboxBusy):
+        return "SANDBOX_BUSY"
+    if isinstance(exc, SandboxError):
+        return "SANDBOX_ERROR"
+    return "ERROR"
+
+
+class AuditSink:
+    """Background group-commit writer for the audit log."""
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backups: int = DEFAULT_BACKUPS,
+        fsync_interval: float | None = DEFAULT_FSYNC_INTERVAL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+    ) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self.written = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.rotations = 0
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._dropped_lock = threading.Lock()
+        self._file = None
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._thread = threading.Thread(target=self._loop, name="guardflow-audit", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        """Write everything queued so far, fsync, and stop the writer."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, entry: dict) -> None:
+        """Queue ``entry`` for the writer; if the queue is full, drop and count it instead of waiting."""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def stats(self) -> dict:
+        return {
+            "path": str(self.path),
+            "written": self.written,
+            "batches": self.batches,
+            "fsyncs": self.fsyncs,
+            "rotations": self.rotations,
+            "queued": self._queue.qsize(),
+            "dropped": self.dropped,
+        }
+
+    # -- writer thread -------------------------------------------------------
+
+    def _loop(self) -> None:
+        stopping = False
+        while not stopping:
+            timeout = self.fsync_interval if self._dirty and self.fsync_interval else None
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._sync()
+                continue
+            batch = []
+            while True:
+                if entry is _STOP:
+                    stopping = True
+                else:
+                    batch.append(entry)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    entry = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                self._commit(batch)
+            except Exception:
+                logger.exception("audit write failed; %d records lost", len(batch))
+        self._sync()
+        self._file.close()
+        self._file = None
+
+    def _commit(self, batch: list[dict]) -> None:
+        if not batch:
+            return
+        data = "".join(json.dumps(entry, separators=(",", ":"), default=str) + "\n" for entry in batch)
+        self._file.write(data.encode())
+        self._file.flush()
+        self._dirty = True
+        self.written += len(batch)
+        self.batches += 1
+        if self.fsync_interval is not None and time.monotonic() - self._last_fsync >= self.fsync_interval:
+            self._sync()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _sync(self) -> None:
+        if self._dirty and self.fsync_interval is not None:
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+        self._dirty = False
+        self._last_fsync = time.monotonic()
+
+    def _rotate(self) -> None:
+        self._sync()
+        self._file.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                src = _backup(self.path, i)
+                if src.exists():
+                    src.replace(_backup(self.path, i + 1))
+            self.path.replace(_backup(self.path, 1))
+            self._file = open(self.path, "ab")
+        else:
+            self._file = open(self.path, "wb")
+        self.rotations += 1
+
+
+def _backup(path: Path, index: int) -> Path:
+    return path.with_name(f"{path.name}.{index}")
+
+
+def audit_files(path: Path) -> list[Path]:
+    """The log file and its rotated backups, oldest first."""
+    path = Path(path)
+    backups = []
+    index = 1
+    while _backup(path, index).exists():
+        backups.append(_backup(path, index))
+        index += 1
+    return [*reversed(backups), *([path] if path.exists() else [])]
+
+
+def read_audit(
+    path: Path,
+    actor: str | None = None,
+    role: str | None = None,
+    tool: str | None = None,
+    outcome: str | None = None,
+    since: float | None = None,
+    until: float | None = None,
+) -> Iterator[dict]:
+    """Stream audit records from ``path`` and its backups, oldest first, filtered."""
+    wanted = {k: v for k, v in (("actor", actor), ("role", role), ("tool", tool), ("outcome", outcome)) if v is not None}
+    for file in audit_files(path):
+        with open(file, "rb") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn final line after a crash
+                if since is not None and entry.get("ts", 0) < since:
+                    continue
+                if until is not None and entry.get("ts", 0) >= until:
+                    continue
+                if all(entry.get(k) == v for k, v in wanted.items()):
+                    yield entry
+
+
+# -- process-wide sink -------------------------------------------------------
+
+_sink: AuditSink | None = None
+
+
+def set_sink(sink: AuditSink | None) -> None:
+    global _sink
+    _sink = sink
+
+
+def get_sink() -> AuditSink | None:
+    return _sink
+
+
+metrics.REGISTRY.gauge(
+    "guardflow_audit_queue_depth", "Audit records waiting for the writer.",
+    lambda: _sink._queue.qsize() if _sink is not None else None,
+)
+metrics.REGISTRY.gauge(
+    "guardflow_audit_dropped_total", "Audit records dropped because the writer's queue was full.",
+    lambda: _sink.dropped if _sink is not None else None, kind="counter",
+)
+
+
+def request_fields(payload) -> tuple[str | None, str | None, str | None]:
+    """``(actor id, role, tool)`` of a validated request or a raw, possibly invalid, dict or JSON body."""
+    if isinstance(payload, BaseModel):
+        return payload.actor.id, payload.actor.role, payload.tool_call.tool
+    if isinstance(payload, (str, bytes, bytearray)):
+        # Only rejected requests reach here raw, so the extra parse is off the success path.
+        try:
+            payload = json.loads(payload)
+        except ValueError:
+            return None, None, None
+    actor = payload.get("actor") if isinstance(payload, Mapping) else None
+    tool_call = payload.get("tool_call") if isinstance(payload, Mapping) else None
+    return _field(actor, "id"), _field(actor, "role"), _field(tool_call, "tool")
+
+
+def write(
+    actor: str | None,
+    role: str | None,
+    tool: str | None,
+    outcome: str,
+    version: str,
+    timings: Mapping[str, float],
+) -> None:
+    """Queue one already-summarised decision record if a sink is configured; never blocks."""
+    sink = _sink
+    if sink is None:
+        return
+    sink.submit({
+        "ts": time.time(),
+        "actor": actor,
+        "role": role,
+        "tool": tool,
+        "outcome": outcome,
+        "policy": version,
+        "ms": {stage: round(seconds * 1000, 3) for stage, seconds in timings.items()},
+    })
+
+
+def _field(container, key: str) -> str | None:
+    """A string field of a rejected request, bounded so junk cannot bloat the log."""
+    value = container.get(key) if isinstance(container, Mapping) else None
+    if value is None or isinstance(value, str):
+        return value if value is None or len(value) <= 256 else value[:256]
+    return f"<{type(value).__name__}>"
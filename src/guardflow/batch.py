@@ -0,0 +1,127 @@
+"""Streaming JSONL batch mode for ``guardflow run --batch``."""
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from guardflow.arguments import ArgumentViolation
+from guardflow.models import ArgumentError, PolicyError, RateLimitError, RbacError, SandboxBusyError, SandboxError, SchemaError
+from guardflow.pipeline import run_pipeline
+from guardflow.policy import PolicyViolation
+from guardflow.ratelimit import RateLimited
+from guardflow.rbac import RbacDenial
+from guardflow.sandbox import SandboxBusy
+from guardflow.sandbox import SandboxError as SandboxExc
+from guardflow.snapshot import PolicySnapshot
+
+DEFAULT_CHUNK_SIZE = 256      # lines per worker task
+DEFAULT_WINDOW = 4            # in-flight chunks per worker
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def error_for(exc: Exception) -> BaseModel | None:
+    """Map a pipeline exception to its structured error model, or None if unknown."""
+    if isinstance(exc, ValidationError):
+        return SchemaError(detail=str(exc))
+    if isinstance(exc, PolicyViolation):
+        return PolicyError(tool=exc.tool, detail=f"Tool '{exc.tool}' is not in the allowlist")
+    if isinstance(exc, RbacDenial):
+        return RbacError(
+            role=exc.role,
+            tool=exc.tool,
+            detail=f"Role '{exc.role}' is not permitted to use tool '{exc.tool}'",
+        )
+    if isinstance(exc, ArgumentViolation):
+        return ArgumentError(tool=exc.tool, arg=exc.arg, detail=exc.reason)
+    if isinstance(exc, RateLimited):
+        return RateLimitError(actor=exc.actor, tool=exc.tool, detail=str(exc), retry_after=exc.retry_after)
+    if isinstance(exc, SandboxExc):
+        return SandboxError(detail=exc.message)
+    if isinstance(exc, SandboxBusy):
+        return SandboxBusyError(detail=exc.message, retry_after=exc.retry_after)
+    return None
+
+
+def process_line(line: str, snapshot: PolicySnapshot) -> str:
+    """Run one JSONL request through the pipeline and return one JSON output line.
+
+    The line is validated straight from its JSON text; malformed JSON is a
+    schema rejection like any other.
+    """
+    try:
+        result = run_pipeline(line, snapshot.policy, snapshot.rbac, snapshot.decisions, snapshot.version)
+    except Exception as exc:
+        err = error_for(exc)
+        if err is None:
+            raise
+        return err.model_dump_json()
+    return result.model_dump_json()
+
+
+def ordered_imap(executor: Executor, fn: Callable[[T], R], items: Iterable[T], window: int) -> Iterator[R]:
+    """Like ``executor.map`` but lazy: at most ``window`` tasks are in flight.
+
+    ``Executor.map`` submits the whole iterable up front; this keeps memory
+    constant for unbounded inputs while still yielding results in order.
+    """
+    pending: deque = deque()
+    iterator = iter(items)
+    for item in islice(iterator, window):
+        pending.append(executor.submit(fn, item))
+    while pending:
+        result = pending.popleft().result()
+        for item in islice(iterator, 1):
+            pending.append(executor.submit(fn, item))
+        yield result
+
+
+def _chunks(lines: Iterable[str], size: int) -> Iterator[list[str]]:
+    iterator = (line for line in lines if line.strip())
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+_worker_snapshot: PolicySnapshot | None = None
+
+
+def _init_worker(paths: tuple[Path, Path, Path]) -> None:
+    global _worker_snapshot
+    _worker_snapshot = PolicySnapshot.load(*paths)
+
+
+def _process_chunk(chunk: list[str]) -> list[str]:
+    return [process_line(line, _worker_snapshot) for line in chunk]
+
+
+def run_batch(
+    lines: Iterable[str],
+    policy_path: Path,
+    model_path: Path,
+    rbac_policy_path: Path,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[str]:
+    """Stream JSONL requests through the pipeline, yielding one output line per request.
+
+    Blank lines are skipped; every other input line yields exactly one output
+    line, in input order.  With ``workers > 1`` chunks of lines are spread
+    over a process pool whose workers each load the policy once.
+    """
+    paths = (Path(policy_path), Path(model_path), Path(rbac_policy_path))
+    if workers <= 1:
+        snapshot = PolicySnapshot.load(*paths)
+        for line in lines:
+            if line.strip():
+                yield process_line(line, snapshot)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(paths,)) as executor:
+        for outputs in ordered_imap(executor, _process_chunk, _chunks(lines, chunk_size), workers * DEFAULT_WINDOW):
+            yield from outputs
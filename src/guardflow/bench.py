@@ -0,0 +1,279 @@
+"""Microbenchmarks for the pipeline stages (``guardflow bench``).
+
+A seeded synthetic workload (roles, tools, rules, argument rules, argument
+size, deny ratio) is written to a temporary directory, then each stage is timed op
+by op.  ``python_exec`` goes through a stub sandbox, so no Docker daemon
+is needed.  Results are plain JSON and can be compared to a baseline.
+"""
+from __future__ import annotations
+
+import json
+import platform
+import random
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from guardflow import ratelimit, sandbox
+from guardflow.compiled import CompiledPolicy, dump_compiled
+from guardflow.decisions import compile_decisions
+from guardflow.models import RunRequest
+from guardflow.pipeline import authorize, run_pipeline, validate
+from guardflow.policy import Policy
+from guardflow.rbac import RbacPolicy
+
+RESULTS_VERSION = 1
+DEFAULT_ITERATIONS = 2000
+DEFAULT_ALLOC_ITERATIONS = 200
+DEFAULT_THRESHOLD = 0.10        # allowed relative slowdown before a stage counts as regressed
+STAGES = (
+    "policy_load", "rbac_load", "validate", "validate_json", "authorize", "authorize_compiled", "compiled_load",
+    "authorize_mmap", "check_arguments", "rate_limit", "rate_limit_shared", "run_pipeline",
+)
+# Loading files is much slower than a lookup; time fewer iterations of it.
+_LOAD_STAGES = frozenset({"policy_load", "rbac_load", "compiled_load"})
+
+ACL_MODEL = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = r.sub == p.sub && r.act == p.act
+"""
+
+
+@dataclass(frozen=True)
+class Workload:
+    roles: int = 8
+    tools: int = 32
+    rules: int = 128
+    arg_rules: int = 3000           # path prefixes, hosts and commands, split evenly
+    arg_bytes: int = 256
+    deny_ratio: float = 0.2
+    requests: int = 1000
+    seed: int = 0
+
+
+class SyntheticPolicy:
+    """Policy files and requests generated from a ``Workload``."""
+
+    def __init__(self, workload: Workload, directory: Path) -> None:
+        rng = random.Random(workload.seed)
+        tools = [f"tool_{i}" for i in range(max(workload.tools - 1, 0))] + ["python_exec"]
+        roles = [f"role_{i}" for i in range(workload.roles)]
+        pairs = [(role, tool) for role in roles for tool in tools]
+        granted = set(rng.sample(pairs, min(workload.rules, len(pairs))))
+        denied = [pair for pair in pairs if pair not in granted]
+
+        self.policy_path = directory / "policy.json"
+        self.model_path = directory / "model.conf"
+        self.rbac_policy_path = directory / "rbac_policy.csv"
+        self.policy_path.write_text(json.dumps({"allowed_tools": tools, "argument_rules": _argument_rules(workload)}))
+        self.model_path.write_text(ACL_MODEL)
+        self.rbac_policy_path.write_text("".join(f"p, {role}, {tool}\n" for role, tool in sorted(granted)))
+
+        granted_list = sorted(granted)
+        padding = "x" * workload.arg_bytes
+        self.requests = []
+        for i in range(workload.requests):
+            if rng.random() < workload.deny_ratio:
+                # Half the denials fail the allowlist, half fail RBAC (when any pair is ungranted).
+                if denied and rng.random() < 0.5:
+                    role, tool = rng.choice(denied)
+                else:
+                    role, tool = rng.choice(roles), f"blocked_{i}"
+            else:
+                role, tool = rng.choice(granted_list)
+            args = {"payload": padding}
+            if tool == "python_exec":
+                args["code"] = "print(1)"
+            self.requests.append({"actor": {"id": f"u{i}", "role": role}, "tool_call": {"tool": tool, "args": args}})
+
+        # Half of the argument checks hit an entry, half fall through to the default deny.
+        per_kind = max(1, workload.arg_rules // 3)
+        self.argument_calls = []
+        for i in range(workload.requests):
+            k = rng.randrange(per_kind) if i % 2 else per_kind + i
+            self.argument_calls += [
+                ("file_read", {"path": f"/srv/data{k}/reports/q{i % 4}.csv"}),
+                ("http_request", {"url": f"https://api{k}.example.com/v1/items?page={i}"}),
+                ("http_request", {"url": f"http://10.{(k >> 8) & 255}.{k & 255}.7/status"}),
+                ("shell_command", {"command": f"tool{k} --verbose"}),
+            ]
+
+
+def _argument_rules(workload: Workload) -> list[dict]:
+    """One rule per argument kind, ``workload.arg_rules`` entries in all."""
+    per_kind = max(1, workload.arg_rules // 3)
+    return [
+        {"tool": "file_read", "path": {"allow": [f"/srv/data{i}" for i in range(per_kind)], "deny": ["/srv/data0/secrets"]}},
+        {
+            "tool": "http_request",
+            "url": {
+                "allow": [f"api{i}.example.com" for i in range(per_kind // 2)]
+                + [f"10.{(i >> 8) & 255}.{i & 255}.0/24" for i in range(per_kind - per_kind // 2)],
+                "deny": ["169.254.0.0/16"],
+            },
+        },
+        {"tool": "shell_command", "command": {"allow": [f"tool{i}" for i in range(per_kind)], "patterns": [r"git (status|log)( .*)?"]}},
+    ]
+
+
+class _StubSandbox:
+    """Stands in for the warm pool so ``python_exec`` never reaches Docker."""
+
+    def run(self, code: str, timeout: int = sandbox.SANDBOX_TIMEOUT) -> dict:
+        return {"stdout": "", "stderr": "", "exit_code": 0}
+
+
+@contextmanager
+def stub_sandbox():
+    previous = sandbox.get_pool()
+    sandbox.set_pool(_StubSandbox())
+    try:
+        yield
+    finally:
+        sandbox.set_pool(previous)
+
+
+def _percentile(sorted_ns: list[int], q: float) -> float:
+    index = min(len(sorted_ns) - 1, max(0, round(q * (len(sorted_ns) - 1))))
+    return sorted_ns[index] / 1000.0
+
+
+def measure(op: Callable[[int], object], iterations: int, alloc_iterations: int, warmup: int = 0) -> dict:
+    """Time ``op(i)`` for ``i`` in ``range(iterations)``; then sample its peak allocation.
+
+    ``warmup`` untimed calls run first, so caches are filled the same way
+    whatever the iteration count.
+    """
+    for i in range(warmup):
+        op(i)
+    durations = []
+    for i in range(iterations):
+        start = time.perf_counter_ns()
+        op(i)
+        durations.append(time.perf_counter_ns() - start)
+    durations.sort()
+    total_ns = sum(durations)
+
+    tracemalloc.start()
+    try:
+        peaks = 0
+        for i in range(alloc_iterations):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            op(i)
+            peaks += tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return {
+        "iterations": iterations,
+        "ops_per_sec": iterations / (total_ns / 1e9) if total_ns else 0.0,
+        "p50_us": _percentile(durations, 0.50),
+        "p99_us": _percentile(durations, 0.99),
+        "alloc_bytes": peaks / alloc_iterations if alloc_iterations else 0.0,
+    }
+
+
+def _swallow(fn: Callable, *args) -> None:
+    try:
+        fn(*args)
+    except Exception:
+        pass  # denials are part of the workload
+
+
+def run_bench(
+    workload: Workload,
+    stages: tuple[str, ...] = STAGES,
+    iterations: int = DEFAULT_ITERATIONS,
+    alloc_iterations: int = DEFAULT_ALLOC_ITERATIONS,
+) -> dict:
+    """Run the selected stages over ``workload`` and return the results document."""
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    with tempfile.TemporaryDirectory(prefix="guardflow-bench-") as tmp, stub_sandbox():
+        synthetic = SyntheticPolicy(workload, Path(tmp))
+        policy = Policy.load(synthetic.policy_path)
+        rbac = RbacPolicy.load(synthetic.model_path, synthetic.rbac_policy_path)
+        decisions = compile_decisions(policy, rbac)
+        compiled_path = Path(tmp) / "policy.bin"
+        compiled_path.write_bytes(dump_compiled(decisions, rbac.version, synthetic.policy_path.read_bytes()))
+        mapped = CompiledPolicy(compiled_path)
+        data = synthetic.requests
+        raw = [json.dumps(d).encode() for d in data]
+        parsed = [RunRequest.model_validate(d) for d in data]
+        n = len(data)
+        calls = synthetic.argument_calls
+        m = len(calls)
+        # A budget no actor exhausts, so every call takes the full refill-and-charge path.
+        limit = ratelimit.RateLimit("\0*\0*", rate=1e9, burst=1e9)
+        actors = [f"u{i}" for i in range(n)]
+        limiter = ratelimit.RateLimiter()
+        shared = ratelimit.SharedRateLimiter(Path(tmp) / "ratelimit")
+
+        ops: dict[str, Callable[[int], object]] = {
+            "policy_load": lambda i: Policy.load(synthetic.policy_path),
+            "rbac_load": lambda i: RbacPolicy.load(synthetic.model_path, synthetic.rbac_policy_path),
+            "validate": lambda i: validate(data[i % n]),
+            "validate_json": lambda i: validate(raw[i % n]),
+            "authorize": lambda i: _swallow(authorize, parsed[i % n], policy, rbac),
+            "authorize_compiled": lambda i: _swallow(authorize, parsed[i % n], policy, rbac, decisions),
+            "compiled_load": lambda i: CompiledPolicy(compiled_path).close(),
+            "authorize_mmap": lambda i: _swallow(authorize, parsed[i % n], policy, rbac, mapped),
+            "check_arguments": lambda i: _swallow(policy.check_arguments, "role_0", *calls[i % m]),
+            "rate_limit": lambda i: limiter.acquire(actors[i % n], limit),
+            "rate_limit_shared": lambda i: shared.acquire(actors[i % n], limit),
+            "run_pipeline": lambda i: _swallow(run_pipeline, data[i % n], policy, rbac, decisions),
+        }
+        results = {}
+        for stage in stages:
+            count = max(1, iterations // 20) if stage in _LOAD_STAGES else iterations
+            allocs = max(1, alloc_iterations // 20) if stage in _LOAD_STAGES else alloc_iterations
+            warmup = 1 if stage in _LOAD_STAGES else n
+            results[stage] = measure(ops[stage], count, allocs, warmup)
+        shared.close()
+        mapped.close()
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "workload": asdict(workload),
+        "stages": results,
+    }
+
+
+@dataclass(frozen=True)
+class Regression:
+    stage: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def change(self) -> float:
+        return (self.current - self.baseline) / self.baseline if self.baseline else 0.0
+
+
+def compare(results: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> list[Regression]:
+    """Stages whose throughput fell, or whose p99 rose, by more than ``threshold``."""
+    regressions = []
+    for stage, current in results["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if base is None:
+            continue
+        if current["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+            regressions.append(Regression(stage, "ops_per_sec", base["ops_per_sec"], current["ops_per_sec"]))
+        if current["p99_us"] > base["p99_us"] * (1 + threshold):
+            regressions.append(Regression(stage, "p99_us", base["p99_us"], current["p99_us"]))
+    return regressions
@@ -2,7 +2,14 @@
 
 import json
 import logging
+import math
+import os
 import sys
+import time
+import urllib.request
+from contextlib import contextmanager
+from dataclasses import asdict
+from datetime import datetime
 from pathlib import Path
 
 import typer
@@ -10,12 +17,24 @@ from pydantic import ValidationError
 from rich import print as rprint
 from rich.logging import RichHandler
 
-from guardflow.models import PolicyError, RbacError, SandboxError, SchemaError
+from guardflow import audit, metrics
+from guardflow import bench as bench_mod
+from guardflow import fuzz as fuzz_mod
+from guardflow import loadtest as loadtest_mod
+from guardflow.arguments import ArgumentViolation
+from guardflow.batch import error_for, run_batch
+from guardflow.compiled import DEFAULT_COMPILED_PATH, CompiledPolicy, CompiledPolicyError, compile_policy
+from guardflow.decisions import ALLOW, PolicyCompileError, compile_decisions
+from guardflow.hierarchy import MAX_ROLE_DEPTH, RoleHierarchy
 from guardflow.pipeline import run_pipeline
 from guardflow.policy import Policy, PolicyViolation
+from guardflow.policy_diff import diff_policies, policy_paths
+from guardflow.ratelimit import RateLimited
 from guardflow.rbac import RbacDenial, RbacPolicy
-from guardflow.redteam import run_suite
+from guardflow.redteam import REDTEAM_CASES, CaseLoadError, ResultLog, load_cases, parse_shard, run_cases
+from guardflow.sandbox import SandboxBusy
 from guardflow.sandbox import SandboxError as SandboxExc
+from guardflow.snapshot import PolicySnapshot
 
 app = typer.Typer(
     name="guardflow",
@@ -30,8 +49,8 @@ app.add_typer(policy_app)
 
 @app.command()
 def run(
-    input: str = typer.Option(
-        ...,
+    input: str | None = typer.Option(
+        None,
         "--input",
         "-i",
         help=(
@@ -43,6 +62,16 @@ def run(
     policy_path: str = typer.Option("policy.json", "--policy", "-p", help="Path to policy config file."),
     rbac_model: str = typer.Option("model.conf", "--rbac-model", help="Path to Casbin model.conf file."),
     rbac_policy: str = typer.Option("rbac_policy.csv", "--rbac-policy", help="Path to Casbin RBAC policy CSV file."),
+    batch: str | None = typer.Option(
+        None,
+        "--batch",
+        "-b",
+        help="Path to a JSONL file of requests (or '-' for stdin); writes one JSON result or error per line.",
+    ),
+    workers: int = typer.Option(1, "--workers", "-w", min=1, help="Worker processes for --batch mode."),
+    audit_log: str | None = typer.Option(
+        None, "--audit-log", help="Append an audit record for every decision to this file."
+    ),
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Show pipeline debug logs."),
 ) -> None:
     """Parse a tool-call request and run it through the pipeline.
@@ -53,6 +82,11 @@ def run(
       guardflow run -i examples/echo.json
       guardflow run -i examples/shell_command.json
       guardflow run -i '{"actor":{"id":"u1","role":"viewer"},"tool_call":{"tool":"echo","args":{"text":"hi"}}}'
+
+    --batch streams a JSONL file through the pipeline instead:
+
+    \b
+      guardflow run --batch requests.jsonl --workers 4 > results.jsonl
     """
     if verbose:
         logging.basicConfig(
@@ -61,54 +95,83 @@ def run(
             handlers=[RichHandler(show_path=False)],
         )
 
+    if (input is None) == (batch is None):
+        rprint("[red]Error:[/red] pass exactly one of --input or --batch", file=sys.stderr)
+        raise typer.Exit(code=1)
+    if audit_log is not None and workers > 1:
+        rprint("[red]Error:[/red] --audit-log cannot be combined with --workers > 1", file=sys.stderr)
+        raise typer.Exit(code=1)
+    with _audit_sink(audit_log):
+        _run(input, batch, Path(policy_path), Path(rbac_model), Path(rbac_policy), workers)
+
+
+@contextmanager
+def _audit_sink(path: str | None):
+    if path is None:
+        yield
+        return
+    sink = audit.AuditSink(Path(path))
+    sink.start()
+    audit.set_sink(sink)
+    try:
+        yield
+    finally:
+        audit.set_sink(None)
+        sink.close()
+
+
+def _run(input: str | None, batch: str | None, policy_path: Path, rbac_model: Path, rbac_policy: Path, workers: int) -> None:
+    if batch is not None:
+        _run_batch(batch, policy_path, rbac_model, rbac_policy, workers)
+        return
+
     raw = input
     path = Path(raw)
     if path.suffix == ".json" and path.exists():
-        raw = path.read_text()
-
-    try:
-        data = json.loads(raw)
-    except json.JSONDecodeError as exc:
-        rprint(f"[red]Error:[/red] invalid JSON — {exc}", file=sys.stderr)
-        raise typer.Exit(code=1)
+        raw = path.read_bytes()
 
     try:
-        loaded_policy = Policy.load(Path(policy_path))
+        loaded_policy = Policy.load(policy_path)
     except FileNotFoundError:
         rprint(f"[red]Error:[/red] policy file not found: {policy_path}", file=sys.stderr)
         raise typer.Exit(code=1)
 
     try:
-        loaded_rbac = RbacPolicy.load(Path(rbac_model), Path(rbac_policy))
+        loaded_rbac = RbacPolicy.load(rbac_model, rbac_policy)
     except (FileNotFoundError, OSError) as exc:
         rprint(f"[red]Error:[/red] RBAC config not found — {exc}", file=sys.stderr)
         raise typer.Exit(code=1)
 
     try:
-        result = run_pipeline(data, loaded_policy, loaded_rbac)
+        # Raw JSON goes straight to the pipeline: parsed and validated in one pass.
+        result = run_pipeline(raw, loaded_policy, loaded_rbac)
         rprint(result.model_dump_json(indent=2))
-    except ValidationError as exc:
-        err = SchemaError(detail=str(exc))
-        rprint(err.model_dump_json(indent=2), file=sys.stderr)
-        raise typer.Exit(code=1)
-    except PolicyViolation as exc:
-        err = PolicyError(tool=exc.tool, detail=f"Tool '{exc.tool}' is not in the allowlist")
-        rprint(err.model_dump_json(indent=2), file=sys.stderr)
-        raise typer.Exit(code=1)
-    except RbacDenial as exc:
-        err = RbacError(
-            role=exc.role,
-            tool=exc.tool,
-            detail=f"Role '{exc.role}' is not permitted to use tool '{exc.tool}'",
-        )
-        rprint(err.model_dump_json(indent=2), file=sys.stderr)
-        raise typer.Exit(code=1)
-    except SandboxExc as exc:
-        err = SandboxError(detail=exc.message)
-        rprint(err.model_dump_json(indent=2), file=sys.stderr)
+    except (ValidationError, PolicyViolation, RbacDenial, ArgumentViolation, RateLimited, SandboxExc, SandboxBusy) as exc:
+        rprint(error_for(exc).model_dump_json(indent=2), file=sys.stderr)
         raise typer.Exit(code=1)
 
 
+def _run_batch(batch: str, policy_path: Path, rbac_model: Path, rbac_policy: Path, workers: int) -> None:
+    for path, what in ((policy_path, "policy file"), (rbac_model, "RBAC model"), (rbac_policy, "RBAC policy")):
+        if not path.exists():
+            rprint(f"[red]Error:[/red] {what} not found: {path}", file=sys.stderr)
+            raise typer.Exit(code=1)
+    if batch == "-":
+        source = sys.stdin
+    else:
+        try:
+            source = open(batch, encoding="utf-8")
+        except OSError as exc:
+            rprint(f"[red]Error:[/red] cannot read batch file — {exc}", file=sys.stderr)
+            raise typer.Exit(code=1)
+    try:
+        for line in run_batch(source, policy_path, rbac_model, rbac_policy, workers=workers):
+            sys.stdout.write(line + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
 @policy_app.command("show")
 def policy_show(
     policy_path: str = typer.Option("policy.json", "--policy", "-p", help="Path to policy config file."),
@@ -125,10 +188,16 @@ def policy_show(
 @policy_app.command("validate")
 def policy_validate(
     policy_path: str = typer.Option("policy.json", "--policy", "-p", help="Path to policy config file."),
+    rbac_model: str | None = typer.Option(
+        None, "--rbac-model", help="Path to Casbin model.conf file. Default: model.conf, if present."
+    ),
+    rbac_policy: str | None = typer.Option(
+        None, "--rbac-policy", help="Path to Casbin RBAC policy CSV file. Default: rbac_policy.csv, if present."
+    ),
 ) -> None:
-    """Validate the policy config file."""
+    """Validate the policy config file, and the RBAC policy and its role hierarchy."""
     try:
-        Policy.load(Path(policy_path))
+        policy = Policy.load(Path(policy_path))
     except FileNotFoundError:
         rprint(f"[red]Error:[/red] policy file not found: {policy_path}", file=sys.stderr)
         raise typer.Exit(code=1)
@@ -137,6 +206,75 @@ def policy_validate(
         raise typer.Exit(code=1)
     rprint("[green]Policy file is valid.[/green]")
 
+    model_path = Path(rbac_model or "model.conf")
+    rbac_path = Path(rbac_policy or "rbac_policy.csv")
+    if rbac_model is None and rbac_policy is None and not (model_path.exists() and rbac_path.exists()):
+        return
+    try:
+        loaded_rbac = RbacPolicy.load(model_path, rbac_path)
+    except (FileNotFoundError, OSError) as exc:
+        rprint(f"[red]Error:[/red] RBAC config not found — {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    except Exception as exc:
+        rprint(f"[red]Error:[/red] invalid RBAC config — {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+    rules = loaded_rbac.enforcer.get_policy()
+    links = loaded_rbac.role_links
+    hierarchy = RoleHierarchy(links)
+    roles = {rule[0] for rule in rules} | set(hierarchy.roles)
+    rprint(f"RBAC policy: {len(roles)} roles, {len(rules)} grant rules, {len(links)} inheritance rules.")
+    if links:
+        rprint(
+            f"Role hierarchy: depth {hierarchy.depth}, closure size {hierarchy.closure_size} "
+            "(role, inherited role) pairs."
+        )
+    try:
+        table = compile_decisions(policy, loaded_rbac)
+    except PolicyCompileError as exc:
+        rprint(f"[yellow]Decision table not compiled[/yellow] — {exc}; Casbin evaluates each request.")
+    else:
+        effective = sum(table.grants(role).bit_count() for role in table.roles)
+        rprint(f"Compiled decision table: {len(table.roles)} roles × {len(table.tools)} tools, {effective} effective grants.")
+
+    problems = [
+        f"role inheritance cycle: {' ↔ '.join(cycle)}" if len(cycle) > 1 else f"role {cycle[0]} inherits from itself"
+        for cycle in hierarchy.cycles
+    ]
+    if hierarchy.depth > MAX_ROLE_DEPTH:
+        problems.append(f"role hierarchy is {hierarchy.depth} levels deep (limit {MAX_ROLE_DEPTH})")
+    for problem in problems:
+        rprint(f"[red]Error:[/red] {problem}", file=sys.stderr)
+    if problems:
+        raise typer.Exit(code=1)
+    rprint("[green]RBAC policy is valid.[/green]")
+
+
+@policy_app.command("compile")
+def policy_compile(
+    policy_path: str = typer.Option("policy.json", "--policy", "-p", help="Path to policy config file."),
+    rbac_model: str = typer.Option("model.conf", "--rbac-model", help="Path to Casbin model.conf file."),
+    rbac_policy: str = typer.Option("rbac_policy.csv", "--rbac-policy", help="Path to Casbin RBAC policy CSV file."),
+    output: str = typer.Option(str(DEFAULT_COMPILED_PATH), "--output", "-o", help="Where to write the compiled policy."),
+) -> None:
+    """Compile the policy files into a binary decision index that servers load with mmap."""
+    try:
+        compiled = compile_policy(Path(output), Path(policy_path), Path(rbac_model), Path(rbac_policy))
+    except FileNotFoundError as exc:
+        rprint(f"[red]Error:[/red] policy file not found: {exc.filename}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    except PolicyCompileError as exc:
+        rprint(f"[red]Error:[/red] policy cannot be compiled — {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    except Exception as exc:
+        rprint(f"[red]Error:[/red] invalid policy — {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    with compiled:
+        rprint(
+            f"Compiled policy version {compiled.version}: {len(compiled.roles)} roles × {len(compiled.tools)} tools, "
+            f"{compiled.path.stat().st_size} bytes → {compiled.path}"
+        )
+
 
 @policy_app.command("check")
 def policy_check(
@@ -144,8 +282,23 @@ def policy_check(
     tool: str = typer.Option(..., "--tool", help="Tool name to check."),
     rbac_model: str = typer.Option("model.conf", "--rbac-model", help="Path to Casbin model.conf file."),
     rbac_policy: str = typer.Option("rbac_policy.csv", "--rbac-policy", help="Path to Casbin RBAC policy CSV file."),
+    compiled: str | None = typer.Option(
+        None, "--compiled", help="Answer from a compiled policy file (allowlist and RBAC) instead."
+    ),
 ) -> None:
     """Check whether a role is permitted to use a tool under the RBAC policy."""
+    if compiled is not None:
+        try:
+            with CompiledPolicy(Path(compiled)) as table:
+                decision = table.decide(role, tool)
+        except (OSError, CompiledPolicyError) as exc:
+            rprint(f"[red]Error:[/red] cannot read compiled policy — {exc}", file=sys.stderr)
+            raise typer.Exit(code=1)
+        if decision == ALLOW:
+            rprint(f"[green]ALLOWED:[/green] role '{role}' may use tool '{tool}'")
+            return
+        rprint(f"[red]DENIED ({decision}):[/red] role '{role}' is not permitted to use tool '{tool}'", file=sys.stderr)
+        raise typer.Exit(code=1)
     try:
         loaded_rbac = RbacPolicy.load(Path(rbac_model), Path(rbac_policy))
     except (FileNotFoundError, OSError) as exc:
@@ -159,6 +312,67 @@ def policy_check(
         raise typer.Exit(code=1)
 
 
+@policy_app.command("diff")
+def policy_diff(
+    old: str = typer.Option(..., "--old", help="Directory with the current policy.json, model.conf and rbac_policy.csv."),
+    new: str = typer.Option(".", "--new", help="Directory with the proposed policy files."),
+    as_json: bool = typer.Option(False, "--json", help="Print the delta as JSON."),
+    output: str | None = typer.Option(None, "--output", "-o", help="Write the delta as JSON to this file."),
+    exit_code: bool = typer.Option(False, "--exit-code", help="Exit with status 1 if any effective grant changed."),
+) -> None:
+    """Show which (role, tool) grants appear or disappear between two policy versions.
+
+    \b
+      git show HEAD:policy.json > /tmp/old/policy.json  # ...and model.conf, rbac_policy.csv
+      guardflow policy diff --old /tmp/old --new .
+    """
+    from rich.console import Console
+    from rich.table import Table
+
+    try:
+        delta = diff_policies(policy_paths(Path(old)), policy_paths(Path(new)))
+    except FileNotFoundError as exc:
+        rprint(f"[red]Error:[/red] policy file not found — {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    except PolicyCompileError as exc:
+        rprint(f"[red]Error:[/red] cannot diff this model — {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    except (ValueError, ValidationError) as exc:
+        rprint(f"[red]Error:[/red] invalid policy file — {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+    if output:
+        Path(output).write_text(json.dumps(delta.to_dict(), indent=2) + "\n")
+    if as_json:
+        sys.stdout.write(json.dumps(delta.to_dict(), indent=2) + "\n")
+    else:
+        console = Console()
+        if delta.changed:
+            table = Table(title=f"Effective permissions {delta.old_version} → {delta.new_version}")
+            table.add_column("", width=1)
+            table.add_column("Role", style="bold")
+            table.add_column("Tool")
+            for role, tool in delta.granted:
+                table.add_row("[green]+[/green]", role, f"[green]{tool}[/green]")
+            for role, tool in delta.revoked:
+                table.add_row("[red]-[/red]", role, f"[red]{tool}[/red]")
+            console.print(table)
+        for label, names in (
+            ("Roles added", delta.roles_added),
+            ("Roles removed", delta.roles_removed),
+            ("Tools allowlisted", delta.tools_added),
+            ("Tools removed from allowlist", delta.tools_removed),
+        ):
+            if names:
+                rprint(f"{label}: {', '.join(names)}")
+        if delta.changed:
+            rprint(f"{len(delta.granted)} grant(s) added, {len(delta.revoked)} revoked.")
+        else:
+            rprint("[green]No effective permission changes.[/green]")
+    if exit_code and delta.changed:
+        raise typer.Exit(code=1)
+
+
 redteam_app = typer.Typer(name="redteam", help="Red-team adversarial guardrail regression suite.")
 app.add_typer(redteam_app)
 
@@ -168,43 +382,433 @@ def redteam_run(
     policy_path: str = typer.Option("policy.json", "--policy", "-p", help="Path to policy config file."),
     rbac_model: str = typer.Option("model.conf", "--rbac-model", help="Path to Casbin model.conf file."),
     rbac_policy: str = typer.Option("rbac_policy.csv", "--rbac-policy", help="Path to Casbin RBAC policy CSV file."),
+    cases: list[str] | None = typer.Option(
+        None, "--cases", "-c", help="Case directory, .jsonl corpus or .json case (repeatable). Default: built-in cases."
+    ),
+    shard: str | None = typer.Option(None, "--shard", help="Run only shard i of N of the cases, e.g. 2/4."),
+    results: str | None = typer.Option(
+        None, "--results", help="Record passing cases here and skip those already passed under this policy version."
+    ),
+    workers: int = typer.Option(1, "--workers", "-w", min=1, help="Worker processes."),
 ) -> None:
-    """Run the red-team adversarial regression suite against the active policy."""
+    """Run the red-team adversarial regression suite against the active policy.
+
+    \b
+      guardflow redteam run --cases tests/fixtures/redteam
+      guardflow redteam run --cases corpus/ --shard 2/4 --results redteam-results.jsonl --workers 4
+    """
     from rich.console import Console
     from rich.table import Table
 
+    paths = (Path(policy_path), Path(rbac_model), Path(rbac_policy))
     try:
-        loaded_policy = Policy.load(Path(policy_path))
-    except FileNotFoundError:
-        rprint(f"[red]Error:[/red] policy file not found: {policy_path}", file=sys.stderr)
+        snapshot = PolicySnapshot.load(*paths)
+    except FileNotFoundError as exc:
+        rprint(f"[red]Error:[/red] policy config not found — {exc}", file=sys.stderr)
         raise typer.Exit(code=1)
     try:
-        loaded_rbac = RbacPolicy.load(Path(rbac_model), Path(rbac_policy))
-    except (FileNotFoundError, OSError) as exc:
-        rprint(f"[red]Error:[/red] RBAC config not found — {exc}", file=sys.stderr)
+        shard_spec = parse_shard(shard) if shard else None
+    except ValueError as exc:
+        rprint(f"[red]Error:[/red] {exc}", file=sys.stderr)
         raise typer.Exit(code=1)
 
-    results = run_suite(loaded_policy, loaded_rbac)
+    source = load_cases(map(Path, cases), shard_spec) if cases else iter(REDTEAM_CASES)
+    log = ResultLog(Path(results), snapshot.version) if results else None
+    pending = log.pending(source) if log is not None else source
 
     console = Console()
-    table = Table(title="Red-team Results", show_lines=True)
+    table = Table(title="Red-team Results" if not cases else "Red-team Failures", show_lines=True)
     table.add_column("", width=2)
     table.add_column("Case", style="bold")
     table.add_column("Expected")
     table.add_column("Actual")
-    for r in results:
-        icon = "[green]✓[/green]" if r.passed else "[red]✗[/red]"
-        style = "green" if r.passed else "red"
-        table.add_row(icon, r.case.name, r.case.expected, f"[{style}]{r.actual}[/{style}]")
-    console.print(table)
+    passed = total = 0
+    try:
+        for r in run_cases(pending, paths, workers=workers):
+            total += 1
+            passed += r.passed
+            if log is not None:
+                log.record(r)
+            if r.passed and cases:
+                continue        # corpora can be huge: list failures only
+            icon = "[green]✓[/green]" if r.passed else "[red]✗[/red]"
+            style = "green" if r.passed else "red"
+            table.add_row(icon, r.case.name, r.case.expected, f"[{style}]{r.actual}[/{style}]")
+    except CaseLoadError as exc:
+        rprint(f"[red]Error:[/red] invalid red-team case — {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    finally:
+        if log is not None:
+            log.close()
+    if table.row_count:
+        console.print(table)
 
-    passed = sum(1 for r in results if r.passed)
-    total = len(results)
+    skipped = f" ({log.skipped} already passed under policy {snapshot.version}, skipped)" if log is not None else ""
     if passed == total:
-        rprint(f"[green]{passed}/{total} cases passed.[/green]")
+        rprint(f"[green]{passed}/{total} cases passed.[/green]{skipped}")
     else:
-        rprint(f"[red]{passed}/{total} cases passed.[/red]", file=sys.stderr)
+        rprint(f"[red]{passed}/{total} cases passed.[/red]{skipped}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+
+@redteam_app.command("fuzz")
+def redteam_fuzz(
+    count: int = typer.Option(fuzz_mod.DEFAULT_COUNT, "--count", "-n", min=1, help="Number of generated cases."),
+    seed: int = typer.Option(0, "--seed", "-s", help="Corpus seed; the same seed always generates the same cases."),
+    workers: int = typer.Option(0, "--workers", "-w", min=0, help="Worker processes (0 = one per CPU)."),
+    report: str | None = typer.Option(None, "--report", "-o", help="Write one JSON result per case, then a summary line, to this JSONL file."),
+    show_failures: int = typer.Option(20, "--show-failures", min=0, help="Failing cases to list in the console."),
+    policy_path: str = typer.Option("policy.json", "--policy", "-p", help="Path to policy config file."),
+    rbac_model: str = typer.Option("model.conf", "--rbac-model", help="Path to Casbin model.conf file."),
+    rbac_policy: str = typer.Option("rbac_policy.csv", "--rbac-policy", help="Path to Casbin RBAC policy CSV file."),
+) -> None:
+    """Check the guardrails against a seeded corpus of mutated red-team payloads.
+
+    \b
+      guardflow redteam fuzz --count 50000 --seed 7 --report fuzz.jsonl
+    """
+    from rich.console import Console
+    from rich.table import Table
+
+    paths = (Path(policy_path), Path(rbac_model), Path(rbac_policy))
+    for path, what in zip(paths, ("policy file", "RBAC model", "RBAC policy")):
+        if not path.exists():
+            rprint(f"[red]Error:[/red] {what} not found: {path}", file=sys.stderr)
+            raise typer.Exit(code=1)
+    try:
+        out = open(report, "w", encoding="utf-8") if report else None
+    except OSError as exc:
+        rprint(f"[red]Error:[/red] cannot write report — {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+    summary = fuzz_mod.FuzzSummary()
+    failures: list[fuzz_mod.FuzzResult] = []
+    started = time.perf_counter()
+    try:
+        for result in fuzz_mod.run_fuzz(count, *paths, seed=seed, workers=workers or os.cpu_count() or 1):
+            summary.add(result)
+            if not result.passed and len(failures) < show_failures:
+                failures.append(result)
+            if out is not None:
+                out.write(json.dumps(asdict(result)) + "\n")
+        if out is not None:
+            out.write(json.dumps({"summary": summary.to_dict()}) + "\n")
+    finally:
+        if out is not None:
+            out.close()
+    elapsed = time.perf_counter() - started
+
+    console = Console()
+    table = Table(title=f"Fuzz Results (seed {seed})")
+    table.add_column("Mutation", style="bold")
+    table.add_column("Cases", justify="right")
+    table.add_column("Failed", justify="right")
+    for tag, row in summary.to_dict()["mutations"].items():
+        style = "red" if row["failed"] else "green"
+        table.add_row(tag, str(row["cases"]), f"[{style}]{row['failed']}[/{style}]")
+    console.print(table)
+
+    if summary.failed:
+        classes = Table(title="Failure classes")
+        classes.add_column("Class", style="bold")
+        classes.add_column("Count", justify="right")
+        classes.add_column("Example")
+        for row in summary.to_dict()["failure_classes"]:
+            classes.add_row(row["class"], str(row["count"]), row["example"])
+        console.print(classes)
+    if failures:
+        cases = Table(title=f"First {len(failures)} failing cases", show_lines=True)
+        cases.add_column("Case", style="bold")
+        cases.add_column("Mutated from")
+        cases.add_column("Expected")
+        cases.add_column("Actual")
+        for r in failures:
+            cases.add_row(r.name, r.description, r.expected, f"[red]{r.actual}[/red]")
+        console.print(cases)
+
+    passed = summary.total - summary.failed
+    message = f"{passed}/{summary.total} fuzz cases passed in {elapsed:.2f}s."
+    if summary.failed:
+        rprint(f"[red]{message}[/red]", file=sys.stderr)
+        raise typer.Exit(code=1)
+    rprint(f"[green]{message}[/green]")
+
+
+audit_app = typer.Typer(name="audit", help="Read the decision audit log.")
+app.add_typer(audit_app)
+
+
+def _timestamp(value: str | None) -> float | None:
+    """Parse an epoch-seconds or ISO-8601 timestamp option."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        rprint(f"[red]Error:[/red] invalid timestamp: {value}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+
+@audit_app.command("show")
+def audit_show(
+    log: str = typer.Option("audit.jsonl", "--log", "-l", help="Audit log file (rotated backups are read too)."),
+    actor: str | None = typer.Option(None, "--actor", help="Only records for this actor id."),
+    role: str | None = typer.Option(None, "--role", help="Only records for this role."),
+    tool: str | None = typer.Option(None, "--tool", help="Only records for this tool."),
+    outcome: str | None = typer.Option(None, "--outcome", help="Only records with this outcome code, e.g. RBAC_DENIED."),
+    since: str | None = typer.Option(None, "--since", help="Only records at or after this time (epoch seconds or ISO-8601)."),
+    until: str | None = typer.Option(None, "--until", help="Only records before this time (epoch seconds or ISO-8601)."),
+) -> None:
+    """Stream matching audit records as JSON lines, oldest first."""
+    if not audit.audit_files(Path(log)):
+        rprint(f"[red]Error:[/red] audit log not found: {log}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    records = audit.read_audit(
+        Path(log),
+        actor=actor,
+        role=role,
+        tool=tool,
+        outcome=outcome,
+        since=_timestamp(since),
+        until=_timestamp(until),
+    )
+    for entry in records:
+        sys.stdout.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def _seconds(value: float) -> str:
+    if math.isnan(value):
+        return "-"
+    if math.isinf(value):
+        return "> max"
+    return f"{value * 1000:.3f} ms"
+
+
+@app.command()
+def stats(
+    url: str = typer.Option("http://localhost:8003/metrics", "--url", "-u", help="Metrics endpoint of a running server."),
+    raw: bool = typer.Option(False, "--raw", help="Print the Prometheus text exposition unchanged."),
+) -> None:
+    """Dump pipeline and sandbox metrics from a running guardflow server."""
+    from rich.console import Console
+    from rich.table import Table
+
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            text = response.read().decode()
+    except (OSError, ValueError) as exc:
+        rprint(f"[red]Error:[/red] cannot fetch metrics from {url} — {exc}", file=sys.stderr)
         raise typer.Exit(code=1)
+    if raw:
+        sys.stdout.write(text)
+        return
+
+    histograms, scalars = metrics.summarize(text)
+    console = Console()
+    latency = Table(title="Latency (p50/p99 are bucket upper bounds)")
+    for column in ("Metric", "Labels", "Count", "Mean", "p50", "p99"):
+        latency.add_column(column, justify="right" if column not in ("Metric", "Labels") else "left")
+    for row in histograms:
+        labels = ",".join(f"{k}={v}" for k, v in row["labels"].items())
+        latency.add_row(
+            row["name"], labels, f"{row['count']:.0f}", _seconds(row["mean"]), _seconds(row["p50"]), _seconds(row["p99"])
+        )
+    console.print(latency)
+    counters = Table(title="Counters and gauges")
+    for column in ("Metric", "Labels", "Value"):
+        counters.add_column(column, justify="right" if column == "Value" else "left")
+    for row in scalars:
+        counters.add_row(row["name"], ",".join(f"{k}={v}" for k, v in row["labels"].items()), f"{row['value']:g}")
+    console.print(counters)
+
+
+@app.command()
+def bench(
+    roles: int = typer.Option(8, "--roles", min=1, help="Synthetic roles."),
+    tools: int = typer.Option(32, "--tools", min=1, help="Synthetic tools (python_exec included)."),
+    rules: int = typer.Option(128, "--rules", min=0, help="Granted (role, tool) rules."),
+    arg_rules: int = typer.Option(
+        3000, "--arg-rules", min=0, help="Argument rule entries (path prefixes, hosts, commands)."
+    ),
+    arg_bytes: int = typer.Option(256, "--arg-bytes", min=0, help="Size of the argument payload per request."),
+    deny_ratio: float = typer.Option(0.2, "--deny-ratio", min=0.0, max=1.0, help="Fraction of requests that are denied."),
+    iterations: int = typer.Option(bench_mod.DEFAULT_ITERATIONS, "--iterations", "-n", min=1, help="Timed ops per stage."),
+    stage: list[str] = typer.Option(
+        list(bench_mod.STAGES), "--stage", "-s", help=f"Stage(s) to run: {', '.join(bench_mod.STAGES)}."
+    ),
+    seed: int = typer.Option(0, "--seed", help="Workload generator seed."),
+    output: str | None = typer.Option(None, "--output", "-o", help="Write results as JSON to this file."),
+    baseline: str | None = typer.Option(None, "--baseline", help="Compare against a previous results file."),
+    threshold: float = typer.Option(
+        bench_mod.DEFAULT_THRESHOLD, "--threshold", min=0.0, help="Allowed relative regression, e.g. 0.1 = 10%."
+    ),
+) -> None:
+    """Benchmark the pipeline stages on a synthetic workload (no Docker needed).
+
+    Exits non-zero if --baseline is given and any stage regressed by more
+    than --threshold in throughput or p99 latency.
+    """
+    from rich.console import Console
+    from rich.table import Table
+
+    baseline_doc = None
+    if baseline is not None:
+        try:
+            baseline_doc = json.loads(Path(baseline).read_text())
+        except (OSError, json.JSONDecodeError) as exc:
+            rprint(f"[red]Error:[/red] cannot read baseline — {exc}", file=sys.stderr)
+            raise typer.Exit(code=1)
+
+    workload = bench_mod.Workload(
+        roles=roles, tools=tools, rules=rules, arg_rules=arg_rules, arg_bytes=arg_bytes, deny_ratio=deny_ratio,
+        seed=seed,
+    )
+    try:
+        results = bench_mod.run_bench(workload, tuple(stage), iterations)
+    except ValueError as exc:
+        rprint(f"[red]Error:[/red] {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+    table = Table(title="guardflow bench")
+    for column in ("Stage", "ops/s", "p50 µs", "p99 µs", "alloc B/op"):
+        table.add_column(column, justify="left" if column == "Stage" else "right")
+    for name, row in results["stages"].items():
+        table.add_row(
+            name, f"{row['ops_per_sec']:,.0f}", f"{row['p50_us']:.1f}", f"{row['p99_us']:.1f}", f"{row['alloc_bytes']:,.0f}"
+        )
+    Console().print(table)
+
+    if output is not None:
+        Path(output).write_text(json.dumps(results, indent=2) + "\n")
+
+    if baseline_doc is not None:
+        if baseline_doc.get("workload") != results["workload"]:
+            rprint("[yellow]Warning:[/yellow] baseline was recorded with a different workload", file=sys.stderr)
+        regressions = bench_mod.compare(results, baseline_doc, threshold)
+        for r in regressions:
+            rprint(
+                f"[red]REGRESSION:[/red] {r.stage} {r.metric} {r.baseline:,.1f} → {r.current:,.1f} ({r.change:+.0%})",
+                file=sys.stderr,
+            )
+        if regressions:
+            raise typer.Exit(code=1)
+        rprint(f"[green]No regressions beyond {threshold:.0%}.[/green]")
+
+
+def _levels(spec: str) -> list[int]:
+    try:
+        levels = sorted({int(part) for part in spec.split(",") if part.strip()})
+    except ValueError:
+        raise typer.BadParameter(f"expected comma-separated integers, got {spec!r}")
+    if not levels or levels[0] < 1:
+        raise typer.BadParameter("concurrency levels must be positive integers")
+    return levels
+
+
+def _env_pairs(pairs: list[str]) -> dict[str, str]:
+    env = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep or not key:
+            raise typer.BadParameter(f"expected KEY=VALUE, got {pair!r}")
+        env[key] = value
+    return env
+
+
+@app.command()
+def loadtest(
+    route: str = typer.Option("authorize", "--route", "-r", help=f"Route to drive: {', '.join(loadtest_mod.ROUTES)}."),
+    concurrency: str = typer.Option(
+        ",".join(map(str, loadtest_mod.DEFAULT_LEVELS)), "--concurrency", "-c", help="Comma-separated concurrency levels."
+    ),
+    duration: float = typer.Option(loadtest_mod.DEFAULT_DURATION, "--duration", "-d", min=0.1, help="Seconds per level."),
+    mode: str = typer.Option("asgi", "--mode", "-m", help="asgi (in-process) or uvicorn (spawned locally)."),
+    workers: list[int] = typer.Option([1], "--workers", "-w", min=1, help="uvicorn worker count; repeat to compare."),
+    env: list[str] = typer.Option([], "--env", "-e", help="KEY=VALUE environment for the spawned uvicorn; repeatable."),
+    url: str | None = typer.Option(None, "--url", help="Drive an already running server at http://host:port instead."),
+    payload: Path | None = typer.Option(None, "--payload", "-p", help="JSON request to send (default: viewer echo)."),
+    batch_size: int = typer.Option(loadtest_mod.DEFAULT_BATCH_SIZE, "--batch-size", min=1, help="Items per batch request."),
+    tolerance: float = typer.Option(
+        loadtest_mod.DEFAULT_TOLERANCE, "--tolerance", min=0.0, max=1.0, help="Knee: within this fraction of peak."
+    ),
+    output: str | None = typer.Option(None, "--output", "-o", help="Write the report as JSON to this file."),
+    warmup: bool = typer.Option(
+        False, "--warmup", help="asgi mode: run the sandbox warmup (pulls and smoke-tests the image) at startup."
+    ),
+) -> None:
+    """Sweep concurrency levels against the HTTP API and find the saturation knee."""
+    from urllib.parse import urlsplit
+
+    from rich.console import Console
+    from rich.table import Table
+
+    if route not in loadtest_mod.ROUTES:
+        rprint(f"[red]Error:[/red] unknown route {route!r}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    if mode not in ("asgi", "uvicorn"):
+        rprint(f"[red]Error:[/red] --mode must be asgi or uvicorn, got {mode!r}", file=sys.stderr)
+        raise typer.Exit(code=1)
+    levels = _levels(concurrency)
+    env_vars = _env_pairs(env)
+    body = loadtest_mod.DEFAULT_REQUEST
+    if payload is not None:
+        try:
+            body = json.loads(payload.read_text())
+        except (OSError, json.JSONDecodeError) as exc:
+            rprint(f"[red]Error:[/red] cannot read payload — {exc}", file=sys.stderr)
+            raise typer.Exit(code=1)
+    kwargs = dict(levels=levels, duration=duration, payload=body, batch_size=batch_size, tolerance=tolerance)
+
+    reports = []
+    try:
+        if url is not None:
+            parts = urlsplit(url)
+            reports.append(loadtest_mod.run_http(route, parts.hostname or "127.0.0.1", parts.port or 80, **kwargs))
+        elif mode == "uvicorn":
+            for count in workers:
+                reports.append(loadtest_mod.run_uvicorn(route, count, env_vars, **kwargs))
+        else:
+            if env_vars:
+                os.environ.update(env_vars)
+            warmup = warmup or env_vars.get("GUARDFLOW_SANDBOX_WARMUP", "0") != "0"
+            reports.append(loadtest_mod.run_asgi(route, warmup=warmup, **kwargs))
+    except (OSError, RuntimeError) as exc:
+        rprint(f"[red]Error:[/red] {exc}", file=sys.stderr)
+        raise typer.Exit(code=1)
+
+    console = Console()
+    for report in reports:
+        target = report["target"]
+        title = f"{route} — {target['mode']}" + (f", {target['workers']} worker(s)" if "workers" in target else "")
+        table = Table(title=title)
+        for column in ("Concurrency", "Requests", "Errors", "req/s", "p50 ms", "p90 ms", "p99 ms", "max ms"):
+            table.add_column(column, justify="right")
+        for row in report["levels"]:
+            marker = " *" if row["concurrency"] == report["knee"] else ""
+            table.add_row(
+                f"{row['concurrency']}{marker}", str(row["requests"]), str(row["errors"]), f"{row['throughput']:,.0f}",
+                f"{row['p50_ms']:.2f}", f"{row['p90_ms']:.2f}", f"{row['p99_ms']:.2f}", f"{row['max_ms']:.2f}",
+            )
+        console.print(table)
+        rprint(f"Knee (*): concurrency {report['knee']}, peak {report['peak_throughput']:,.0f} req/s")
+    if len(reports) > 1:
+        summary = Table(title="Worker comparison")
+        for column in ("Workers", "Knee", "Peak req/s", "p99 ms at knee"):
+            summary.add_column(column, justify="right")
+        for report in reports:
+            at_knee = next((r for r in report["levels"] if r["concurrency"] == report["knee"]), None)
+            summary.add_row(
+                str(report["target"]["workers"]), str(report["knee"]), f"{report['peak_throughput']:,.0f}",
+                f"{at_knee['p99_ms']:.2f}" if at_knee else "-",
+            )
+        console.print(summary)
+
+    if output is not None:
+        Path(output).write_text(json.dumps({"version": 1, "runs": reports}, indent=2) + "\n")
 
 
 if __name__ == "__main__":
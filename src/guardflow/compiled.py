@@ -0,0 +1,272 @@
+"""Compiled policy files: the decision table in a binary form that is loaded with mmap.
+
+``guardflow policy compile`` merges ``policy.json``, ``model.conf`` and
+``rbac_policy.csv`` into one file.  ``CompiledPolicy`` maps that file
+read-only and answers ``decide()`` straight from the mapping, decoding
+only the names that are actually looked up.  Worker processes on a host
+therefore share one page-cached copy.  They also skip building the Casbin
+enforcer and compiling and verifying the table, which is where load time
+goes on large rule sets.
+
+Layout (little-endian; sections start on 8-byte boundaries):
+
+- header — magic, format version, counts, index sizes, the policy content
+  version, section offsets, and a SHA-256 of everything after the header
+- role index and tool index — open-addressing hash tables of ``uint32``
+  slots (CRC-32 of the UTF-8 name, linear probing, at most half full).  A
+  slot holds the role or tool id + 1, or 0 if it is empty
+- grants — one bitmask per role over tool ids, ``mask_words`` ``uint64``
+  words each
+- string offsets — the ``uint32`` start of each name in the string blob,
+  then the blob's length.  Role ``i`` is name ``i`` and tool ``j`` is
+  name ``roles + j``
+- string blob — the UTF-8 names
+- policy — the ``policy.json`` the table was compiled from, which carries
+  the argument and rate-limit rules
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+from pathlib import Path
+
+from guardflow.decisions import (
+    ALLOW, RBAC_DENIED, UNAUTHORIZED_TOOL, DecisionTable, PolicyCompileError, compile_decisions, verify_decisions,
+)
+from guardflow.policy import DEFAULT_POLICY_PATH, Policy, PolicyViolation, policy_version
+from guardflow.rbac import DEFAULT_RBAC_MODEL_PATH, DEFAULT_RBAC_POLICY_PATH, RbacDenial, RbacPolicy
+
+FORMAT_VERSION = 1
+DEFAULT_COMPILED_PATH = Path("policy.bin")
+
+_MAGIC = b"GFPOLICY"
+# magic, format, roles, tools, mask words, role slots, tool slots, version,
+# role index, tool index, grants, string offsets, string blob, policy, policy length, file size, checksum
+_HEADER = struct.Struct("<8s6I16s8Q32s")
+_U32 = struct.Struct("<I")
+_SPAN = struct.Struct("<II")
+_U64 = struct.Struct("<Q")
+
+
+class CompiledPolicyError(Exception):
+    pass
+
+
+def _index_size(count: int) -> int:
+    size = 2
+    while size < 2 * count:
+        size <<= 1
+    return size
+
+
+def _index(names: list[bytes]) -> bytes:
+    size = _index_size(len(names))
+    slots = [0] * size
+    for name_id, name in enumerate(names):
+        slot = zlib.crc32(name) & (size - 1)
+        while slots[slot]:
+            slot = (slot + 1) & (size - 1)
+        slots[slot] = name_id + 1
+    return struct.pack(f"<{size}I", *slots)
+
+
+def _pad(data: bytes) -> bytes:
+    return data + b"\0" * (-len(data) % 8)
+
+
+def dump_compiled(table: DecisionTable, version: str, policy_json: bytes) -> bytes:
+    """Serialize ``table``, labelled with the policy content ``version``, to the compiled format."""
+    roles = [role.encode() for role in table.roles]
+    tools = [tool.encode() for tool in table.tools]
+    mask_words = max(1, (len(tools) + 63) // 64)
+    names = roles + tools
+    offsets, position = [], 0
+    for name in names:
+        offsets.append(position)
+        position += len(name)
+    offsets.append(position)
+    sections = [
+        _pad(_index(roles)),
+        _pad(_index(tools)),
+        b"".join(table.grants(role).to_bytes(8 * mask_words, "little") for role in table.roles),
+        _pad(struct.pack(f"<{len(offsets)}I", *offsets)),
+        _pad(b"".join(names)),
+        policy_json,
+    ]
+    starts, position = [], _HEADER.size
+    for section in sections:
+        starts.append(position)
+        position += len(section)
+    body = b"".join(sections)
+    header = _HEADER.pack(
+        _MAGIC, FORMAT_VERSION, len(roles), len(tools), mask_words,
+        _index_size(len(roles)), _index_size(len(tools)), version.encode(),
+        *starts, len(policy_json), position, hashlib.sha256(body).digest(),
+    )
+    return header + body
+
+
+def compile_policy(
+    output: Path = DEFAULT_COMPILED_PATH,
+    policy_path: Path = DEFAULT_POLICY_PATH,
+    model_path: Path = DEFAULT_RBAC_MODEL_PATH,
+    rbac_policy_path: Path = DEFAULT_RBAC_POLICY_PATH,
+) -> CompiledPolicy:
+    """Compile the three policy files into ``output`` and return it opened.
+
+    The table is checked against Casbin before it is written, and raises
+    ``PolicyCompileError`` if it disagrees or the model can't be compiled.
+    The file is replaced atomically, so processes that still map the old
+    one keep a consistent copy.
+    """
+    policy_bytes = Path(policy_path).read_bytes()
+    model_bytes = Path(model_path).read_bytes()
+    rbac_bytes = Path(rbac_policy_path).read_bytes()
+    version = policy_version(policy_bytes, model_bytes, rbac_bytes)
+    policy = Policy.model_validate(json.loads(policy_bytes))
+    rbac = RbacPolicy.from_text(model_bytes.decode(), rbac_bytes.decode(), version)
+    table = compile_decisions(policy, rbac)
+    mismatches = verify_decisions(table, policy, rbac)
+    if mismatches:
+        raise PolicyCompileError(f"compiled decision table disagrees with Casbin on {len(mismatches)} pairs")
+    data = dump_compiled(table, version, policy_bytes)
+    output = Path(output)
+    fd, tmp = tempfile.mkstemp(dir=output.parent, prefix=f".{output.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, output)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return CompiledPolicy(output)
+
+
+class CompiledPolicy:
+    """A compiled policy file, memory-mapped, with the ``DecisionTable`` lookup interface.
+
+    Names found by a lookup are remembered, so steady-state lookups cost
+    two dict probes and one word read.  The mapping is released when the
+    object is garbage collected or ``close()`` is called.
+    """
+
+    def __init__(self, path: Path, verify: bool = True) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                raise CompiledPolicyError(f"{self.path} is too short to be a compiled policy")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open(verify)
+        except BaseException:
+            self._map.close()
+            raise
+        self._role_ids: dict[str, int] = {}
+        self._tool_ids: dict[str, int] = {}
+
+    def _open(self, verify: bool) -> None:
+        (
+            magic, file_format, self._role_count, self._tool_count, self._mask_words, self._role_slots,
+            self._tool_slots, version, self._role_index, self._tool_index, self._grants_at, self._offsets_at,
+            self._blob_at, self._policy_at, self._policy_len, size, checksum,
+        ) = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise CompiledPolicyError(f"{self.path} is not a compiled policy")
+        if file_format != FORMAT_VERSION:
+            raise CompiledPolicyError(f"{self.path} has format version {file_format}, expected {FORMAT_VERSION}")
+        if size != len(self._map):
+            raise CompiledPolicyError(f"{self.path} is {len(self._map)} bytes, header says {size}")
+        if verify:
+            with memoryview(self._map) as view, view[_HEADER.size:] as body:
+                if hashlib.sha256(body).digest() != checksum:
+                    raise CompiledPolicyError(f"{self.path} failed its checksum")
+        self.version = version.rstrip(b"\0").decode()
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> CompiledPolicy:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _name(self, name_id: int) -> bytes:
+        start, end = _SPAN.unpack_from(self._map, self._offsets_at + 4 * name_id)
+        return self._map[self._blob_at + start:self._blob_at + end]
+
+    def _find(self, name: str, index_at: int, slots: int, first_name: int) -> int:
+        """The id ``name`` has in one of the two indexes, or -1."""
+        try:
+            encoded = name.encode()
+        except UnicodeEncodeError:      # lone surrogates can't have been compiled in
+            return -1
+        view, mask = self._map, slots - 1
+        slot = zlib.crc32(encoded) & mask
+        while True:
+            entry = _U32.unpack_from(view, index_at + 4 * slot)[0]
+            if not entry:
+                return -1
+            if self._name(first_name + entry - 1) == encoded:
+                return entry - 1
+            slot = (slot + 1) & mask
+
+    def _role_id(self, role: str) -> int:
+        role_id = self._role_ids.get(role)
+        if role_id is None:
+            role_id = self._find(role, self._role_index, self._role_slots, 0)
+            if role_id >= 0:
+                self._role_ids[role] = role_id
+        return role_id
+
+    def _tool_id(self, tool: str) -> int:
+        tool_id = self._tool_ids.get(tool)
+        if tool_id is None:
+            tool_id = self._find(tool, self._tool_index, self._tool_slots, self._role_count)
+            if tool_id >= 0:
+                self._tool_ids[tool] = tool_id
+        return tool_id
+
+    @property
+    def roles(self) -> tuple[str, ...]:
+        return tuple(self._name(i).decode() for i in range(self._role_count))
+
+    @property
+    def tools(self) -> tuple[str, ...]:
+        return tuple(self._name(self._role_count + j).decode() for j in range(self._tool_count))
+
+    @property
+    def policy_json(self) -> bytes:
+        """The ``policy.json`` the table was compiled from."""
+        return self._map[self._policy_at:self._policy_at + self._policy_len]
+
+    def grants(self, role: str) -> int:
+        """Return the bitmask of tool ids granted to ``role`` (0 if unknown)."""
+        role_id = self._role_id(role)
+        if role_id < 0:
+            return 0
+        start = self._grants_at + 8 * self._mask_words * role_id
+        return int.from_bytes(self._map[start:start + 8 * self._mask_words], "little")
+
+    def decide(self, role: str, tool: str) -> str:
+        tool_id = self._tool_id(tool)
+        if tool_id < 0:
+            return UNAUTHORIZED_TOOL
+        role_id = self._role_id(role)
+        if role_id < 0:
+            return RBAC_DENIED
+        word = _U64.unpack_from(self._map, self._grants_at + 8 * (self._mask_words * role_id + (tool_id >> 6)))[0]
+        return ALLOW if (word >> (tool_id & 63)) & 1 else RBAC_DENIED
+
+    def check(self, role: str, tool: str) -> None:
+        """Raise the same exceptions as the allowlist and RBAC gates."""
+        decision = self.decide(role, tool)
+        if decision == UNAUTHORIZED_TOOL:
+            raise PolicyViolation(tool)
+        if decision == RBAC_DENIED:
+            raise RbacDenial(role=role, tool=tool)
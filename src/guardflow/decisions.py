@@ -0,0 +1,262 @@
+"""Compiled (role, tool) decision table for the authorize gate.
+
+For plain ACL models the allowlist and the Casbin rules collapse into a
+static matrix, so ``pipeline.authorize`` can answer with two dict lookups and
+a bit test instead of evaluating the Casbin matcher on every call.  Models
+with role inheritance (``g(r.sub, p.sub)``) compile too: the hierarchy is
+flattened into each role's mask at compile time.
+"""
+from __future__ import annotations
+
+import re
+import sys
+from collections.abc import Iterable, Iterator
+
+from guardflow.hierarchy import MAX_ROLE_DEPTH, RoleHierarchy
+from guardflow.policy import Policy, PolicyViolation
+from guardflow.rbac import RbacDenial, RbacPolicy
+
+ALLOW = "ok"
+UNAUTHORIZED_TOOL = "UNAUTHORIZED_TOOL"
+RBAC_DENIED = "RBAC_DENIED"
+
+_ACL_SECTIONS = {
+    ("r", "r"): "sub,act",
+    ("p", "p"): "sub,act",
+    ("e", "e"): "some(where(p_eft==allow))",
+    ("m", "m"): "r_sub==p_sub&&r_act==p_act",
+}
+# The same ACL with single-domain role inheritance.
+_HIERARCHY_SECTIONS = {
+    **_ACL_SECTIONS,
+    ("g", "g"): "_,_",
+    ("m", "m"): "g(r_sub,p_sub)&&r_act==p_act",
+}
+
+
+class PolicyCompileError(Exception):
+    """Raised when a policy cannot be reduced to a static decision table."""
+
+
+class DecisionTable:
+    """Immutable role × tool → reason-code matrix.
+
+    Role and tool names are interned and mapped to dense integer ids; each
+    role's grants are stored as a bitmask over tool ids.  Only allowlisted
+    tools receive an id, so an unknown tool id means ``UNAUTHORIZED_TOOL``.
+    """
+
+    __slots__ = ("_roles", "_tools", "_grants")
+
+    def __init__(self, roles: dict[str, int], tools: dict[str, int], grants: tuple[int, ...]) -> None:
+        self._roles = roles
+        self._tools = tools
+        self._grants = grants
+
+    @property
+    def roles(self) -> tuple[str, ...]:
+        return tuple(self._roles)
+
+    @property
+    def tools(self) -> tuple[str, ...]:
+        return tuple(self._tools)
+
+    def grants(self, role: str) -> int:
+        """Return the bitmask of tool ids granted to ``role`` (0 if unknown)."""
+        role_id = self._roles.get(role)
+        return 0 if role_id is None else self._grants[role_id]
+
+    def decide(self, role: str, tool: str) -> str:
+        tool_id = self._tools.get(tool)
+        if tool_id is None:
+            return UNAUTHORIZED_TOOL
+        role_id = self._roles.get(role)
+        if role_id is None or not (self._grants[role_id] >> tool_id) & 1:
+            return RBAC_DENIED
+        return ALLOW
+
+    def check(self, role: str, tool: str) -> None:
+        """Raise the same exceptions as the allowlist and RBAC gates."""
+        decision = self.decide(role, tool)
+        if decision == UNAUTHORIZED_TOOL:
+            raise PolicyViolation(tool)
+        if decision == RBAC_DENIED:
+            raise RbacDenial(role=role, tool=tool)
+
+
+def _normalize(value: str) -> str:
+    return re.sub(r"\s+", "", value)
+
+
+def check_acl_model(model) -> bool:
+    """Raise ``PolicyCompileError`` unless the Casbin ``model`` is a plain ACL.
+
+    Returns True when the model also has role inheritance (``g = _, _`` and
+    ``g(r.sub, p.sub)`` in the matcher).
+    """
+    sections = {(sec, key) for sec in model.keys() for key in model[sec]}
+    expected_sections = _HIERARCHY_SECTIONS if ("g", "g") in sections else _ACL_SECTIONS
+    if sections != set(expected_sections):
+        raise PolicyCompileError(f"unsupported model sections: {sorted(sections)}")
+    for (sec, key), expected in expected_sections.items():
+        value = _normalize(model[sec][key].value)
+        if value != expected:
+            raise PolicyCompileError(f"model {sec}.{key} = {model[sec][key].value!r} is not a plain ACL")
+    return expected_sections is _HIERARCHY_SECTIONS
+
+
+def _pairs(rules: Iterable[list[str]], fields: str = "(sub, act)") -> list[tuple[str, str]]:
+    pairs = []
+    for rule in rules:
+        if len(rule) != 2:
+            raise PolicyCompileError(f"policy rule {rule!r} does not have exactly {fields} fields")
+        pairs.append((rule[0], rule[1]))
+    return pairs
+
+
+def _acl_rules(rbac: RbacPolicy) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    """``(role, tool)`` grants and ``(member, parent)`` inheritance links of ``rbac``."""
+    hierarchical = check_acl_model(rbac.enforcer.get_model())
+    links = _pairs(rbac.role_links, "(member, parent)") if hierarchical else []
+    return _pairs(rbac.enforcer.get_policy()), links
+
+
+def _tokens(line: str) -> list[str]:
+    """Split a policy line on top-level commas, as Casbin's file adapter does."""
+    if "[" not in line and "(" not in line:
+        return [token.strip() for token in line.split(",")]
+    depth, tokens = 0, [""]
+    for ch in line:
+        if ch in "[(":
+            depth += 1
+        elif ch in "])":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            tokens.append("")
+            continue
+        tokens[-1] += ch
+    return [token.strip() for token in tokens]
+
+
+def parse_policy_rules(text: str) -> Iterator[tuple[str, list[str]]]:
+    """Yield ``(ptype, fields)`` for each rule line of a Casbin policy CSV.
+
+    Reads the text directly instead of building an enforcer, which is much
+    faster for large policies.
+    """
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        tokens = _tokens(line)
+        yield tokens[0], tokens[1:]
+
+
+# One pass over the file: plain "p, role, tool" and "g, member, parent" lines
+# fill the first three groups; any other rule line (brackets, other types,
+# wrong arity) the fourth.
+_ACL_LINE = re.compile(r"^[ \t]*(?:([pg])[ \t]*,([^,\[(\n]*),([^,\[(\n]*)|([^\s#].*))$", re.M)
+
+
+def acl_rules(policy_text: str) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    """``(role, tool)`` grants and ``(member, parent)`` links of a policy CSV, parsed without Casbin."""
+    matches = _ACL_LINE.findall(policy_text)
+    if not any(other for *_, other in matches):
+        pairs, links = [], []
+        for ptype, first, second, _ in matches:
+            (pairs if ptype == "p" else links).append((first.strip(), second.strip()))
+        return pairs, links
+    rules = list(parse_policy_rules(policy_text))
+    return (
+        _pairs(fields for ptype, fields in rules if ptype == "p"),
+        _pairs((fields for ptype, fields in rules if ptype == "g"), "(member, parent)"),
+    )
+
+
+def permission_masks(
+    allowed_tools: Iterable[str],
+    pairs: Iterable[tuple[str, str]],
+    tool_ids: dict[str, int],
+    hierarchy: RoleHierarchy | None = None,
+) -> dict[str, int]:
+    """Map each role to a bitmask over ``tool_ids`` of its allowlisted grants.
+
+    ``tool_ids`` must give an id to every allowlisted tool; sharing one
+    index between two policies makes their masks directly comparable.  With
+    a ``hierarchy``, masks include inherited grants and cover every role
+    named by an inheritance link.
+    """
+    allowed = frozenset(allowed_tools)
+    granted: dict[str, list[int]] = {}
+    for role, tool in pairs:
+        ids = granted.get(role)
+        if ids is None:
+            ids = granted[role] = []
+        if tool in allowed:
+            ids.append(tool_ids[tool])
+    # Set bits in a byte buffer and convert once, rather than growing a big int per grant.
+    width = (len(tool_ids) + 7) // 8
+    masks = {}
+    for role, ids in granted.items():
+        bitmap = bytearray(width)
+        for tool_id in ids:
+            bitmap[tool_id >> 3] |= 1 << (tool_id & 7)
+        masks[role] = int.from_bytes(bitmap, "little")
+    return hierarchy.flatten(masks) if hierarchy is not None else masks
+
+
+def role_hierarchy(links: list[tuple[str, str]]) -> RoleHierarchy | None:
+    """The hierarchy of the ``g`` rule ``links``, or None if there are none.
+
+    Raises ``PolicyCompileError`` if it is deeper than ``MAX_ROLE_DEPTH``.
+    """
+    if not links:
+        return None
+    hierarchy = RoleHierarchy(links)
+    if hierarchy.depth > MAX_ROLE_DEPTH:
+        raise PolicyCompileError(f"role hierarchy is {hierarchy.depth} levels deep (limit {MAX_ROLE_DEPTH})")
+    return hierarchy
+
+
+def compile_decisions(policy: Policy, rbac: RbacPolicy) -> DecisionTable:
+    """Merge the allowlist and a plain-ACL RBAC policy into a ``DecisionTable``.
+
+    Raises ``PolicyCompileError`` if the Casbin model uses anything beyond
+    ``r.sub == p.sub && r.act == p.act`` (or ``g(r.sub, p.sub)`` with
+    ``g = _, _``); callers should fall back to ``RbacPolicy`` enforcement in
+    that case.
+    """
+    tools: dict[str, int] = {}
+    for tool in policy.allowed_tools:
+        tools.setdefault(sys.intern(tool), len(tools))
+
+    pairs, links = _acl_rules(rbac)
+    hierarchy = role_hierarchy(links)
+    masks = permission_masks(tools, pairs, tools, hierarchy)
+    roles = {sys.intern(role): role_id for role_id, role in enumerate(masks)}
+    return DecisionTable(roles, tools, tuple(masks.values()))
+
+
+def verify_decisions(table: DecisionTable, policy: Policy, rbac: RbacPolicy) -> list[tuple[str, str, str, str]]:
+    """Compare ``table`` with the allowlist + Casbin enforcer for every known pair.
+
+    Every role and tool named in either policy file is checked, plus an
+    unknown role and tool.  Returns ``(role, tool, expected, actual)`` for each
+    mismatch; an empty list means the table is equivalent.
+    """
+    rules = rbac.enforcer.get_policy()
+    roles = {rule[0] for rule in rules} | {name for link in rbac.role_links for name in link} | {""}
+    tools = set(policy.allowed_tools) | {rule[-1] for rule in rules} | {""}
+    mismatches = []
+    for role in sorted(roles):
+        for tool in sorted(tools):
+            if not policy.is_allowed(tool):
+                expected = UNAUTHORIZED_TOOL
+            elif not rbac.enforcer.enforce(role, tool):
+                expected = RBAC_DENIED
+            else:
+                expected = ALLOW
+            actual = table.decide(role, tool)
+            if actual != expected:
+                mismatches.append((role, tool, expected, actual))
+    return mismatches
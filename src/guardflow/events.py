@@ -0,0 +1,201 @@
+"""Structured, sampled pipeline event logging with deferred formatting.
+
+``emit()`` costs the same whatever the request size: it checks the level
+and the stage's sample rate, then logs an ``Event`` that keeps a reference
+to the request.  The request is only summarised — argument values
+truncated, secret-looking keys redacted — when a handler formats the
+record.  With ``install_queue_handler()`` that happens on the listener
+thread, not the request path.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from collections.abc import Callable, Mapping
+
+from pydantic import BaseModel
+
+EVENT_LOGGER = "guardflow.events"
+DEFAULT_MAX_VALUE_CHARS = 200
+DEFAULT_MAX_ITEMS = 20        # keys / list items shown per container
+DEFAULT_REDACT_KEYS = frozenset({"password", "passwd", "secret", "token", "api_key", "apikey", "authorization"})
+REDACTED = "[redacted]"
+
+
+class Event:
+    """A pipeline event whose summary is built only when it is formatted."""
+
+    __slots__ = ("stage", "payload", "fields", "_summarizer")
+
+    def __init__(self, stage: str, payload, fields: dict, summarizer: "Summarizer") -> None:
+        self.stage = stage
+        self.payload = payload
+        self.fields = fields
+        self._summarizer = summarizer
+
+    def to_dict(self) -> dict:
+        return {"event": f"pipeline.{self.stage}", **self._summarizer.summarize(self.payload), **self.fields}
+
+    def __str__(self) -> str:
+        return json.dumps(self.to_dict(), default=str, ensure_ascii=False)
+
+
+class Summarizer:
+    """Turns a request (model or raw dict) into a small, redacted dict."""
+
+    def __init__(
+        self,
+        max_value_chars: int = DEFAULT_MAX_VALUE_CHARS,
+        max_items: int = DEFAULT_MAX_ITEMS,
+        redact_keys: frozenset[str] = DEFAULT_REDACT_KEYS,
+    ) -> None:
+        self.max_value_chars = max_value_chars
+        self.max_items = max_items
+        self.redact_keys = frozenset(k.lower() for k in redact_keys)
+
+    def summarize(self, payload) -> dict:
+        if isinstance(payload, BaseModel):
+            payload = payload.model_dump()
+        elif isinstance(payload, (str, bytes, bytearray)):
+            # Raw request body: parsed here, on the formatting thread, not by emit().
+            try:
+                payload = json.loads(payload)
+            except ValueError:
+                return {"payload": self.value(payload if isinstance(payload, str) else repr(bytes(payload)))}
+        if not isinstance(payload, Mapping):
+            return {"payload": self.value(payload)}
+        actor = payload.get("actor")
+        tool_call = payload.get("tool_call")
+        actor = actor if isinstance(actor, Mapping) else {}
+        tool_call = tool_call if isinstance(tool_call, Mapping) else {}
+        return {
+            "actor": self.value(actor.get("id")),
+            "role": self.value(actor.get("role")),
+            "tool": self.value(tool_call.get("tool")),
+            "args": self.value(tool_call.get("args")),
+        }
+
+    def value(self, value, depth: int = 0):
+        if isinstance(value, str):
+            if len(value) > self.max_value_chars:
+                return f"{value[:self.max_value_chars]}…[+{len(value) - self.max_value_chars} chars]"
+            return value
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if depth >= 3:
+            return f"<{type(value).__name__}>"
+        if isinstance(value, Mapping):
+            out = {}
+            for i, (key, item) in enumerate(value.items()):
+                if i == self.max_items:
+                    out["…"] = f"+{len(value) - i} keys"
+                    break
+                key = str(key)
+                out[key] = REDACTED if key.lower() in self.redact_keys else self.value(item, depth + 1)
+            return out
+        if isinstance(value, (list, tuple)):
+            out = [self.value(item, depth + 1) for item in value[:self.max_items]]
+            if len(value) > self.max_items:
+                out.append(f"…+{len(value) - self.max_items} items")
+            return out
+        return self.value(repr(value), depth)
+
+
+class EventLogger:
+    """Emits sampled ``Event`` records for the pipeline stages.
+
+    ``sample_rates`` maps a stage name to the fraction of its events kept
+    (default 1.0).  Events are logged at INFO on ``guardflow.events``.
+    """
+
+    def __init__(
+        self,
+        sample_rates: Mapping[str, float] | None = None,
+        summarizer: Summarizer | None = None,
+        logger: logging.Logger | None = None,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.sample_rates = dict(sample_rates or {})
+        self.summarizer = summarizer or Summarizer()
+        self.logger = logger or logging.getLogger(EVENT_LOGGER)
+        self._rng = rng
+
+    def emit(self, stage: str, payload, **fields) -> None:
+        if not self.logger.isEnabledFor(logging.INFO):
+            return
+        rate = self.sample_rates.get(stage, 1.0)
+        if rate < 1.0 and self._rng() >= rate:
+            return
+        self.logger.info("%s", Event(stage, payload, fields, self.summarizer))
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parse ``"validate=0.01,authorize=0.1"`` into a stage → rate mapping."""
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        stage, sep, rate = part.partition("=")
+        if not sep:
+            raise ValueError(f"expected stage=rate, got {part!r}")
+        value = float(rate)
+        if not 0.0 <= value <= 1.0:
+            raise ValueError(f"sample rate for {stage!r} must be between 0 and 1")
+        rates[stage.strip()] = value
+    return rates
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """A ``QueueHandler`` that leaves formatting to the listener thread.
+
+    The stock ``prepare()`` formats the message in the caller, which is
+    exactly the cost this module moves off the request path.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def install_queue_handler(*handlers: logging.Handler) -> logging.handlers.QueueListener:
+    """Route ``guardflow.events`` through a queue to ``handlers`` on a listener thread.
+
+    Without handlers, the root logger's handlers are used, or stderr if
+    it has none.  Call ``stop()`` on the returned listener to flush.
+    """
+    if not handlers:
+        handlers = tuple(logging.getLogger().handlers) or (logging.StreamHandler(sys.stderr),)
+    events_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger = logging.getLogger(EVENT_LOGGER)
+    for handler in [h for h in logger.handlers if isinstance(h, _DeferredQueueHandler)]:
+        logger.removeHandler(handler)
+    logger.addHandler(_DeferredQueueHandler(events_queue))
+    logger.propagate = False
+    listener = logging.handlers.QueueListener(events_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def uninstall_queue_handler(listener: logging.handlers.QueueListener) -> None:
+    """Stop ``listener`` (flushing queued events) and restore normal propagation."""
+    listener.stop()
+    logger = logging.getLogger(EVENT_LOGGER)
+    for handler in [h for h in logger.handlers if isinstance(h, _DeferredQueueHandler)]:
+        logger.removeHandler(handler)
+    logger.propagate = True
+
+
+events = EventLogger()
+
+
+def configure(sample_rates: Mapping[str, float] | None = None, summarizer: Summarizer | None = None) -> None:
+    """Replace the sampling rates and/or summarizer of the module-level ``events``."""
+    if sample_rates is not None:
+        events.sample_rates = dict(sample_rates)
+    if summarizer is not None:
+        events.summarizer = summarizer
+
+
+def emit(stage: str, payload, **fields) -> None:
+    events.emit(stage, payload, **fields)
@@ -0,0 +1,275 @@
+"""Seeded adversarial fuzzing of the guardrails (``guardflow redteam fuzz``).
+
+Each generated case is a ``RedteamCase``: a payload from the hand-written
+suite with one to three mutations applied, plus the outcome the gates must
+produce for it.  Validation runs before the allowlist and the allowlist
+before RBAC, so the earliest gate a mutation trips decides the expected
+outcome:
+
+- ``confusable_tool`` changes the tool name with a homoglyph, a fullwidth
+  form, a zero-width or combining character, or a case or whitespace change
+  (``UNAUTHORIZED_TOOL``).
+- ``nested_extra`` adds a field to the request, actor or tool call
+  (``SCHEMA_REJECTED``), or buries shadowing keys such as ``role`` deep
+  inside ``args`` (outcome unchanged).
+- ``huge_args`` adds argument strings of up to 1 MiB, thousands of keys or
+  deep nesting (outcome unchanged).
+- ``role_case`` applies the same kinds of variant to the role
+  (``RBAC_DENIED``).
+
+Case ``i`` of seed ``s`` is always the same, so a worker process rebuilds
+its share of the corpus from ``(seed, start, stop)`` instead of receiving
+payloads.  The generator assumes the policy spells tools and roles exactly
+as the base cases do.
+"""
+from __future__ import annotations
+
+import copy
+import random
+from collections import Counter
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from guardflow.batch import DEFAULT_WINDOW, ordered_imap
+from guardflow.redteam import REDTEAM_CASES, RedteamCase, _run_case, init_worker, worker_snapshot
+from guardflow.snapshot import PolicySnapshot
+
+DEFAULT_COUNT = 10_000
+DEFAULT_CHUNK_SIZE = 500        # cases per worker task
+DETAIL_LIMIT = 200              # characters of error detail kept per result
+
+# Earliest gate first: the expected outcome of a mutated case is the
+# earliest of its base outcome and every outcome its mutations force.
+GATE_ORDER = ("SCHEMA_REJECTED", "UNAUTHORIZED_TOOL", "RBAC_DENIED", "ARGUMENT_DENIED", "RATE_LIMITED", "SANDBOX_ERROR", "ok")
+
+HOMOGLYPHS = {
+    "a": "\u0430", "c": "\u0441", "e": "\u0435", "h": "\u04bb", "i": "\u0456", "l": "\u217c",
+    "o": "\u043e", "p": "\u0440", "s": "\u0455", "x": "\u0445", "y": "\u0443", "_": "\uff3f",
+}
+INVISIBLE = ("\u200b", "\u200c", "\u200d", "\u2060", "\ufeff", "\u00ad")
+SHADOW_KEYS = ("role", "tool", "admin", "roles", "allowed_tools", "__proto__", "$where", "actor", "tool_call")
+SHADOW_VALUES = (True, "admin", {"role": "admin"}, ["python_exec"], None)
+HUGE_SIZES = (16 * 1024, 256 * 1024, 1024 * 1024)
+# Wide argument dicts are built once and copied in; building them per case dominated the run time.
+_WIDE_ARGS = {n: {f"k{i}": i for i in range(n)} for n in (1_000, 10_000)}
+
+
+def _variant(rng: random.Random, text: str) -> str:
+    """A string that differs from ``text`` but reads like it."""
+    for _ in range(8):
+        kind = rng.randrange(6)
+        if kind == 0:
+            spots = [i for i, ch in enumerate(text) if ch in HOMOGLYPHS]
+            if not spots:
+                continue
+            i = rng.choice(spots)
+            out = text[:i] + HOMOGLYPHS[text[i]] + text[i + 1:]
+        elif kind == 1:
+            out = "".join(chr(ord(ch) + 0xFEE0) if "!" <= ch <= "~" else ch for ch in text)
+        elif kind == 2:
+            i = rng.randint(0, len(text))
+            out = text[:i] + rng.choice(INVISIBLE) + text[i:]
+        elif kind == 3:
+            i = rng.randint(1, max(1, len(text)))
+            out = text[:i] + "\u0301" + text[i:]
+        elif kind == 4:
+            out = rng.choice((str.upper, str.title, str.swapcase, str.capitalize))(text)
+        else:
+            out = rng.choice((" {}", "{} ", "{}\t", "{}\n", "{}\x00")).format(text)
+        if out != text:
+            return out
+    return text + "\u200b"
+
+
+def _args(payload: dict) -> dict | None:
+    call = payload.get("tool_call")
+    args = call.get("args") if isinstance(call, dict) else None
+    return args if isinstance(args, dict) else None
+
+
+def confusable_tool(rng: random.Random, payload: dict) -> str | None:
+    call = payload.get("tool_call")
+    if not isinstance(call, dict) or not isinstance(call.get("tool"), str):
+        return None
+    call["tool"] = _variant(rng, call["tool"])
+    return "UNAUTHORIZED_TOOL"
+
+
+def role_case(rng: random.Random, payload: dict) -> str | None:
+    actor = payload.get("actor")
+    if not isinstance(actor, dict) or not isinstance(actor.get("role"), str):
+        return None
+    actor["role"] = _variant(rng, actor["role"])
+    return "RBAC_DENIED"
+
+
+def nested_extra(rng: random.Random, payload: dict) -> str | None:
+    value = copy.deepcopy(rng.choice(SHADOW_VALUES))
+    target = rng.randrange(4)
+    args = _args(payload)
+    if target == 3 and args is not None:
+        # ``args`` is free-form: shadowing keys inside it must not change the decision.
+        node = args
+        for _ in range(rng.randint(0, 8)):
+            node["nested"] = {}
+            node = node["nested"]
+        node[rng.choice(SHADOW_KEYS)] = value
+        return None
+    container = payload.get(("actor", "tool_call")[target - 1]) if target in (1, 2) else payload
+    if not isinstance(container, dict):
+        container = payload
+    container[rng.choice([k for k in SHADOW_KEYS if k not in container])] = value
+    return "SCHEMA_REJECTED"
+
+
+def huge_args(rng: random.Random, payload: dict) -> str | None:
+    args = _args(payload)
+    if args is None:
+        return None
+    kind = rng.randrange(3)
+    if kind == 0:
+        size = rng.choice(HUGE_SIZES)
+        char = rng.choice(("x", "\u00e9", "\U0001f600"))
+        args["blob"] = char * (size // len(char.encode()))
+    elif kind == 1:
+        args.update(_WIDE_ARGS[rng.choice(sorted(_WIDE_ARGS))])
+    else:
+        node = args
+        for _ in range(rng.randint(32, 64)):
+            node["deep"] = {}
+            node = node["deep"]
+    return None
+
+
+MUTATIONS: dict[str, Callable[[random.Random, dict], str | None]] = {
+    "confusable_tool": confusable_tool,
+    "nested_extra": nested_extra,
+    "huge_args": huge_args,
+    "role_case": role_case,
+}
+
+
+def fuzz_case(seed: int, index: int, base: Sequence[RedteamCase] = REDTEAM_CASES) -> RedteamCase:
+    """Case ``index`` of the corpus for ``seed``; the same inputs always give the same case."""
+    rng = random.Random(f"{seed}:{index}")
+    source = base[rng.randrange(len(base))]
+    payload = copy.deepcopy(source.payload)
+    names = sorted(rng.sample(sorted(MUTATIONS), rng.randint(1, 3)))
+    expected = source.expected
+    for name in names:
+        forced = MUTATIONS[name](rng, payload)
+        if forced is not None:
+            expected = min(expected, forced, key=GATE_ORDER.index)
+    return RedteamCase(
+        name=f"fuzz-{seed}-{index}",
+        description=f"{source.name} + {', '.join(names)}",
+        payload=payload,
+        expected=expected,
+        tags=tuple(names),
+    )
+
+
+def generate(count: int, seed: int = 0, start: int = 0) -> Iterator[RedteamCase]:
+    """Lazily yield cases ``start`` .. ``start + count - 1`` for ``seed``."""
+    for index in range(start, start + count):
+        yield fuzz_case(seed, index)
+
+
+@dataclass
+class FuzzResult:
+    """Outcome of one fuzz case, without its (possibly huge) payload."""
+
+    name: str
+    description: str
+    tags: tuple[str, ...]
+    expected: str
+    actual: str
+    passed: bool
+    detail: str = ""
+
+    @property
+    def failure_class(self) -> str:
+        return f"{'+'.join(self.tags)}: expected {self.expected}, got {self.actual}"
+
+
+class FuzzSummary:
+    """Running pass/fail counts per mutation and per failure class."""
+
+    def __init__(self) -> None:
+        self.total = 0
+        self.failed = 0
+        self.cases_by_tag: Counter[str] = Counter()
+        self.failures_by_tag: Counter[str] = Counter()
+        self.failure_classes: Counter[str] = Counter()
+        self.examples: dict[str, str] = {}
+
+    def add(self, result: FuzzResult) -> None:
+        self.total += 1
+        self.cases_by_tag.update(result.tags)
+        if result.passed:
+            return
+        self.failed += 1
+        self.failures_by_tag.update(result.tags)
+        self.failure_classes[result.failure_class] += 1
+        self.examples.setdefault(result.failure_class, result.name)
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "passed": self.total - self.failed,
+            "failed": self.failed,
+            "mutations": {
+                tag: {"cases": n, "failed": self.failures_by_tag[tag]} for tag, n in sorted(self.cases_by_tag.items())
+            },
+            "failure_classes": [
+                {"class": cls, "count": n, "example": self.examples[cls]}
+                for cls, n in self.failure_classes.most_common()
+            ],
+        }
+
+
+def check_case(case: RedteamCase, snapshot: PolicySnapshot) -> FuzzResult:
+    result = _run_case(case, snapshot.policy, snapshot.rbac, snapshot.decisions)
+    return FuzzResult(
+        name=case.name,
+        description=case.description,
+        tags=case.tags,
+        expected=case.expected,
+        actual=result.actual,
+        passed=result.passed,
+        detail="" if result.passed else result.detail[:DETAIL_LIMIT],
+    )
+
+
+def _check_range(task: tuple[int, int, int], snapshot: PolicySnapshot | None = None) -> list[FuzzResult]:
+    seed, start, stop = task
+    snapshot = snapshot or worker_snapshot()
+    return [check_case(fuzz_case(seed, index), snapshot) for index in range(start, stop)]
+
+
+def run_fuzz(
+    count: int,
+    policy_path: Path,
+    model_path: Path,
+    rbac_policy_path: Path,
+    seed: int = 0,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[FuzzResult]:
+    """Generate and check ``count`` cases, yielding results in case order.
+
+    With ``workers > 1`` index ranges are spread over a process pool whose
+    workers each load the policy once and build their own cases.
+    """
+    paths = (Path(policy_path), Path(model_path), Path(rbac_policy_path))
+    tasks = ((seed, start, min(start + chunk_size, count)) for start in range(0, count, chunk_size))
+    if workers <= 1:
+        snapshot = PolicySnapshot.load(*paths)
+        for task in tasks:
+            yield from _check_range(task, snapshot)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(paths,)) as executor:
+        for results in ordered_imap(executor, _check_range, tasks, workers * DEFAULT_WINDOW):
+            yield from results
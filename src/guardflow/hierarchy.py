@@ -0,0 +1,150 @@
+"""Role inheritance (Casbin ``g`` rules) flattened into a transitive closure.
+
+A rule ``g, admin, operator`` makes ``admin`` inherit every grant of
+``operator``, and through it every grant of roles that ``operator``
+inherits.  ``RoleHierarchy`` works this out once at load time: the rules
+are condensed into strongly connected components (roles in a cycle share
+all their grants, as they do under Casbin).  The components are then
+visited parents-first, so each role's set of ancestors is one bitmask
+union per edge.  ``flatten()`` turns per-role grant masks into effective
+masks.  The compiled decision table therefore answers for a role in a deep
+hierarchy with the same single bit test as for a flat one, with no graph
+walk per request.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+# Casbin stops following role links after ``max_hierarchy_level`` hops (10 by
+# default); ``RbacPolicy`` raises its limit to this so deep hierarchies resolve.
+MAX_ROLE_DEPTH = 100
+
+
+class RoleHierarchy:
+    """Transitive closure of ``(member, parent)`` inheritance links."""
+
+    def __init__(self, links: Iterable[tuple[str, str]]) -> None:
+        ids: dict[str, int] = {}
+        parents: list[list[int]] = []
+        for member, parent in links:
+            for name in (member, parent):
+                if name not in ids:
+                    ids[name] = len(parents)
+                    parents.append([])
+            parents[ids[member]].append(ids[parent])
+        self._ids = ids
+        self._names = list(ids)
+        self._parents = parents
+        self.links = sum(len(p) for p in parents)
+        self._components, self._component_of = _strongly_connected(parents)
+
+        # Tarjan emits a component only after every component it can reach,
+        # i.e. parents before members, so one pass in emission order suffices.
+        ancestors: list[int] = []
+        depth: list[int] = []
+        for index, members in enumerate(self._components):
+            mask, level = 0, 0
+            for role_id in members:
+                mask |= 1 << role_id
+                for parent in parents[role_id]:
+                    other = self._component_of[parent]
+                    if other != index:
+                        mask |= ancestors[other]
+                        level = max(level, depth[other] + 1)
+            ancestors.append(mask)
+            depth.append(level)
+        self._ancestors = ancestors
+        self.depth = max(depth, default=0)
+
+    @property
+    def roles(self) -> tuple[str, ...]:
+        return tuple(self._names)
+
+    @property
+    def cycles(self) -> list[list[str]]:
+        """Groups of roles that inherit from each other, including self-links."""
+        found = []
+        for members in self._components:
+            if len(members) > 1 or members[0] in self._parents[members[0]]:
+                found.append(sorted(self._names[i] for i in members))
+        return sorted(found)
+
+    @property
+    def closure_size(self) -> int:
+        """Number of (role, inherited role) pairs in the closure, excluding each role itself."""
+        return sum(self._ancestors[self._component_of[i]].bit_count() - 1 for i in range(len(self._names)))
+
+    def ancestors(self, role: str) -> frozenset[str]:
+        """``role`` and every role it inherits from."""
+        role_id = self._ids.get(role)
+        if role_id is None:
+            return frozenset((role,))
+        mask = self._ancestors[self._component_of[role_id]]
+        return frozenset(self._names[i] for i in range(len(self._names)) if (mask >> i) & 1)
+
+    def flatten(self, masks: dict[str, int]) -> dict[str, int]:
+        """Effective grant masks: each role's own mask OR-ed with those of all its ancestors.
+
+        Covers every role in ``masks`` and every role named by a link.
+        """
+        own = [masks.get(name, 0) for name in self._names]
+        inherited: list[int] = []
+        for index, members in enumerate(self._components):
+            mask = 0
+            for role_id in members:
+                mask |= own[role_id]
+                for parent in self._parents[role_id]:
+                    other = self._component_of[parent]
+                    if other != index:
+                        mask |= inherited[other]
+            inherited.append(mask)
+        flat = dict(masks)
+        for role_id, name in enumerate(self._names):
+            flat[name] = inherited[self._component_of[role_id]]
+        return flat
+
+
+def _strongly_connected(edges: list[list[int]]) -> tuple[list[list[int]], list[int]]:
+    """Iterative Tarjan: components in reverse topological order, and each node's component."""
+    count = len(edges)
+    index_of = [-1] * count
+    low = [0] * count
+    on_stack = [False] * count
+    component_of = [-1] * count
+    stack: list[int] = []
+    components: list[list[int]] = []
+    counter = 0
+    for root in range(count):
+        if index_of[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, position = work.pop()
+            if position == 0:
+                index_of[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            for i in range(position, len(edges[node])):
+                child = edges[node][i]
+                if index_of[child] == -1:
+                    work.append((node, i + 1))
+                    work.append((child, 0))
+                    break
+                if on_stack[child]:
+                    low[node] = min(low[node], index_of[child])
+            else:
+                if low[node] == index_of[node]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component_of[member] = len(components)
+                        members.append(member)
+                        if member == node:
+                            break
+                    components.append(members)
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+    return components, component_of
@@ -0,0 +1,212 @@
+"""In-process job queue for asynchronous tool execution (``POST /execute``)."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from guardflow.batch import error_for
+from guardflow.models import RunRequest
+from guardflow.pipeline import execute, record_outcome
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_PENDING = 256       # queued + running jobs
+DEFAULT_MAX_RESULTS = 1024      # jobs kept in the store, finished or not
+DEFAULT_RESULT_TTL = 600.0      # seconds a finished job stays retrievable
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueueFull(Exception):
+    def __init__(self, pending: int, retry_after: float) -> None:
+        self.pending = pending
+        self.retry_after = retry_after
+        super().__init__(f"job queue is full ({pending} pending)")
+
+
+@dataclass
+class Job:
+    id: str
+    request: RunRequest
+    status: str = QUEUED
+    result: dict | None = None
+    error: dict | None = None
+    created_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    version: str = ""           # policy version and stage timings the outcome is recorded with
+    timings: dict[str, float] = field(default_factory=dict, repr=False)
+    _waiters: list = field(default_factory=list, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "tool": self.request.tool_call.tool,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """Runs authorized requests on a worker thread pool and keeps their results.
+
+    ``submit()`` returns immediately.  At most ``max_pending`` jobs may be
+    queued or running; beyond that ``submit()`` raises ``JobQueueFull``.
+    The store holds at most ``max_results`` jobs: the oldest finished jobs
+    are evicted first, and finished jobs expire after ``result_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+        max_results: int = DEFAULT_MAX_RESULTS,
+        result_ttl: float = DEFAULT_RESULT_TTL,
+    ) -> None:
+        if max_results < max_pending:
+            raise ValueError("max_results must be at least max_pending")
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_results = max_results
+        self.result_ttl = result_ttl
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        # ids of finished jobs in finishing order, which is also expiry order
+        self._finished: OrderedDict[str, None] = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+        self.submitted = 0
+        self.evicted = 0
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="guardflow-job")
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "stored": len(self._jobs),
+                "submitted": self.submitted,
+                "evicted": self.evicted,
+            }
+
+    def submit(self, request: RunRequest, version: str = "", timings: dict[str, float] | None = None) -> Job:
+        """Queue an already-authorized request for execution.
+
+        Its outcome is recorded when it finishes, labelled with the policy
+        ``version`` and added to the ``timings`` of the earlier stages.
+        """
+        self.start()
+        job = Job(id=uuid.uuid4().hex, request=request, version=version, timings=dict(timings or {}))
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(self._pending, retry_after=1.0)
+            self._evict(time.time())
+            self._jobs[job.id] = job
+            self._pending += 1
+            self.submitted += 1
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.finished and time.time() - job.finished_at > self.result_ttl:
+                del self._jobs[job_id]
+                del self._finished[job_id]
+                self.evicted += 1
+                return None
+            return job
+
+    async def wait(self, job: Job, timeout: float) -> Job:
+        """Wait up to ``timeout`` seconds for ``job`` to finish without holding a thread."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if job.finished:
+                return job
+            job._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                if (loop, future) in job._waiters:
+                    job._waiters.remove((loop, future))
+        return job
+
+    # -- internals ---------------------------------------------------------
+
+    def _evict(self, now: float) -> None:
+        """Drop expired jobs, then the oldest finished ones until there is room. Lock held.
+
+        Both come off the front of ``_finished``, so this costs O(1) per
+        job dropped rather than a scan of the store.
+        """
+        finished, jobs = self._finished, self._jobs
+        while finished:
+            job_id = next(iter(finished))
+            if now - jobs[job_id].finished_at <= self.result_ttl and len(jobs) < self.max_results:
+                return
+            del finished[job_id]
+            del jobs[job_id]
+            self.evicted += 1
+
+    def _run(self, job: Job) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        started = time.perf_counter()
+        failure = None
+        try:
+            job.result = execute(job.request).model_dump()
+            status = SUCCEEDED
+        except Exception as exc:
+            failure = exc
+            err = error_for(exc)
+            if err is None:
+                logger.exception("job %s failed", job.id)
+                job.error = {"code": "INTERNAL_ERROR", "detail": str(exc)}
+            else:
+                job.error = err.model_dump()
+            status = FAILED
+        job.timings["execute"] = time.perf_counter() - started
+        record_outcome(job.request, failure, job.version, job.timings)
+        with self._lock:
+            job.finished_at = time.time()
+            job.status = status
+            self._finished[job.id] = None
+            self._pending -= 1
+            waiters, job._waiters = job._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
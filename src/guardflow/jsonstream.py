@@ -0,0 +1,179 @@
+"""Incremental parsing of JSON-array and NDJSON request bodies."""
+from __future__ import annotations
+
+import codecs
+import json
+
+DEFAULT_MAX_ITEM_BYTES = 1 << 20   # 1 MiB per item
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = ",]" + _WHITESPACE
+
+
+class JsonStreamError(ValueError):
+    """A malformed item or stream, reported in place of the item."""
+
+
+class JsonItemParser:
+    """Push parser yielding the items of a JSON array or NDJSON stream.
+
+    Feed raw bytes as they arrive; ``feed()`` and ``close()`` return the items
+    completed so far, so memory is bounded by the largest single item rather
+    than the whole body.  The format is detected from the first non-blank
+    character: ``[`` means a JSON array, anything else is NDJSON.
+
+    Malformed input is returned in-line as a ``JsonStreamError`` item so the
+    caller can report it at the right position.  A bad NDJSON line only
+    affects that line; a malformed JSON array cannot be resynchronised, so
+    its error is the last item and any further input is ignored.  Invalid
+    UTF-8 ends the stream the same way, after the items that precede it.
+    """
+
+    def __init__(self, max_item_bytes: int = DEFAULT_MAX_ITEM_BYTES) -> None:
+        self.max_item_bytes = max_item_bytes
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._mode: str | None = None     # "array" | "ndjson"
+        self._array_state = "open"        # "open" | "first" | "item" | "sep" | "done" | "failed"
+        self._stalled = 0                 # buffered chars when an array item last failed to parse
+        self._skipping = False            # inside an oversized NDJSON line
+        self._undecodable = False         # invalid UTF-8 was seen; the rest of the stream is ignored
+
+    def feed(self, chunk: bytes) -> list:
+        if self._undecodable:
+            return []
+        try:
+            self._buf += self._decoder.decode(chunk)
+        except UnicodeDecodeError as exc:
+            return self._invalid_utf8(exc)
+        return self._drain(final=False)
+
+    def close(self) -> list:
+        if self._undecodable:
+            return []
+        try:
+            self._buf += self._decoder.decode(b"", final=True)
+        except UnicodeDecodeError as exc:
+            return self._invalid_utf8(exc)
+        items = self._drain(final=True)
+        if self._mode == "array" and self._array_state not in ("done", "failed"):
+            items.append(JsonStreamError("unterminated JSON array"))
+        return items
+
+    def _invalid_utf8(self, exc: UnicodeDecodeError) -> list:
+        """Emit the items completed before the undecodable bytes, then the error."""
+        self._buf += exc.object[:exc.start].decode("utf-8")
+        items = self._drain(final=False)
+        if self._mode != "array" or self._array_state != "failed":
+            items.append(JsonStreamError(f"invalid UTF-8 in request body: {exc.reason}"))
+        self._undecodable = True
+        self._buf = ""
+        return items
+
+    def _drain(self, final: bool) -> list:
+        if self._mode is None:
+            stripped = self._buf.lstrip(_WHITESPACE)
+            if not stripped:
+                self._buf = ""
+                return []
+            self._mode = "array" if stripped[0] == "[" else "ndjson"
+            self._buf = stripped
+        if self._mode == "ndjson":
+            return self._drain_ndjson(final)
+        return self._drain_array(final)
+
+    def _drain_ndjson(self, final: bool) -> list:
+        items = []
+        if self._skipping:
+            # Discard the rest of an oversized line up to its newline.
+            newline = self._buf.find("\n")
+            if newline < 0:
+                self._buf = ""
+                return items
+            self._buf = self._buf[newline + 1:]
+            self._skipping = False
+        *lines, self._buf = self._buf.split("\n")
+        if final:
+            lines.append(self._buf)
+            self._buf = ""
+        too_long = JsonStreamError(f"NDJSON line exceeds {self.max_item_bytes} bytes")
+        for line in lines:
+            if not line.strip():
+                continue
+            if len(line) > self.max_item_bytes:
+                items.append(too_long)
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as exc:
+                items.append(JsonStreamError(f"invalid JSON: {exc}"))
+        if len(self._buf) > self.max_item_bytes:
+            items.append(too_long)
+            self._buf = ""
+            self._skipping = True
+        return items
+
+    def _drain_array(self, final: bool) -> list:
+        if self._array_state == "failed":
+            self._buf = ""
+            return []
+        items = []
+        try:
+            self._buf = self._scan_array(items, final)
+        except JsonStreamError as exc:
+            items.append(exc)
+            self._array_state = "failed"
+            self._buf = ""
+        return items
+
+    def _scan_array(self, items: list, final: bool) -> str:
+        buf, pos = self._buf, 0
+        if not final and self._stalled and not _could_close(buf, self._stalled):
+            return buf     # the pending item cannot have completed yet
+        self._stalled = 0
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos == len(buf):
+                break
+            char = buf[pos]
+            state = self._array_state
+            if state == "done":
+                raise JsonStreamError(f"unexpected data after JSON array: {char!r}")
+            if state == "open":
+                self._array_state = "first"
+                pos += 1
+                continue
+            if state == "sep":
+                if char not in ",]":
+                    raise JsonStreamError(f"expected ',' or ']' in JSON array, got {char!r}")
+                self._array_state = "item" if char == "," else "done"
+                pos += 1
+                continue
+            if state == "first" and char == "]":
+                self._array_state = "done"
+                pos += 1
+                continue
+            try:
+                item, end = _DECODER.raw_decode(buf, pos)
+            except json.JSONDecodeError as exc:
+                if final:
+                    raise JsonStreamError(f"invalid JSON array item: {exc}") from None
+                if len(buf) - pos > self.max_item_bytes:
+                    raise JsonStreamError(f"JSON array item exceeds {self.max_item_bytes} bytes") from None
+                self._stalled = len(buf) - pos
+                break
+            scalar = not isinstance(item, (dict, list, str))
+            if scalar and not final and (end == len(buf) or buf[end] not in _DELIMITERS):
+                break   # a bare number or literal may continue in the next chunk
+            items.append(item)
+            self._array_state = "sep"
+            pos = end
+        return buf[pos:]
+
+
+def _could_close(buf: str, seen: int) -> bool:
+    """True if text appended after ``seen`` chars could complete a JSON value."""
+    tail = buf[seen:]
+    return any(c in tail for c in '}]",' + _WHITESPACE)
@@ -0,0 +1,417 @@
+"""End-to-end HTTP load testing for ``server.app`` (``guardflow loadtest``).
+
+Closed-loop virtual users send requests back to back for a fixed time at
+each concurrency level.  The target is either the app itself, driven
+in-process over ASGI, or a local uvicorn started with a given worker
+count and environment.  The HTTP client is a minimal keep-alive
+HTTP/1.1 client on asyncio streams, one connection per virtual user.
+
+For each level the report records throughput, latency percentiles and
+status counts.  It also records the saturation knee: the lowest level
+that reaches ``1 - tolerance`` of the peak throughput.  Past that level,
+more concurrency only adds latency.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict, dataclass, field
+
+DEFAULT_LEVELS = (1, 2, 4, 8, 16, 32, 64)
+DEFAULT_DURATION = 2.0          # seconds per concurrency level
+DEFAULT_TOLERANCE = 0.05        # within 5% of peak throughput counts as saturated
+DEFAULT_BATCH_SIZE = 100        # items per /authorize/batch request
+STARTUP_TIMEOUT = 30.0          # seconds to wait for a spawned uvicorn
+
+DEFAULT_REQUEST = {"actor": {"id": "load", "role": "viewer"}, "tool_call": {"tool": "echo", "args": {"text": "hi"}}}
+
+ROUTES = {
+    "health": ("GET", "/health"),
+    "authorize": ("POST", "/authorize"),
+    "batch": ("POST", "/authorize/batch"),
+    "run": ("POST", "/run"),
+    "execute": ("POST", "/execute"),
+}
+
+# (method, path, body, headers) -> status code
+SendFn = Callable[[str, str, bytes, dict], Awaitable[int]]
+
+
+@dataclass
+class LevelResult:
+    concurrency: int
+    requests: int
+    errors: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+    statuses: dict[str, int] = field(default_factory=dict)
+
+
+def route_request(route: str, payload: dict, batch_size: int = DEFAULT_BATCH_SIZE) -> tuple[str, str, bytes, dict]:
+    """The ``(method, path, body, headers)`` each virtual user sends for ``route``."""
+    if route not in ROUTES:
+        raise ValueError(f"unknown route {route!r}; expected one of {', '.join(ROUTES)}")
+    method, path = ROUTES[route]
+    if method == "GET":
+        return method, path, b"", {}
+    if route == "batch":
+        line = json.dumps(payload) + "\n"
+        return method, path, (line * batch_size).encode(), {"content-type": "application/x-ndjson"}
+    return method, path, json.dumps(payload).encode(), {"content-type": "application/json"}
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, round(q * (len(sorted_values) - 1)))]
+
+
+async def run_level(
+    connect: Callable[[], Awaitable[tuple[SendFn, Callable[[], Awaitable[None]]]]],
+    request: tuple[str, str, bytes, dict],
+    concurrency: int,
+    duration: float,
+) -> LevelResult:
+    """Run ``concurrency`` closed-loop users for ``duration`` seconds."""
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def user() -> None:
+        nonlocal errors
+        send, close = await connect()
+        try:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    status = await send(*request)
+                except (OSError, asyncio.IncompleteReadError, ValueError) as exc:
+                    errors += 1
+                    statuses[type(exc).__name__] += 1
+                    send, close = await _reconnect(connect, close)
+                    continue
+                latencies.append((time.perf_counter() - start) * 1000)
+                statuses[str(status)] += 1
+                if status >= 400:
+                    errors += 1
+        finally:
+            await close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return LevelResult(
+        concurrency=concurrency,
+        requests=len(latencies),
+        errors=errors,
+        seconds=round(elapsed, 3),
+        throughput=len(latencies) / elapsed if elapsed else 0.0,
+        p50_ms=_percentile(latencies, 0.50),
+        p90_ms=_percentile(latencies, 0.90),
+        p99_ms=_percentile(latencies, 0.99),
+        max_ms=latencies[-1] if latencies else 0.0,
+        statuses=dict(statuses),
+    )
+
+
+async def _reconnect(connect, close):
+    await close()
+    await asyncio.sleep(0.01)
+    return await connect()
+
+
+def find_knee(levels: list[LevelResult], tolerance: float = DEFAULT_TOLERANCE) -> int | None:
+    """Lowest concurrency whose throughput is within ``tolerance`` of the sweep's peak."""
+    if not levels:
+        return None
+    peak = max(level.throughput for level in levels)
+    for level in sorted(levels, key=lambda lv: lv.concurrency):
+        if level.throughput >= peak * (1 - tolerance):
+            return level.concurrency
+    return None
+
+
+# -- in-process ASGI target ------------------------------------------------------
+
+
+@asynccontextmanager
+async def asgi_lifespan(app):
+    """Run the app's lifespan startup and shutdown around the block."""
+    to_app: asyncio.Queue = asyncio.Queue()
+    from_app: asyncio.Queue = asyncio.Queue()
+
+    async def receive():
+        return await to_app.get()
+
+    async def send(message):
+        await from_app.put(message)
+
+    task = asyncio.ensure_future(app({"type": "lifespan", "asgi": {"version": "3.0"}}, receive, send))
+    await to_app.put({"type": "lifespan.startup"})
+    message = await from_app.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise RuntimeError(f"app startup failed: {message.get('message', message['type'])}")
+    try:
+        yield
+    finally:
+        await to_app.put({"type": "lifespan.shutdown"})
+        await from_app.get()
+        await task
+
+
+def asgi_connector(app):
+    """A ``connect`` factory whose ``send`` calls ``app`` directly, with no network."""
+
+    async def send(method: str, path: str, body: bytes, headers: dict) -> int:
+        done = asyncio.Event()
+        sent = False
+        status = 0
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(k.encode(), v.encode()) for k, v in headers.items()]
+            + [(b"content-length", str(len(body)).encode())],
+            "client": ("loadtest", 0),
+            "server": ("loadtest", 80),
+        }
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def respond(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        try:
+            await app(scope, receive, respond)
+        finally:
+            done.set()
+        return status
+
+    async def connect():
+        async def close():
+            pass
+
+        return send, close
+
+    return connect
+
+
+# -- HTTP target -------------------------------------------------------------------
+
+
+class HttpConnection:
+    """Minimal keep-alive HTTP/1.1 client: content-length and chunked bodies."""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def open(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            self._writer = None
+
+    async def send(self, method: str, path: str, body: bytes, headers: dict) -> int:
+        if self._writer is None:
+            await self.open()
+        head = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        head.extend(f"{k}: {v}" for k, v in headers.items())
+        self._writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await self._writer.drain()
+
+        status_line = await self._reader.readuntil(b"\r\n")
+        parts = status_line.split()
+        if len(parts) < 2:
+            raise ValueError(f"bad status line {status_line!r}")
+        status = int(parts[1])
+        length, chunked, closing = None, False, False
+        while (line := await self._reader.readuntil(b"\r\n")) != b"\r\n":
+            name, _, value = line.decode("latin-1").partition(":")
+            name, value = name.strip().lower(), value.strip().lower()
+            if name == "content-length":
+                length = int(value)
+            elif name == "transfer-encoding" and "chunked" in value:
+                chunked = True
+            elif name == "connection" and value == "close":
+                closing = True
+        if chunked:
+            while (size := int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)) > 0:
+                await self._reader.readexactly(size + 2)
+            await self._reader.readuntil(b"\r\n")
+        elif length:
+            await self._reader.readexactly(length)
+        if closing:
+            await self.close()
+        return status
+
+
+def http_connector(host: str, port: int):
+    async def connect():
+        conn = HttpConnection(host, port)
+        await conn.open()
+        return conn.send, conn.close
+
+    return connect
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def uvicorn_server(workers: int = 1, env: dict[str, str] | None = None, port: int | None = None) -> Iterator[int]:
+    """Start ``uvicorn guardflow.server:app`` locally and yield its port once healthy."""
+    port = port or _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "guardflow.server:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env={**os.environ, **(env or {})},
+    )
+    try:
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                    break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not become healthy in time") from None
+                time.sleep(0.1)
+        yield port
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+
+# -- sweeps ------------------------------------------------------------------------
+
+
+async def sweep(connect, request, levels, duration: float) -> list[LevelResult]:
+    return [await run_level(connect, request, level, duration) for level in levels]
+
+
+def _report(target: dict, route: str, levels: list[LevelResult], tolerance: float) -> dict:
+    return {
+        "target": target,
+        "route": route,
+        "knee": find_knee(levels, tolerance),
+        "peak_throughput": max((lv.throughput for lv in levels), default=0.0),
+        "levels": [asdict(lv) for lv in levels],
+    }
+
+
+def run_asgi(
+    route: str,
+    levels=DEFAULT_LEVELS,
+    duration: float = DEFAULT_DURATION,
+    payload: dict = DEFAULT_REQUEST,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    tolerance: float = DEFAULT_TOLERANCE,
+    app=None,
+    warmup: bool = False,
+) -> dict:
+    """Sweep ``levels`` against the app in-process (lifespan included).
+
+    The lifespan's sandbox warmup, which pulls and runs a Docker smoke
+    container, is turned off unless ``warmup`` is set.
+    """
+    if app is None:
+        from guardflow.server import app
+    request = route_request(route, payload, batch_size)
+
+    async def main():
+        async with asgi_lifespan(app):
+            return await sweep(asgi_connector(app), request, levels, duration)
+
+    with _environ({} if warmup else {"GUARDFLOW_SANDBOX_WARMUP": "0"}):
+        results = asyncio.run(main())
+    return _report({"mode": "asgi"}, route, results, tolerance)
+
+
+@contextmanager
+def _environ(overrides: dict[str, str]) -> Iterator[None]:
+    saved = {name: os.environ.get(name) for name in overrides}
+    os.environ.update(overrides)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def run_http(
+    route: str,
+    host: str,
+    port: int,
+    levels=DEFAULT_LEVELS,
+    duration: float = DEFAULT_DURATION,
+    payload: dict = DEFAULT_REQUEST,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    tolerance: float = DEFAULT_TOLERANCE,
+    target: dict | None = None,
+) -> dict:
+    """Sweep ``levels`` against a running server over real sockets."""
+    request = route_request(route, payload, batch_size)
+    results = asyncio.run(sweep(http_connector(host, port), request, levels, duration))
+    return _report(target or {"mode": "http", "host": host, "port": port}, route, results, tolerance)
+
+
+def run_uvicorn(
+    route: str,
+    workers: int = 1,
+    env: dict[str, str] | None = None,
+    **kwargs,
+) -> dict:
+    """Start a local uvicorn with ``workers`` and ``env``, sweep it, and stop it."""
+    with uvicorn_server(workers, env) as port:
+        target = {"mode": "uvicorn", "workers": workers, "env": env or {}}
+        return run_http(route, "127.0.0.1", port, target=target, **kwargs)
@@ -0,0 +1,278 @@
+"""Low-overhead Prometheus-style metrics for the pipeline and sandbox.
+
+Counters and fixed-bucket histograms keep plain Python numbers per label
+set behind one lock per metric; an update is a dict lookup, a ``bisect``
+and two additions.  Values that already live elsewhere (queue depth, pool
+size) are read by callback only when ``/metrics`` is scraped.
+
+Label values come from requests, so each metric accepts at most
+``max_series`` label sets; further ones are folded into ``OTHER``.
+"""
+from __future__ import annotations
+
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Iterable
+
+# Latency buckets in seconds: 5 µs … 30 s.
+LATENCY_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+DEFAULT_MAX_SERIES = 1000
+MAX_LABEL_CHARS = 64
+OTHER = "__other__"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), max_series: int = DEFAULT_MAX_SERIES):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.max_series = max_series
+        self._series: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: tuple) -> tuple:
+        """Bound label values; fold new label sets into OTHER once the series cap is hit."""
+        key = tuple(
+            v if isinstance(v, str) and len(v) <= MAX_LABEL_CHARS else str(v)[:MAX_LABEL_CHARS] for v in labels
+        )
+        if key in self._series or len(self._series) < self.max_series:
+            return key
+        return (OTHER,) * len(self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            key = self._key(labels)
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, *labels) -> float:
+        with self._lock:
+            return self._series.get(tuple(labels), 0)
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = list(self._series.items())
+        return self.header() + [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in series]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS,
+                 max_series: int = DEFAULT_MAX_SERIES):
+        super().__init__(name, help, labelnames, max_series)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            key = self._key(labels)
+            entry = self._series.get(key)
+            if entry is None:
+                # per-bucket (non-cumulative) counts incl. +Inf, then sum
+                entry = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def snapshot(self, *labels) -> tuple[list[int], float] | None:
+        """Per-bucket counts (last one is +Inf) and sum for one label set."""
+        with self._lock:
+            entry = self._series.get(tuple(labels))
+            return (list(entry[0]), entry[1]) if entry is not None else None
+
+    def render(self) -> list[str]:
+        with self._lock:
+            series = [(k, list(counts), total) for k, (counts, total) in self._series.items()]
+        lines = self.header()
+        for key, counts, total in series:
+            running = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                running += count
+                le = 'le="' + _fmt(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {running}")
+        return lines
+
+
+class CallbackGauge(_Metric):
+    """A gauge (or counter) whose value is read from ``fn`` at scrape time."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], float | None], kind: str = "gauge"):
+        super().__init__(name, help)
+        self.fn = fn
+        self.kind = kind
+
+    def render(self) -> list[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            value = None
+        return self.header() + ([f"{self.name} {_fmt(value)}"] if value is not None else [])
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], float | None], kind: str = "gauge") -> CallbackGauge:
+        return self.register(CallbackGauge(name, help, fn, kind))
+
+    def clear(self) -> None:
+        for metric in self._metrics.values():
+            metric.clear()
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "guardflow_stage_seconds", "Time spent in each pipeline stage.", ("stage",)
+)
+DECISIONS = REGISTRY.counter(
+    "guardflow_decisions_total", "Pipeline outcomes by code, role and tool.", ("outcome", "role", "tool")
+)
+SANDBOX_SECONDS = REGISTRY.histogram(
+    "guardflow_sandbox_seconds", "Sandbox execution time, excluding the queue wait.", ("mode",)
+)
+SANDBOX_QUEUE_SECONDS = REGISTRY.histogram(
+    "guardflow_sandbox_queue_wait_seconds", "Time spent waiting for a sandbox slot."
+)
+CONTAINER_SECONDS = REGISTRY.histogram(
+    "guardflow_sandbox_container_seconds", "Container lifecycle operation time.", ("phase",)
+)
+
+
+def record_stages(timings: dict[str, float]) -> None:
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.observe(seconds, stage)
+
+
+def record_decision(outcome: str, role, tool) -> None:
+    DECISIONS.inc(outcome, role if role is not None else "", tool if tool is not None else "")
+
+
+# -- reading the text format back (for ``guardflow stats``) ------------------
+
+_SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})?\s+(\S+)$')
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+def parse_text(text: str) -> list[tuple[str, dict[str, str], float]]:
+    """Parse Prometheus text-format samples into ``(name, labels, value)`` tuples."""
+    samples = []
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        match = _SAMPLE.match(line)
+        if match is None:
+            continue
+        name, _, raw_labels, value = match.groups()
+        labels = {k: v.replace('\\"', '"').replace("\\n", "\n").replace("\\\\", "\\")
+                  for k, v in _LABEL.findall(raw_labels or "")}
+        samples.append((name, labels, float(value)))
+    return samples
+
+
+def bucket_quantile(q: float, buckets: list[tuple[float, float]]) -> float:
+    """Estimate quantile ``q`` from cumulative ``(upper_bound, count)`` buckets.
+
+    Returns the upper bound of the bucket holding the quantile, as
+    ``histogram_quantile`` would before interpolation.
+    """
+    buckets = sorted(buckets)
+    if not buckets or buckets[-1][1] == 0:
+        return math.nan
+    rank = q * buckets[-1][1]
+    for bound, count in buckets:
+        if count >= rank:
+            return bound
+    return buckets[-1][0]
+
+
+def summarize(text: str) -> tuple[list[dict], list[dict]]:
+    """Split scraped metrics into histogram summaries and scalar samples.
+
+    Histogram rows carry ``name``, ``labels``, ``count``, ``mean``, ``p50``
+    and ``p99`` (bucket upper bounds); scalar rows carry ``name``,
+    ``labels`` and ``value``.
+    """
+    samples = parse_text(text)
+    histogram_names = {n[: -len("_bucket")] for n, _, _ in samples if n.endswith("_bucket")}
+    groups: dict[tuple, dict] = {}
+    scalars = []
+    for name, labels, value in samples:
+        base = next((name[: -len(s)] for s in ("_bucket", "_sum", "_count") if name.endswith(s)), name)
+        if base not in histogram_names:
+            scalars.append({"name": name, "labels": labels, "value": value})
+            continue
+        le = labels.pop("le", None)
+        group = groups.setdefault((base, tuple(sorted(labels.items()))), {"buckets": [], "sum": 0.0, "count": 0.0})
+        if name.endswith("_bucket"):
+            group["buckets"].append((math.inf if le == "+Inf" else float(le), value))
+        elif name.endswith("_sum"):
+            group["sum"] = value
+        else:
+            group["count"] = value
+    histograms = [
+        {
+            "name": base,
+            "labels": dict(labels),
+            "count": group["count"],
+            "mean": group["sum"] / group["count"] if group["count"] else math.nan,
+            "p50": bucket_quantile(0.5, group["buckets"]),
+            "p99": bucket_quantile(0.99, group["buckets"]),
+        }
+        for (base, labels), group in groups.items()
+    ]
+    return histograms, scalars
@@ -43,6 +43,27 @@ class RbacError(BaseModel):
     detail: str
 
 
+class ArgumentError(BaseModel):
+    code: str = "ARGUMENT_DENIED"
+    tool: str
+    arg: str
+    detail: str
+
+
+class RateLimitError(BaseModel):
+    code: str = "RATE_LIMITED"
+    actor: str
+    tool: str
+    detail: str
+    retry_after: float
+
+
 class SandboxError(BaseModel):
     code: str = "SANDBOX_ERROR"
     detail: str
+
+
+class SandboxBusyError(BaseModel):
+    code: str = "SANDBOX_BUSY"
+    detail: str
+    retry_after: float
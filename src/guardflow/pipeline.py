@@ -1,44 +1,304 @@
 """Execution pipeline: validate → authorize → execute."""
 
-import logging
+import asyncio
+import functools
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor
 
 from pydantic import ValidationError
 
+from guardflow.decisions import DecisionTable
 from guardflow.models import RunRequest, ToolResult
 from guardflow.policy import Policy, PolicyViolation
 from guardflow.rbac import RbacPolicy, RbacDenial
-from guardflow.sandbox import run_python, SandboxError
+from guardflow import audit, events, metrics, ratelimit, result_cache, sandbox
+from guardflow.sandbox import collect, execute_python, SandboxError, SandboxEvent, stream_execute
 
-logger = logging.getLogger(__name__)
+# Blocking tool executors run here.  Sized so that every call the sandbox
+# scheduler could admit or queue has a thread; calls beyond that are
+# rejected by the scheduler with SandboxBusy rather than piling up.
+DEFAULT_EXECUTOR_WORKERS = sandbox.SANDBOX_MAX_CONCURRENCY + sandbox.SANDBOX_MAX_QUEUE
 
+# Tools whose execution blocks and must not run on the event loop.
+BLOCKING_TOOLS = frozenset({"python_exec"})
 
-def validate(data: dict) -> RunRequest:
-    """Validate the incoming tool-call request against the RunRequest schema."""
-    logger.info(f"pipeline.validate: {data}")
+_executor: Executor | None = None
+
+
+# A request as it arrives: a parsed dict, or the raw JSON text/bytes.
+RawRequest = dict | str | bytes
+
+
+def validate(data: RawRequest) -> RunRequest:
+    """Validate the incoming tool-call request against the RunRequest schema.
+
+    Raw JSON (``str`` or ``bytes``) is parsed and validated in one pass by
+    pydantic's JSON mode; no intermediate dict is built.
+    """
+    events.emit("validate", data)
+    if isinstance(data, (str, bytes, bytearray)):
+        return RunRequest.model_validate_json(data)
     return RunRequest.model_validate(data)
 
 
-def authorize(request: RunRequest, policy: Policy, rbac: RbacPolicy) -> RunRequest:
-    """Authorize the tool-call against active policy."""
-    if not policy.is_allowed(request.tool_call.tool):   # gate 1: allowlist
-        raise PolicyViolation(request.tool_call.tool)
-    rbac.check(request.actor.role, request.tool_call.tool)  # gate 2: RBAC
-    logger.info(f"pipeline.authorize: {request}")
+def authorize(
+    request: RunRequest,
+    policy: Policy,
+    rbac: RbacPolicy,
+    decisions: DecisionTable | None = None,
+) -> RunRequest:
+    """Authorize the tool-call against active policy.
+
+    When a compiled ``DecisionTable`` is supplied it answers both gates in
+    one lookup; otherwise the allowlist and Casbin enforcer are consulted.
+    The policy's argument rules are checked next.  Last, a call that
+    passed every gate is charged to the actor's rate limit.
+    """
+    if decisions is not None:
+        decisions.check(request.actor.role, request.tool_call.tool)
+    else:
+        if not policy.is_allowed(request.tool_call.tool):   # gate 1: allowlist
+            raise PolicyViolation(request.tool_call.tool)
+        rbac.check(request.actor.role, request.tool_call.tool)  # gate 2: RBAC
+    policy.check_arguments(request.actor.role, request.tool_call.tool, request.tool_call.args)  # gate 3: arguments
+    limit = policy.rate_limit(request.actor.role, request.tool_call.tool)
+    if limit is not None:   # gate 4: rate limit
+        ratelimit.get_limiter().check(request.actor.id, request.tool_call.tool, limit)
+    events.emit("authorize", request)
     return request
 
 
-def execute(request: RunRequest) -> ToolResult:
+def execute(request: RunRequest, cancelled: threading.Event | None = None) -> ToolResult:
     """Execute the tool call, dispatching to the Docker sandbox for python_exec."""
-    logger.info(f"pipeline.execute: {request}")
+    events.emit("execute", request)
     if request.tool_call.tool == "python_exec":
-        code = request.tool_call.args.get("code", "")
-        sandbox_result = run_python(code)
+        sandbox_result = _run_python(request, cancelled)
         return ToolResult(step="execute", ok=True, data={**request.model_dump(), "sandbox": sandbox_result})
     return ToolResult(step="execute", ok=True, data=request.model_dump())
 
 
-def run_pipeline(data: dict, policy: Policy, rbac: RbacPolicy) -> ToolResult:
-    """Run the full validate → authorize → execute pipeline."""
-    request = validate(data)
-    request = authorize(request, policy, rbac)
-    return execute(request)
+def _run_python(request: RunRequest, cancelled: threading.Event | None) -> dict:
+    """Run python_exec, through the result cache when one is installed.
+
+    With a cache, the result's ``cache`` field says whether it was a
+    ``hit``, a ``miss`` (now stored if it exited 0) or a ``bypass``.
+    """
+    args = request.tool_call.args
+    code = args.get("code", "")
+    cache = result_cache.get_cache()
+    if cache is None:
+        return execute_python(code, cancelled=cancelled)
+    if not result_cache.wants_cache(args):
+        cache.bypassed()
+        return {**execute_python(code, cancelled=cancelled), "cache": result_cache.BYPASS}
+    key = result_cache.cache_key(request.actor.role, code)
+    cached = cache.get(key)
+    if cached is not None:
+        return {**cached, "cache": result_cache.HIT}
+    result = execute_python(code, cancelled=cancelled)
+    cache.put(key, result)
+    return {**result, "cache": result_cache.MISS}
+
+
+def execute_stream(request: RunRequest, cancelled: threading.Event | None = None) -> Iterator[SandboxEvent]:
+    """Streaming ``execute``: python_exec yields sandbox output events as they arrive.
+
+    Other tools yield a single ``result`` event carrying the ``ToolResult``
+    dict.
+    """
+    if request.tool_call.tool == "python_exec":
+        events.emit("execute", request)
+        yield from _stream_python(request, cancelled)
+        return
+    yield SandboxEvent("result", execute(request).model_dump())
+
+
+def _stream_python(request: RunRequest, cancelled: threading.Event | None) -> Iterator[SandboxEvent]:
+    """Streaming ``_run_python``: hits are replayed, and the ``exit`` event carries ``cache``."""
+    args = request.tool_call.args
+    code = args.get("code", "")
+    cache = result_cache.get_cache()
+    if cache is None:
+        yield from stream_execute(code, cancelled=cancelled)
+        return
+    if not result_cache.wants_cache(args):
+        cache.bypassed()
+        yield from _tag_exit(stream_execute(code, cancelled=cancelled), result_cache.BYPASS)
+        return
+    key = result_cache.cache_key(request.actor.role, code)
+    cached = cache.get(key)
+    if cached is not None:
+        yield from result_cache.replay(cached)
+        return
+    seen: list[SandboxEvent] = []
+    for event in _tag_exit(stream_execute(code, cancelled=cancelled), result_cache.MISS):
+        seen.append(event)
+        yield event
+    cache.put(key, collect(seen))
+
+
+def _tag_exit(stream: Iterator[SandboxEvent], status: str) -> Iterator[SandboxEvent]:
+    for event in stream:
+        yield SandboxEvent("exit", {**event.data, "cache": status}) if event.kind == "exit" else event
+
+
+def record_outcome(
+    payload, exc: Exception | None, version: str, timings: dict[str, float], outcome: str | None = None
+) -> None:
+    """Report one pipeline outcome to the metrics and the audit log.
+
+    ``outcome`` overrides the code ``exc`` would map to.
+    """
+    actor, role, tool = audit.request_fields(payload)
+    outcome = outcome or audit.outcome_for(exc)
+    metrics.record_stages(timings)
+    metrics.record_decision(outcome, role, tool)
+    audit.write(actor, role, tool, outcome, version, timings)
+
+
+def _timed(timings: dict, stage: str, fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        timings[stage] = time.perf_counter() - start
+
+
+def check_request(
+    data: RawRequest,
+    policy: Policy,
+    rbac: RbacPolicy,
+    decisions: DecisionTable | None = None,
+    version: str | None = None,
+    timings: dict[str, float] | None = None,
+) -> RunRequest:
+    """Run validate → authorize without executing, auditing the decision.
+
+    ``version`` labels the audit record; it defaults to ``rbac.version``.
+    A caller that goes on to execute the request passes its own
+    ``timings``: the stages are timed into it, and an allowed request is
+    left for the caller to report with ``record_outcome()`` once it has
+    run, so each request is counted once, with its final outcome.
+    """
+    deferred = timings is not None
+    timings = timings if deferred else {}
+    try:
+        request = _timed(timings, "validate", validate, data)
+        request = _timed(timings, "authorize", authorize, request, policy, rbac, decisions)
+    except Exception as exc:
+        record_outcome(data, exc, version or rbac.version, timings)
+        raise
+    if not deferred:
+        record_outcome(request, None, version or rbac.version, timings)
+    return request
+
+
+def run_pipeline(
+    data: RawRequest,
+    policy: Policy,
+    rbac: RbacPolicy,
+    decisions: DecisionTable | None = None,
+    version: str | None = None,
+) -> ToolResult:
+    """Run the full validate → authorize → execute pipeline, auditing the outcome."""
+    timings: dict[str, float] = {}
+    try:
+        request = _timed(timings, "validate", validate, data)
+        request = _timed(timings, "authorize", authorize, request, policy, rbac, decisions)
+        result = _timed(timings, "execute", execute, request)
+    except Exception as exc:
+        record_outcome(data, exc, version or rbac.version, timings)
+        raise
+    record_outcome(request, None, version or rbac.version, timings)
+    return result
+
+
+def set_executor(executor: Executor | None) -> None:
+    """Install the executor used for blocking tools (``None`` = lazy default)."""
+    global _executor
+    _executor = executor
+
+
+def get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DEFAULT_EXECUTOR_WORKERS, thread_name_prefix="guardflow-exec")
+    return _executor
+
+
+async def execute_async(request: RunRequest) -> ToolResult:
+    """Async ``execute``: blocking tools are offloaded to the bounded executor.
+
+    If the awaiting task is cancelled (e.g. the client disconnected), a call
+    still waiting for an executor thread or a sandbox slot is abandoned.  A
+    container that is already running is left to finish within its timeout.
+    """
+    if request.tool_call.tool not in BLOCKING_TOOLS:
+        return execute(request)
+    cancelled = threading.Event()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_executor(), functools.partial(execute, request, cancelled))
+    try:
+        return await future
+    except asyncio.CancelledError:
+        cancelled.set()
+        sandbox.get_scheduler().wake()
+        raise
+
+
+async def execute_stream_async(request: RunRequest) -> AsyncIterator[SandboxEvent]:
+    """Async ``execute_stream``; each step of the blocking generator runs on the executor.
+
+    When the consumer stops early or is cancelled, a call still waiting
+    for a sandbox slot is abandoned and the generator is closed, which
+    stops its container, once the step in flight returns.
+    """
+    cancelled = threading.Event()
+    stream = execute_stream(request, cancelled)
+    executor = get_executor()
+    step = None
+    try:
+        while True:
+            step = executor.submit(next, stream, None)
+            event = await asyncio.wrap_future(step)
+            if event is None:
+                return
+            yield event
+    finally:
+        cancelled.set()
+        sandbox.get_scheduler().wake()
+        if step is None or step.done():
+            executor.submit(stream.close)
+        else:
+            step.add_done_callback(lambda _: stream.close())
+
+
+async def run_pipeline_async(
+    data: RawRequest,
+    policy: Policy,
+    rbac: RbacPolicy,
+    decisions: DecisionTable | None = None,
+    version: str | None = None,
+) -> ToolResult:
+    """Async variant of ``run_pipeline``.
+
+    Validation and authorization are CPU-only and run inline on the event
+    loop; only execution is offloaded, so one worker can hold many
+    requests that are waiting on the sandbox.
+    """
+    timings: dict[str, float] = {}
+    try:
+        request = _timed(timings, "validate", validate, data)
+        request = _timed(timings, "authorize", authorize, request, policy, rbac, decisions)
+        start = time.perf_counter()
+        try:
+            result = await execute_async(request)
+        finally:
+            timings["execute"] = time.perf_counter() - start
+    except Exception as exc:
+        record_outcome(data, exc, version or rbac.version, timings)
+        raise
+    record_outcome(request, None, version or rbac.version, timings)
+    return result
@@ -1,16 +1,49 @@
 """Policy model and enforcement for the allowlist gate."""
 
+import hashlib
 import json
 from pathlib import Path
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, PrivateAttr, field_validator
+
+from guardflow.arguments import ArgumentPolicy, ArgumentRule
+from guardflow.ratelimit import RateLimit, RateLimitPolicy, RateLimitRule
 
 DEFAULT_POLICY_PATH = Path("policy.json")
 
 
+def policy_version(*contents: bytes) -> str:
+    """Return a short content hash identifying a set of policy file contents."""
+    digest = hashlib.sha256()
+    for content in contents:
+        digest.update(content)
+        digest.update(b"\0")
+    return digest.hexdigest()[:12]
+
+
 class Policy(BaseModel):
     model_config = ConfigDict(extra="forbid")
     allowed_tools: list[str]
+    argument_rules: list[ArgumentRule] = []
+    rate_limits: list[RateLimitRule] = []
+    _allowed: frozenset[str] = PrivateAttr(default=frozenset())
+    _arguments: ArgumentPolicy = PrivateAttr(default_factory=ArgumentPolicy)
+    _rate_limits: RateLimitPolicy = PrivateAttr(default_factory=RateLimitPolicy)
+
+    @field_validator("rate_limits")
+    @classmethod
+    def _one_rule_per_scope(cls, rules: list[RateLimitRule]) -> list[RateLimitRule]:
+        seen = set()
+        for rule in rules:
+            if (rule.role, rule.tool) in seen:
+                raise ValueError(f"more than one rate limit for role={rule.role!r}, tool={rule.tool!r}")
+            seen.add((rule.role, rule.tool))
+        return rules
+
+    def model_post_init(self, __context) -> None:
+        self._allowed = frozenset(self.allowed_tools)
+        self._arguments = ArgumentPolicy(self.argument_rules)
+        self._rate_limits = RateLimitPolicy(self.rate_limits)
 
     @classmethod
     def load(cls, path: Path = DEFAULT_POLICY_PATH) -> "Policy":
@@ -18,7 +51,15 @@ class Policy(BaseModel):
             return cls.model_validate(json.load(f))
 
     def is_allowed(self, tool: str) -> bool:
-        return tool in self.allowed_tools
+        return tool in self._allowed
+
+    def check_arguments(self, role: str, tool: str, args: dict) -> None:
+        """Raise ``ArgumentViolation`` if ``args`` break an argument rule for ``role`` and ``tool``."""
+        self._arguments.check(role, tool, args)
+
+    def rate_limit(self, role: str, tool: str) -> RateLimit | None:
+        """The rate limit that calls of ``tool`` by ``role`` are charged to, if any."""
+        return self._rate_limits.limit_for(role, tool)
 
 
 class PolicyViolation(Exception):
@@ -0,0 +1,136 @@
+"""Effective-permission diff between two policy versions (``guardflow policy diff``).
+
+A role may use a tool when the tool is allowlisted in ``policy.json`` and
+the RBAC policy grants it to the role.  For each version the combined
+matrix is built as one bitmask per role over a tool index shared by both
+versions.  The grants that appear or disappear are then ``new & ~old`` and
+``old & ~new``, one pair of integer operations per role.  Inherited grants
+(``g`` rules) are folded into each role's mask first, so a change to the
+hierarchy shows up as the grants it adds or removes for every affected
+role.  The RBAC CSV is parsed directly rather than loaded into a Casbin
+enforcer, and no ``enforce`` calls are made.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import casbin
+
+from guardflow.decisions import PolicyCompileError, acl_rules, check_acl_model, permission_masks, role_hierarchy
+from guardflow.hierarchy import RoleHierarchy
+from guardflow.policy import Policy, policy_version
+
+POLICY_FILE = "policy.json"
+MODEL_FILE = "model.conf"
+RBAC_POLICY_FILE = "rbac_policy.csv"
+
+
+@dataclass
+class PermissionMatrix:
+    """Effective grants of one policy version, as role → bitmask over ``tools``."""
+
+    version: str
+    allowed_tools: tuple[str, ...]
+    roles: tuple[str, ...]
+    masks: dict[str, int]
+
+
+@dataclass
+class PolicyDiff:
+    old_version: str
+    new_version: str
+    granted: list[tuple[str, str]] = field(default_factory=list)
+    revoked: list[tuple[str, str]] = field(default_factory=list)
+    roles_added: list[str] = field(default_factory=list)
+    roles_removed: list[str] = field(default_factory=list)
+    tools_added: list[str] = field(default_factory=list)
+    tools_removed: list[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.granted or self.revoked)
+
+    def to_dict(self) -> dict:
+        return {
+            "old_version": self.old_version,
+            "new_version": self.new_version,
+            "granted": [{"role": role, "tool": tool} for role, tool in self.granted],
+            "revoked": [{"role": role, "tool": tool} for role, tool in self.revoked],
+            "roles_added": self.roles_added,
+            "roles_removed": self.roles_removed,
+            "tools_added": self.tools_added,
+            "tools_removed": self.tools_removed,
+        }
+
+
+def policy_paths(directory: Path) -> tuple[Path, Path, Path]:
+    """The allowlist, model and RBAC policy files of a policy directory."""
+    directory = Path(directory)
+    return directory / POLICY_FILE, directory / MODEL_FILE, directory / RBAC_POLICY_FILE
+
+
+def _read(paths: tuple[Path, Path, Path]) -> tuple[str, Policy, list[tuple[str, str]], RoleHierarchy | None]:
+    policy_bytes, model_bytes, rbac_bytes = (Path(p).read_bytes() for p in paths)
+    policy = Policy.model_validate(json.loads(policy_bytes))
+    model = casbin.model.Model()
+    model.load_model_from_text(model_bytes.decode())
+    hierarchical = check_acl_model(model)
+    pairs, links = acl_rules(rbac_bytes.decode())
+    if links and not hierarchical:
+        raise PolicyCompileError(f"{paths[2]} has g rules but the model defines no role inheritance")
+    version = policy_version(policy_bytes, model_bytes, rbac_bytes)
+    return version, policy, pairs, role_hierarchy(links)
+
+
+def _matrix(
+    version: str,
+    policy: Policy,
+    pairs: list[tuple[str, str]],
+    hierarchy: RoleHierarchy | None,
+    tool_ids: dict[str, int],
+) -> PermissionMatrix:
+    masks = permission_masks(policy.allowed_tools, pairs, tool_ids, hierarchy)
+    return PermissionMatrix(version, tuple(dict.fromkeys(policy.allowed_tools)), tuple(masks), masks)
+
+
+def _bits(mask: int) -> list[int]:
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+def diff_policies(old: tuple[Path, Path, Path], new: tuple[Path, Path, Path]) -> PolicyDiff:
+    """Compare the effective (role, tool) grants of two sets of policy files.
+
+    Raises ``PolicyCompileError`` if either model is not a plain ACL
+    (optionally with ``g`` role inheritance) or either role hierarchy is
+    deeper than ``MAX_ROLE_DEPTH``.
+    """
+    old_version, old_policy, old_pairs, old_hierarchy = _read(old)
+    new_version, new_policy, new_pairs, new_hierarchy = _read(new)
+    tool_ids: dict[str, int] = {}
+    for tool in (*old_policy.allowed_tools, *new_policy.allowed_tools):
+        tool_ids.setdefault(tool, len(tool_ids))
+    tools = list(tool_ids)
+    before = _matrix(old_version, old_policy, old_pairs, old_hierarchy, tool_ids)
+    after = _matrix(new_version, new_policy, new_pairs, new_hierarchy, tool_ids)
+
+    result = PolicyDiff(old_version, new_version)
+    for role in sorted(set(before.masks) | set(after.masks)):
+        old_mask, new_mask = before.masks.get(role, 0), after.masks.get(role, 0)
+        if old_mask == new_mask:
+            continue
+        result.granted.extend((role, tools[i]) for i in _bits(new_mask & ~old_mask))
+        result.revoked.extend((role, tools[i]) for i in _bits(old_mask & ~new_mask))
+    result.granted.sort()
+    result.revoked.sort()
+    result.roles_added = sorted(set(after.roles) - set(before.roles))
+    result.roles_removed = sorted(set(before.roles) - set(after.roles))
+    result.tools_added = sorted(set(after.allowed_tools) - set(before.allowed_tools))
+    result.tools_removed = sorted(set(before.allowed_tools) - set(after.allowed_tools))
+    return result
@@ -0,0 +1,264 @@
+"""Per-actor token-bucket rate limits for the authorize gate.
+
+``policy.json`` may carry ``rate_limits``.  Each rule gives a ``role``
+and/or a ``tool`` a budget of ``requests`` per ``per`` seconds.  Either
+may be omitted to match any role or tool.  Bursts go up to ``burst``,
+which defaults to ``requests``.  A call is charged to the most specific
+matching rule: (role, tool), then role, then tool, then the catch-all.
+Each actor has its own bucket per rule, so a role-wide rule is one budget
+across all of that actor's tools.  Only calls that every other gate has
+allowed are charged.
+
+Buckets live in one of two tables:
+
+- ``RateLimiter`` — in-process, split into stripes that each have their
+  own lock, so concurrent callers rarely contend.
+- ``SharedRateLimiter`` — the same idea in a memory-mapped file,
+  striped with byte-range locks.  Every process that maps the file (e.g.
+  all uvicorn workers on a host) draws from one budget.
+
+A bucket left idle long enough to refill completely is no different from
+a new one, so both tables drop such entries without losing anything.
+Past their size limit they also evict live buckets, least recently used
+first in-process and nearest to full in the shared table.  An evicted
+actor starts again with a full bucket.
+"""
+from __future__ import annotations
+
+import abc
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import NamedTuple
+
+from pydantic import BaseModel, ConfigDict, Field
+
+RATE_LIMITED = "RATE_LIMITED"
+DEFAULT_STRIPES = 64
+DEFAULT_MAX_ENTRIES = 100_000   # in-process buckets, across all stripes
+DEFAULT_SLOTS = 65_536          # shared-table buckets (32 bytes each)
+SWEEP_INTERVAL = 60.0           # seconds between idle sweeps of an in-process stripe
+PROBE_WINDOW = 16               # shared-table slots a bucket may live in, from its home slot
+
+
+class RateLimited(Exception):
+    def __init__(self, actor: str, tool: str, retry_after: float) -> None:
+        self.actor = actor
+        self.tool = tool
+        self.retry_after = retry_after
+        super().__init__(f"actor '{actor}' is over the rate limit for tool '{tool}'; retry in {retry_after:.3g}s")
+
+
+class RateLimitRule(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    role: str | None = None
+    tool: str | None = None
+    requests: int = Field(gt=0)
+    per: float = Field(default=1.0, gt=0)
+    burst: int | None = Field(default=None, gt=0)
+
+
+class RateLimit(NamedTuple):
+    key: str        # appended to the actor id to name the bucket
+    rate: float     # tokens per second
+    burst: float
+
+
+class RateLimitPolicy:
+    """``rate_limits`` indexed by ``(role, tool)`` scope, ``None`` standing for any."""
+
+    def __init__(self, rules: Iterable[RateLimitRule] = ()) -> None:
+        self._limits: dict[tuple[str | None, str | None], RateLimit] = {}
+        for rule in rules:
+            key = f"\0{rule.role or '*'}\0{rule.tool or '*'}"
+            self._limits[rule.role, rule.tool] = RateLimit(key, rule.requests / rule.per, rule.burst or rule.requests)
+
+    def __bool__(self) -> bool:
+        return bool(self._limits)
+
+    def limit_for(self, role: str, tool: str) -> RateLimit | None:
+        limits = self._limits
+        if not limits:
+            return None
+        return (
+            limits.get((role, tool)) or limits.get((role, None))
+            or limits.get((None, tool)) or limits.get((None, None))
+        )
+
+
+def _take(tokens: float, stamp: float, now: float, limit: RateLimit) -> tuple[float, float]:
+    """Refill a bucket last charged at ``stamp`` and take one token.
+
+    Returns the tokens left and the seconds to wait, which is 0 when the
+    token was granted.
+    """
+    tokens = min(limit.burst, tokens + (now - stamp) * limit.rate)
+    if tokens >= 1.0:
+        return tokens - 1.0, 0.0
+    return tokens, (1.0 - tokens) / limit.rate
+
+
+class _Limiter(abc.ABC):
+    @abc.abstractmethod
+    def acquire(self, actor: str, limit: RateLimit) -> float:
+        """Take one token from ``actor``'s bucket; returns the seconds to wait, 0 if granted."""
+
+    def check(self, actor: str, tool: str, limit: RateLimit) -> None:
+        """Charge one call by ``actor`` to ``limit``, raising ``RateLimited`` if its bucket is empty."""
+        wait = self.acquire(actor, limit)
+        if wait:
+            raise RateLimited(actor, tool, wait)
+
+
+class _Stripe:
+    __slots__ = ("lock", "buckets", "next_sweep")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # bucket key → (tokens, last charged, full again at); least recently charged first
+        self.buckets: dict[str, tuple[float, float, float]] = {}
+        self.next_sweep = 0.0
+
+
+class RateLimiter(_Limiter):
+    """In-process bucket table, striped over ``stripes`` locks."""
+
+    def __init__(
+        self,
+        stripes: int = DEFAULT_STRIPES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._stripes = [_Stripe() for _ in range(stripes)]
+        self._per_stripe = max(1, max_entries // stripes)
+        self._clock = clock
+
+    def __len__(self) -> int:
+        return sum(len(stripe.buckets) for stripe in self._stripes)
+
+    def acquire(self, actor: str, limit: RateLimit) -> float:
+        """Take a token for ``actor`` under ``limit``; the seconds to wait, or 0 if granted."""
+        key = actor + limit.key
+        stripe = self._stripes[hash(key) % len(self._stripes)]
+        now = self._clock()
+        with stripe.lock:
+            buckets = stripe.buckets
+            bucket = buckets.pop(key, None)
+            if bucket is None:
+                tokens, wait = _take(limit.burst, now, now, limit)
+            else:
+                tokens, wait = _take(bucket[0], bucket[1], now, limit)
+            buckets[key] = (tokens, now, now + (limit.burst - tokens) / limit.rate)
+            if now >= stripe.next_sweep:
+                for stale in [k for k, (_, _, full_at) in buckets.items() if full_at <= now]:
+                    del buckets[stale]
+                stripe.next_sweep = now + SWEEP_INTERVAL
+            while len(buckets) > self._per_stripe:
+                del buckets[next(iter(buckets))]
+        return wait
+
+
+_HEADER = struct.Struct("<8sII")     # magic, slots per stripe, stripes
+_SLOT = struct.Struct("<Qddd")       # key fingerprint (0 = never used), tokens, last charged, full again at
+_MAGIC = b"GFRATE01"
+
+
+class SharedRateLimiter(_Limiter):
+    """Bucket table in a memory-mapped file, shared by every process that opens it.
+
+    Put the file on a memory-backed filesystem such as ``/dev/shm``.  Each
+    stripe of slots is guarded by a ``lockf`` lock on one byte of the file,
+    plus a thread lock, because ``lockf`` locks belong to the whole process.
+    A bucket lives within ``PROBE_WINDOW`` slots of its home slot, so a
+    lookup reads a fixed number of slots.  Buckets are keyed by a 64-bit
+    BLAKE2 fingerprint of the actor and rule, and times come from the
+    system-wide monotonic clock.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        slots: int = DEFAULT_SLOTS,
+        stripes: int = DEFAULT_STRIPES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        per_stripe = max(PROBE_WINDOW, slots // stripes)
+        size = _HEADER.size + per_stripe * stripes * _SLOT.size
+        header = _HEADER.pack(_MAGIC, per_stripe, stripes)
+        self.path = Path(path)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)     # the first process to get here lays out the file
+            try:
+                if os.fstat(self._fd).st_size == 0:
+                    os.ftruncate(self._fd, size)
+                    os.pwrite(self._fd, header, 0)
+                elif os.pread(self._fd, _HEADER.size, 0) != header or os.fstat(self._fd).st_size != size:
+                    raise ValueError(f"{self.path} holds a rate-limit table with a different layout")
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(self._fd, size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self._per_stripe = per_stripe
+        self._stripes = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._clock = clock
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+    def acquire(self, actor: str, limit: RateLimit) -> float:
+        """Take a token for ``actor`` under ``limit``; the seconds to wait, or 0 if granted."""
+        fingerprint = int.from_bytes(hashlib.blake2b((actor + limit.key).encode(), digest_size=8).digest(), "little")
+        fingerprint = fingerprint or 1
+        stripe = fingerprint % self._stripes
+        per_stripe = self._per_stripe
+        base = _HEADER.size + stripe * per_stripe * _SLOT.size
+        home = (fingerprint // self._stripes) % per_stripe
+        view, unpack = self._map, _SLOT.unpack_from
+        with self._locks[stripe]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, base)
+            try:
+                now = self._clock()
+                found = victim = None
+                victim_full_at = float("inf")
+                for step in range(PROBE_WINDOW):
+                    offset = base + (home + step) % per_stripe * _SLOT.size
+                    slot_key, tokens, stamp, full_at = unpack(view, offset)
+                    if slot_key == fingerprint:
+                        found = offset
+                        break
+                    if slot_key == 0 or full_at <= now:
+                        if victim_full_at > 0:      # an unused or already refilled slot beats any live one
+                            victim, victim_full_at = offset, 0
+                    elif full_at < victim_full_at:
+                        victim, victim_full_at = offset, full_at
+                if found is None:
+                    found, tokens, stamp = victim, limit.burst, now
+                tokens, wait = _take(tokens, stamp, now, limit)
+                _SLOT.pack_into(view, found, fingerprint, tokens, now, now + (limit.burst - tokens) / limit.rate)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, base)
+        return wait
+
+
+_limiter: RateLimiter | SharedRateLimiter = RateLimiter()
+
+
+def set_limiter(limiter: RateLimiter | SharedRateLimiter) -> None:
+    """Install the bucket table the authorize gate charges."""
+    global _limiter
+    _limiter = limiter
+
+
+def get_limiter() -> RateLimiter | SharedRateLimiter:
+    return _limiter
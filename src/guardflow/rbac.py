@@ -1,11 +1,20 @@
 """Casbin-based RBAC policy enforcement."""
 
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 
 import casbin
+from casbin.persist.adapter import Adapter, load_policy_line
+
+from guardflow.hierarchy import MAX_ROLE_DEPTH
+from guardflow.policy import policy_version
 
 DEFAULT_RBAC_MODEL_PATH = Path("model.conf")
 DEFAULT_RBAC_POLICY_PATH = Path("rbac_policy.csv")
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_CACHE_TTL = 300.0     # seconds
 
 
 class RbacDenial(Exception):
@@ -15,20 +24,131 @@ class RbacDenial(Exception):
         super().__init__(f"role '{role}' is not permitted to use tool '{tool}'")
 
 
+class DecisionCache:
+    """Thread-safe bounded LRU cache of enforcer decisions with a TTL.
+
+    Keys are ``(role, tool, policy_version)`` so entries from an older policy
+    can never answer for a newer one; ``clear()`` drops them eagerly on reload.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE, ttl: float | None = DEFAULT_CACHE_TTL) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple, tuple[bool, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> bool | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, allowed: bool) -> None:
+        expires = time.monotonic() + self.ttl if self.ttl is not None else 0.0
+        with self._lock:
+            self._entries[key] = (allowed, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class _TextAdapter(Adapter):
+    """Casbin adapter serving policy lines from an in-memory CSV string."""
+
+    def __init__(self, text: str) -> None:
+        self._text = text
+
+    def load_policy(self, model) -> None:
+        for line in self._text.splitlines():
+            load_policy_line(line.strip(), model)
+
+
 class RbacPolicy:
-    def __init__(self, model_path: Path, policy_path: Path) -> None:
-        self._enforcer = casbin.Enforcer(str(model_path), str(policy_path))
+    def __init__(self, model_path: Path, policy_path: Path, cache: DecisionCache | None = None) -> None:
+        # Read once: the enforcer is built from exactly the bytes the version hashes.
+        model_bytes = Path(model_path).read_bytes()
+        policy_bytes = Path(policy_path).read_bytes()
+        version = policy_version(model_bytes, policy_bytes)
+        self._init(model_bytes.decode(), policy_bytes.decode(), cache, version)
+
+    def _init(self, model_text: str, policy_text: str, cache: DecisionCache | None, version: str) -> None:
+        model = casbin.model.Model()
+        model.load_model_from_text(model_text)
+        self._enforcer = casbin.Enforcer(model, _TextAdapter(policy_text))
+        if "g" in model.keys():
+            # Casbin's link search takes one call per level, plus the starting role.
+            self._enforcer.get_role_manager().max_hierarchy_level = MAX_ROLE_DEPTH + 1
+        self._cache = cache if cache is not None else DecisionCache()
+        self.version = version
+
+    @classmethod
+    def from_text(
+        cls,
+        model_text: str,
+        policy_text: str,
+        version: str,
+        cache: DecisionCache | None = None,
+    ) -> "RbacPolicy":
+        """Build a policy from already-read file contents labelled with ``version``."""
+        rbac = cls.__new__(cls)
+        rbac._init(model_text, policy_text, cache, version)
+        return rbac
 
     @classmethod
     def load(
         cls,
         model_path: Path = DEFAULT_RBAC_MODEL_PATH,
         policy_path: Path = DEFAULT_RBAC_POLICY_PATH,
+        cache: DecisionCache | None = None,
     ) -> "RbacPolicy":
-        return cls(model_path, policy_path)
+        return cls(model_path, policy_path, cache)
+
+    @property
+    def enforcer(self) -> casbin.Enforcer:
+        return self._enforcer
+
+    @property
+    def role_links(self) -> list[tuple[str, str]]:
+        """``(member, parent)`` inheritance rules (``g`` lines); empty if the model has none."""
+        if "g" not in self._enforcer.get_model().keys():
+            return []
+        return [tuple(rule) for rule in self._enforcer.get_grouping_policy()]
+
+    @property
+    def cache(self) -> DecisionCache:
+        return self._cache
 
     def is_allowed(self, role: str, tool: str) -> bool:
-        return self._enforcer.enforce(role, tool)
+        key = (role, tool, self.version)
+        allowed = self._cache.get(key)
+        if allowed is None:
+            allowed = self._enforcer.enforce(role, tool)
+            self._cache.put(key, allowed)
+        return allowed
 
     def check(self, role: str, tool: str) -> None:
         if not self.is_allowed(role, tool):
@@ -1,16 +1,50 @@
-"""Red-team adversarial regression suite for guardflow."""
+"""Red-team adversarial regression suite for guardflow.
+
+Besides the built-in ``REDTEAM_CASES``, cases can be streamed from corpus
+files with ``load_cases()``:
+
+- ``*.jsonl``: one case object per line,
+  ``{"name": ..., "description": ..., "payload": {...}, "expected": "RBAC_DENIED"}``.
+  ``name`` defaults to ``<file>:<line>`` and ``description`` to empty.
+- ``*.json``: one case object, or a bare request payload.  The expected
+  outcome of a bare payload is looked up by file stem in an
+  ``expected.json`` manifest in the same directory.
+
+Directories are searched recursively in sorted order.  Each case is parsed
+only when it is reached.  ``shard=(i, n)`` keeps the cases whose location
+hashes to shard ``i`` of ``n``; locations are relative to the source
+argument, so every machine computes the same split.
+"""
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Literal
+import hashlib
+import json
+import zlib
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Literal, get_args
 
 from pydantic import ValidationError
 
+from guardflow.arguments import ArgumentViolation
+from guardflow.batch import DEFAULT_WINDOW, ordered_imap
+from guardflow.decisions import DecisionTable
 from guardflow.pipeline import run_pipeline
 from guardflow.policy import Policy, PolicyViolation
+from guardflow.ratelimit import RateLimited
 from guardflow.rbac import RbacDenial, RbacPolicy
+from guardflow.snapshot import PolicySnapshot
+
+ExpectedOutcome = Literal["ok", "SCHEMA_REJECTED", "UNAUTHORIZED_TOOL", "RBAC_DENIED", "ARGUMENT_DENIED", "RATE_LIMITED", "SANDBOX_ERROR"]
+MANIFEST = "expected.json"
+DEFAULT_CHUNK_SIZE = 256        # cases per worker task
 
-ExpectedOutcome = Literal["ok", "SCHEMA_REJECTED", "UNAUTHORIZED_TOOL", "RBAC_DENIED", "SANDBOX_ERROR"]
+
+class CaseLoadError(ValueError):
+    """A corpus file or line could not be turned into a ``RedteamCase``."""
 
 
 @dataclass
@@ -19,6 +53,7 @@ class RedteamCase:
     description: str
     payload: dict
     expected: ExpectedOutcome
+    tags: tuple[str, ...] = field(default=())
 
 
 @dataclass
@@ -88,9 +123,11 @@ REDTEAM_CASES: list[RedteamCase] = [
 ]
 
 
-def _run_case(case: RedteamCase, policy: Policy, rbac: RbacPolicy) -> CaseResult:
+def _run_case(
+    case: RedteamCase, policy: Policy, rbac: RbacPolicy, decisions: DecisionTable | None = None
+) -> CaseResult:
     try:
-        run_pipeline(case.payload, policy, rbac)
+        run_pipeline(case.payload, policy, rbac, decisions)
         actual, detail = "ok", ""
     except ValidationError as exc:
         actual, detail = "SCHEMA_REJECTED", str(exc)
@@ -98,6 +135,10 @@ def _run_case(case: RedteamCase, policy: Policy, rbac: RbacPolicy) -> CaseResult
         actual, detail = "UNAUTHORIZED_TOOL", f"Tool '{exc.tool}' is not in the allowlist"
     except RbacDenial as exc:
         actual, detail = "RBAC_DENIED", f"Role '{exc.role}' denied tool '{exc.tool}'"
+    except ArgumentViolation as exc:
+        actual, detail = "ARGUMENT_DENIED", str(exc)
+    except RateLimited as exc:
+        actual, detail = "RATE_LIMITED", str(exc)
     except Exception as exc:
         actual, detail = type(exc).__name__, str(exc)
     return CaseResult(case=case, actual=actual, passed=(actual == case.expected), detail=detail)
@@ -105,3 +146,186 @@ def _run_case(case: RedteamCase, policy: Policy, rbac: RbacPolicy) -> CaseResult
 
 def run_suite(policy: Policy, rbac: RbacPolicy) -> list[CaseResult]:
     return [_run_case(c, policy, rbac) for c in REDTEAM_CASES]
+
+
+# -- corpus loading --------------------------------------------------------------
+
+
+def parse_shard(text: str) -> tuple[int, int]:
+    """Parse ``"i/N"`` (1-based) into ``(i, N)``."""
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {text!r}") from None
+    if not 1 <= index <= count:
+        raise ValueError(f"shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+
+def _in_shard(location: str, shard: tuple[int, int] | None) -> bool:
+    return shard is None or zlib.crc32(location.encode()) % shard[1] == shard[0] - 1
+
+
+def _case(data: object, location: str, expected: str | None = None) -> RedteamCase:
+    if not isinstance(data, dict):
+        raise CaseLoadError(f"{location}: expected a JSON object")
+    if "payload" in data and "expected" in data:
+        expected, payload = data["expected"], data["payload"]
+        name, description = data.get("name", location), data.get("description", "")
+    elif expected is not None:
+        payload, name, description = data, location, ""
+    else:
+        raise CaseLoadError(f"{location}: no expected outcome (add it to {MANIFEST} or use a case object)")
+    if expected not in get_args(ExpectedOutcome):
+        raise CaseLoadError(f"{location}: unknown expected outcome {expected!r}")
+    return RedteamCase(name=name, description=description, payload=payload, expected=expected)
+
+
+def _manifest(directory: Path) -> dict:
+    path = directory / MANIFEST
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text())
+    except ValueError as exc:
+        raise CaseLoadError(f"{path}: {exc}") from exc
+
+
+def _load_jsonl(path: Path, prefix: str, shard: tuple[int, int] | None) -> Iterator[RedteamCase]:
+    with path.open(encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, 1):
+            location = f"{prefix}:{lineno}"
+            if not line.strip() or not _in_shard(location, shard):
+                continue
+            try:
+                data = json.loads(line)
+            except ValueError as exc:
+                raise CaseLoadError(f"{location}: {exc}") from exc
+            yield _case(data, location)
+
+
+def _load_json(path: Path, location: str, manifests: dict[Path, dict]) -> RedteamCase:
+    if path.parent not in manifests:
+        manifests[path.parent] = _manifest(path.parent)
+    try:
+        data = json.loads(path.read_bytes())
+    except ValueError as exc:
+        raise CaseLoadError(f"{location}: {exc}") from exc
+    return _case(data, location, manifests[path.parent].get(path.stem))
+
+
+def load_cases(sources: Iterable[Path], shard: tuple[int, int] | None = None) -> Iterator[RedteamCase]:
+    """Lazily yield the cases in ``sources`` (files or directories), optionally one shard of them."""
+    manifests: dict[Path, dict] = {}
+    for source in map(Path, sources):
+        if source.is_dir():
+            files = sorted(p for p in source.rglob("*") if p.suffix in (".json", ".jsonl") and p.name != MANIFEST)
+        elif source.exists():
+            files = [source]
+        else:
+            raise CaseLoadError(f"{source}: no such file or directory")
+        for path in files:
+            location = path.relative_to(source).as_posix() if source.is_dir() else path.name
+            if path.suffix == ".jsonl":
+                yield from _load_jsonl(path, location, shard)
+            elif _in_shard(location, shard):
+                yield _load_json(path, location, manifests)
+
+
+# -- incremental runs ------------------------------------------------------------
+
+
+def case_key(case: RedteamCase) -> str:
+    """Hash of a case's payload and expected outcome."""
+    body = json.dumps({"payload": case.payload, "expected": case.expected}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+class ResultLog:
+    """Append-only JSONL record of passing cases per policy version.
+
+    ``pending()`` drops cases whose (payload, expected outcome) already
+    passed under ``version``; ``record()`` appends new passes.  Failures
+    are never recorded, so they are re-run every time.
+    """
+
+    def __init__(self, path: Path, version: str) -> None:
+        self.path = Path(path)
+        self.version = version
+        self.skipped = 0
+        self._passed: set[str] = set()
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue    # a torn last line from an interrupted run
+                    if record.get("version") == version:
+                        self._passed.add(record["key"])
+        self._out = self.path.open("a", encoding="utf-8")
+
+    def pending(self, cases: Iterable[RedteamCase]) -> Iterator[RedteamCase]:
+        for case in cases:
+            if case_key(case) in self._passed:
+                self.skipped += 1
+            else:
+                yield case
+
+    def record(self, result: CaseResult) -> None:
+        if not result.passed:
+            return
+        key = case_key(result.case)
+        if key not in self._passed:
+            self._passed.add(key)
+            self._out.write(json.dumps({"version": self.version, "key": key, "name": result.case.name}) + "\n")
+
+    def close(self) -> None:
+        self._out.close()
+
+
+# -- parallel runs ---------------------------------------------------------------
+
+_worker_snapshot: PolicySnapshot | None = None
+
+
+def init_worker(paths: tuple[Path, Path, Path]) -> None:
+    """Process-pool initializer: load the policy once per worker."""
+    global _worker_snapshot
+    _worker_snapshot = PolicySnapshot.load(*paths)
+
+
+def worker_snapshot() -> PolicySnapshot | None:
+    return _worker_snapshot
+
+
+def _run_chunk(chunk: list[RedteamCase]) -> list[CaseResult]:
+    snapshot = _worker_snapshot
+    return [_run_case(case, snapshot.policy, snapshot.rbac, snapshot.decisions) for case in chunk]
+
+
+def _chunks(cases: Iterable[RedteamCase], size: int) -> Iterator[list[RedteamCase]]:
+    iterator = iter(cases)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def run_cases(
+    cases: Iterable[RedteamCase],
+    paths: tuple[Path, Path, Path],
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[CaseResult]:
+    """Run ``cases`` against the policy files in ``paths``, yielding results in case order.
+
+    With ``workers > 1`` chunks of cases are spread over a process pool;
+    at most a few chunks per worker are read ahead of the results.
+    """
+    if workers <= 1:
+        snapshot = PolicySnapshot.load(*paths)
+        for case in cases:
+            yield _run_case(case, snapshot.policy, snapshot.rbac, snapshot.decisions)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(paths,)) as executor:
+        for results in ordered_imap(executor, _run_chunk, _chunks(cases, chunk_size), workers * DEFAULT_WINDOW):
+            yield from results
@@ -0,0 +1,254 @@
+"""Opt-in, content-addressed cache of successful ``python_exec`` results.
+
+A result is stored under a SHA-256 of everything that determines it: the
+caller's role, the code, the image, the memory and CPU limits, the
+timeout and the output cap.  Because the role is part of the key, a
+result cached for one role is never served to another.  Only runs that
+exit with status 0 are stored.
+
+``ResultCache`` keeps an in-memory LRU with a TTL and, optionally, a
+directory of JSON files.  The disk tier survives restarts and can be
+shared by several processes.  Nothing is cached unless a cache is
+installed with ``set_cache()``.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+
+from guardflow import metrics, sandbox
+from guardflow.sandbox import SandboxEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 300.0             # seconds
+DEFAULT_DISK_MAX_ENTRIES = 4096
+_PRUNE_EVERY = 256              # disk writes between pruning passes
+
+HIT = "hit"
+MISS = "miss"
+BYPASS = "bypass"
+CACHE_ARG = "cache"             # python_exec argument; false skips the cache for that request
+
+
+def cache_key(role: str, code: str, timeout: int = sandbox.SANDBOX_TIMEOUT) -> str:
+    """Hash of the role and every input that determines a run's output."""
+    pool = sandbox.get_pool()
+    parts = {
+        "role": role,
+        "code": code,
+        "image": getattr(pool, "image", sandbox.SANDBOX_IMAGE),
+        "memory": sandbox.SANDBOX_MEMORY,
+        "nano_cpus": sandbox.SANDBOX_NANO_CPUS,
+        "timeout": timeout,
+        "max_output": sandbox.get_max_output(),
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def wants_cache(args: dict) -> bool:
+    """False when the request opted out with ``"cache": false``."""
+    return args.get(CACHE_ARG, True) is not False
+
+
+class ResultCache:
+    """Thread-safe LRU + TTL cache of sandbox results, with an optional disk tier."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl: float | None = DEFAULT_TTL,
+        directory: Path | None = None,
+        disk_max_entries: int = DEFAULT_DISK_MAX_ENTRIES,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = Path(directory) if directory is not None else None
+        self.disk_max_entries = disk_max_entries
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.ttl is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[0])
+            if entry is not None:
+                del self._entries[key]
+        found = self._disk_get(key)
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+        result, expires = found
+        self._remember(key, result, None if expires is None else expires - time.time())
+        return dict(result)
+
+    def put(self, key: str, result: dict) -> None:
+        """Store a run's result if it exited successfully."""
+        if result.get("exit_code") != 0:
+            return
+        result = {k: v for k, v in result.items() if k != "cache"}
+        self._remember(key, result)
+        with self._lock:
+            self.stores += 1
+        self._disk_put(key, result)
+
+    def bypassed(self) -> None:
+        with self._lock:
+            self.bypasses += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        if self.directory is not None:
+            for path in self.directory.glob("*/*.json"):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+    def _remember(self, key: str, result: dict, ttl: float | None = None) -> None:
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl if self.ttl is not None else ttl)
+        expires = time.monotonic() + ttl if ttl is not None else 0.0
+        with self._lock:
+            self._entries[key] = (result, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # -- disk tier -------------------------------------------------------------
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _disk_get(self, key: str) -> tuple[dict, float | None] | None:
+        """``(result, wall-clock expiry)`` from the disk tier, or None."""
+        if self.directory is None:
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_bytes())
+            result, expires = entry["result"], entry.get("expires")
+            if not isinstance(result, dict) or not isinstance(expires, (int, float, type(None))):
+                raise TypeError("malformed cache entry")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            path.unlink(missing_ok=True)    # torn, corrupt or hand-edited entry
+            return None
+        if expires is not None and expires <= time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return result, expires
+
+    def _disk_put(self, key: str, result: dict) -> None:
+        if self.directory is None:
+            return
+        path = self._path(key)
+        entry = {"expires": time.time() + self.ttl if self.ttl is not None else None, "result": result}
+        try:
+            path.parent.mkdir(exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(json.dumps(entry, separators=(",", ":")).encode())
+            os.replace(tmp, path)           # readers never see a partial file
+        except OSError as exc:
+            logger.warning("result cache write failed: %s", exc)
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % _PRUNE_EVERY == 0
+        if prune:
+            self.prune()
+
+    def prune(self) -> None:
+        """Drop expired disk entries, then the oldest beyond ``disk_max_entries``."""
+        if self.directory is None:
+            return
+        now = time.time()
+        live = []
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if self.ttl is not None and stat.st_mtime + self.ttl <= now:
+                path.unlink(missing_ok=True)
+            else:
+                live.append((stat.st_mtime, path))
+        live.sort()
+        for _, path in live[: max(0, len(live) - self.disk_max_entries)]:
+            path.unlink(missing_ok=True)
+
+
+def replay(result: dict) -> Iterator[SandboxEvent]:
+    """The events a streamed run would have produced for a cached ``result``."""
+    for stream in sandbox.STREAMS:
+        if result.get(stream):
+            yield SandboxEvent(stream, result[stream])
+    yield SandboxEvent("exit", {"exit_code": result["exit_code"], "truncated": result.get("truncated", {}), "cache": HIT})
+
+
+# -- process-wide cache ----------------------------------------------------------
+
+_cache: ResultCache | None = None
+
+
+def set_cache(cache: ResultCache | None) -> None:
+    global _cache
+    _cache = cache
+
+
+def get_cache() -> ResultCache | None:
+    return _cache
+
+
+def _stat(key: str):
+    cache = _cache
+    return cache.stats()[key] if cache is not None else None
+
+
+metrics.REGISTRY.gauge(
+    "guardflow_result_cache_hits_total", "python_exec results served from the cache (memory or disk).",
+    lambda: None if _cache is None else _stat("hits") + _stat("disk_hits"), kind="counter",
+)
+metrics.REGISTRY.gauge(
+    "guardflow_result_cache_misses_total", "Cacheable python_exec runs not found in the cache.",
+    lambda: _stat("misses"), kind="counter",
+)
+metrics.REGISTRY.gauge(
+    "guardflow_result_cache_entries", "python_exec results held in memory.", lambda: _stat("size")
+)
@@ -1,12 +1,36 @@
-"""Docker-based sandbox for isolated code execution."""
+"""Docker-based sandbox for isolated code execution.
+
+Container output is read as a demultiplexed stream, never buffered whole:
+``OutputLimiter`` keeps at most ``max_output`` bytes of each of stdout and
+stderr per execution, marks the cut, and counts what was dropped.  The
+generator APIs (``stream_python``, ``stream_execute``) yield output as it
+is produced; ``run_python`` / ``execute_python`` collect the same events
+into one result dict.
+"""
+
+import codecs
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from typing import NamedTuple
 
 import docker
 import requests.exceptions
 
+from guardflow import metrics
+
 SANDBOX_IMAGE = "python:3.12-slim"
 SANDBOX_TIMEOUT = 10          # seconds
 SANDBOX_MEMORY = "128m"
 SANDBOX_NANO_CPUS = 500_000_000  # 0.5 CPUs
+SANDBOX_MAX_CONCURRENCY = 4      # containers executing at once
+SANDBOX_MAX_QUEUE = 32           # callers allowed to wait for a slot
+SANDBOX_QUEUE_TIMEOUT = 5.0      # seconds a caller may wait for a slot
+SANDBOX_MAX_OUTPUT = 64 * 1024   # bytes kept per stream (stdout, stderr) per execution
+
+STREAMS = ("stdout", "stderr")
+TRUNCATION_MARKER = "\n[guardflow: {stream} truncated at {limit} bytes]\n"
 
 
 class SandboxError(Exception):
@@ -15,8 +39,221 @@ class SandboxError(Exception):
         super().__init__(message)
 
 
-def run_python(code: str, timeout: int = SANDBOX_TIMEOUT) -> dict:
-    """Execute Python code in an isolated Docker container.
+class SandboxBusy(Exception):
+    """The sandbox is saturated; the caller should back off and retry."""
+
+    def __init__(self, message: str, retry_after: float) -> None:
+        self.message = message
+        self.retry_after = retry_after
+        super().__init__(message)
+
+
+_client = None
+_client_pool_size = 0
+_client_lock = threading.Lock()
+
+
+def _connections_for(scheduler: "SandboxScheduler") -> int:
+    # Every caller the scheduler admits, running or queued, plus the warm
+    # pool's refill and a deadline kill.
+    return scheduler.max_concurrency + scheduler.max_queue + 2
+
+
+def get_client():
+    """Return the process-wide Docker client, connecting on first use.
+
+    The client keeps a pooled HTTP connection to the daemon, sized for the
+    configured scheduler's limits, instead of opening a new one per execution.
+    """
+    global _client, _client_pool_size
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                size = _connections_for(_scheduler)
+                try:
+                    _client = docker.from_env(max_pool_size=size)
+                except docker.errors.DockerException as exc:
+                    raise SandboxError(f"Docker unavailable: {exc}") from exc
+                _client_pool_size = size
+    return _client
+
+
+def reset_client() -> None:
+    """Drop the cached Docker client, e.g. after the daemon restarted."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+
+class SandboxScheduler:
+    """Admission control for sandbox executions.
+
+    At most ``max_concurrency`` executions run at once.  Up to ``max_queue``
+    further callers wait for a slot for at most ``queue_timeout`` seconds;
+    anyone beyond that, or whose wait times out, gets ``SandboxBusy``.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = SANDBOX_MAX_CONCURRENCY,
+        max_queue: int = SANDBOX_MAX_QUEUE,
+        queue_timeout: float = SANDBOX_QUEUE_TIMEOUT,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, cancelled: threading.Event | None = None) -> None:
+        """Take a slot, waiting in the queue if needed.
+
+        If ``cancelled`` is set while waiting (see ``wake()``), the caller
+        leaves the queue with ``SandboxError`` instead of taking a slot.
+        """
+        if cancelled is not None and cancelled.is_set():
+            raise SandboxError("execution cancelled")
+        deadline = time.monotonic() + self.queue_timeout
+        with self._cond:
+            if self.active >= self.max_concurrency:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise SandboxBusy("sandbox queue is full", retry_after=self.queue_timeout)
+                self.waiting += 1
+                try:
+                    while self.active >= self.max_concurrency:
+                        if cancelled is not None and cancelled.is_set():
+                            raise SandboxError("execution cancelled")
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timed_out += 1
+                            raise SandboxBusy(
+                                f"no sandbox slot free after {self.queue_timeout}s",
+                                retry_after=self.queue_timeout,
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+
+    def release(self) -> None:
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+    def wake(self) -> None:
+        """Wake every queued caller so cancelled ones can leave the queue."""
+        with self._cond:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, cancelled: threading.Event | None = None):
+        self.acquire(cancelled)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "active": self.active,
+                "waiting": self.waiting,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+            }
+
+
+class SandboxEvent(NamedTuple):
+    """One item of a streamed execution.
+
+    ``kind`` is ``"stdout"`` or ``"stderr"`` with decoded text as ``data``,
+    or ``"exit"`` (always last) with ``{"exit_code": int, "truncated":
+    {stream: dropped bytes}}``.
+    """
+
+    kind: str
+    data: object
+
+
+class OutputLimiter:
+    """Caps each output stream of one execution at ``max_bytes``.
+
+    Bytes are decoded incrementally, so a multi-byte character split
+    across chunks is not mangled.  Once a stream reaches the cap its text
+    ends with ``TRUNCATION_MARKER`` and further bytes are only counted.
+    """
+
+    def __init__(self, max_bytes: int = SANDBOX_MAX_OUTPUT) -> None:
+        self.max_bytes = max_bytes
+        self.kept = dict.fromkeys(STREAMS, 0)
+        self.dropped = dict.fromkeys(STREAMS, 0)
+        self._decoders = {stream: codecs.getincrementaldecoder("utf-8")("replace") for stream in STREAMS}
+
+    def feed(self, stream: str, chunk: bytes | None) -> str:
+        """Account for ``chunk`` and return the text to deliver (possibly empty)."""
+        if not chunk:
+            return ""
+        if self.dropped[stream]:
+            self.dropped[stream] += len(chunk)
+            return ""
+        room = self.max_bytes - self.kept[stream]
+        if len(chunk) <= room:
+            self.kept[stream] += len(chunk)
+            return self._decoders[stream].decode(chunk)
+        self.kept[stream] = self.max_bytes
+        self.dropped[stream] = len(chunk) - room
+        text = self._decoders[stream].decode(chunk[:room], final=True)
+        return text + TRUNCATION_MARKER.format(stream=stream, limit=self.max_bytes)
+
+    def events(self, stdout: bytes | None, stderr: bytes | None) -> Iterator[SandboxEvent]:
+        """Events for one demultiplexed ``(stdout, stderr)`` chunk."""
+        for stream, chunk in zip(STREAMS, (stdout, stderr)):
+            text = self.feed(stream, chunk)
+            if text:
+                yield SandboxEvent(stream, text)
+
+    def exit(self, exit_code: int) -> Iterator[SandboxEvent]:
+        """Flush partial characters, then the final ``exit`` event."""
+        for stream in STREAMS:
+            if not self.dropped[stream]:
+                text = self._decoders[stream].decode(b"", final=True)
+                if text:
+                    yield SandboxEvent(stream, text)
+        truncated = {stream: n for stream, n in self.dropped.items() if n}
+        yield SandboxEvent("exit", {"exit_code": exit_code, "truncated": truncated})
+
+
+def collect(events: Iterable[SandboxEvent]) -> dict:
+    """Gather streamed events into the ``run_python`` result dict.
+
+    ``truncated`` (dropped bytes per stream) is only present when output
+    was cut.
+    """
+    parts: dict[str, list[str]] = {stream: [] for stream in STREAMS}
+    final: dict = {"exit_code": None, "truncated": {}}
+    for kind, data in events:
+        if kind == "exit":
+            final = data
+        else:
+            parts[kind].append(data)
+    result = {"stdout": "".join(parts["stdout"]), "stderr": "".join(parts["stderr"]), "exit_code": final["exit_code"]}
+    if final["truncated"]:
+        result["truncated"] = final["truncated"]
+    return result
+
+
+def stream_python(
+    code: str, timeout: int = SANDBOX_TIMEOUT, max_output: int | None = None
+) -> Iterator[SandboxEvent]:
+    """Execute Python code in an isolated Docker container, yielding output as it arrives.
 
     Constraints applied:
     - No network access (network_mode=none)
@@ -24,14 +261,14 @@ def run_python(code: str, timeout: int = SANDBOX_TIMEOUT) -> dict:
     - 0.5 CPU quota
     - Hard timeout (container is killed if it exceeds it)
 
-    Returns a dict with ``stdout``, ``stderr``, and ``exit_code``.
+    stdout and stderr are read from one demultiplexed attach stream and
+    capped at ``max_output`` bytes each (default: ``get_max_output()``).
+    Closing the generator early kills and removes the container.
     Raises ``SandboxError`` on timeout or Docker failure.
     """
-    try:
-        client = docker.from_env()
-    except docker.errors.DockerException as exc:
-        raise SandboxError(f"Docker unavailable: {exc}") from exc
-
+    limiter = OutputLimiter(get_max_output() if max_output is None else max_output)
+    client = get_client()
+    started = time.perf_counter()
     container = client.containers.run(
         image=SANDBOX_IMAGE,
         command=["python", "-c", code],
@@ -42,16 +279,157 @@ def run_python(code: str, timeout: int = SANDBOX_TIMEOUT) -> dict:
         stdout=True,
         stderr=True,
     )
+    metrics.CONTAINER_SECONDS.observe(time.perf_counter() - started, "start")
+    timed_out = threading.Event()
+
+    def kill() -> None:
+        timed_out.set()
+        try:
+            container.kill()
+        except Exception:
+            pass  # already exited
+
+    deadline = threading.Timer(timeout, kill)
+    deadline.daemon = True
+    deadline.start()
     try:
-        status = container.wait(timeout=timeout)
-        exit_code = status["StatusCode"]
-        stdout = container.logs(stdout=True, stderr=False).decode()
-        stderr = container.logs(stdout=False, stderr=True).decode()
-        return {"stdout": stdout, "stderr": stderr, "exit_code": exit_code}
-    except requests.exceptions.ReadTimeout:
-        container.kill()
-        raise SandboxError(f"Code execution timed out after {timeout}s") from None
-    except Exception as exc:
-        raise SandboxError(str(exc)) from exc
+        try:
+            output = container.attach(stdout=True, stderr=True, stream=True, logs=True, demux=True)
+            for stdout, stderr in output:
+                yield from limiter.events(stdout, stderr)
+            status = container.wait(timeout=timeout)
+        except requests.exceptions.ReadTimeout:
+            kill()
+        except Exception as exc:
+            raise SandboxError(str(exc)) from exc
+        if timed_out.is_set():
+            raise SandboxError(f"Code execution timed out after {timeout}s")
+        yield from limiter.exit(status["StatusCode"])
     finally:
+        deadline.cancel()
+        started = time.perf_counter()
         container.remove(force=True)
+        metrics.CONTAINER_SECONDS.observe(time.perf_counter() - started, "remove")
+
+
+def run_python(code: str, timeout: int = SANDBOX_TIMEOUT, max_output: int | None = None) -> dict:
+    """Execute Python code in an isolated Docker container (see ``stream_python``).
+
+    Returns a dict with ``stdout``, ``stderr``, ``exit_code`` and, if any
+    output was cut, ``truncated``.  Raises ``SandboxError`` on timeout or
+    Docker failure.
+    """
+    return collect(stream_python(code, timeout, max_output))
+
+
+_pool = None
+_scheduler = SandboxScheduler()
+_max_output = SANDBOX_MAX_OUTPUT
+
+
+def set_scheduler(scheduler: SandboxScheduler) -> None:
+    """Install ``scheduler``; a cached Docker client too small for its limits is reconnected."""
+    global _scheduler
+    _scheduler = scheduler
+    if _client is not None and _client_pool_size < _connections_for(scheduler):
+        reset_client()
+
+
+def get_scheduler() -> SandboxScheduler:
+    return _scheduler
+
+
+def set_max_output(max_bytes: int) -> None:
+    """Set the default per-stream output cap of every execution."""
+    global _max_output
+    _max_output = max_bytes
+
+
+def get_max_output() -> int:
+    return _max_output
+
+
+def set_pool(pool) -> None:
+    """Route ``execute_python`` through a warm ``ContainerPool`` (``None`` disables it)."""
+    global _pool
+    _pool = pool
+
+
+def get_pool():
+    return _pool
+
+
+def stream_execute(
+    code: str, timeout: int = SANDBOX_TIMEOUT, cancelled: threading.Event | None = None
+) -> Iterator[SandboxEvent]:
+    """Generator form of ``execute_python``: yields ``SandboxEvent``\\ s as output arrives.
+
+    The scheduler slot is held until the generator finishes or is closed.
+    """
+    queued = time.perf_counter()
+    with _scheduler.slot(cancelled):
+        started = time.perf_counter()
+        metrics.SANDBOX_QUEUE_SECONDS.observe(started - queued)
+        pool = _pool
+        try:
+            if pool is not None:
+                yield from pool.stream(code, timeout)
+            else:
+                yield from stream_python(code, timeout)
+        finally:
+            metrics.SANDBOX_SECONDS.observe(time.perf_counter() - started, "oneshot" if pool is None else "pool")
+
+
+def execute_python(code: str, timeout: int = SANDBOX_TIMEOUT, cancelled: threading.Event | None = None) -> dict:
+    """Run code in the warm container pool if one is configured, else one-shot.
+
+    Every execution first takes a slot from the scheduler, so a burst of
+    calls queues (or fails fast with ``SandboxBusy``) instead of starting
+    an unbounded number of containers.  Setting ``cancelled`` before a
+    slot is granted abandons the call; a run already in a container is
+    bounded by ``timeout`` instead.
+    """
+    queued = time.perf_counter()
+    with _scheduler.slot(cancelled):
+        started = time.perf_counter()
+        metrics.SANDBOX_QUEUE_SECONDS.observe(started - queued)
+        pool = _pool
+        try:
+            if pool is not None:
+                return pool.run(code, timeout)
+            return run_python(code, timeout)
+        finally:
+            metrics.SANDBOX_SECONDS.observe(time.perf_counter() - started, "oneshot" if pool is None else "pool")
+
+
+def _pool_stat(key: str):
+    pool = _pool
+    return pool.stats()[key] if pool is not None else None
+
+
+metrics.REGISTRY.gauge(
+    "guardflow_sandbox_queue_depth", "Callers waiting for a sandbox slot.", lambda: _scheduler.waiting
+)
+metrics.REGISTRY.gauge(
+    "guardflow_sandbox_active", "Sandbox executions in progress.", lambda: _scheduler.active
+)
+metrics.REGISTRY.gauge(
+    "guardflow_sandbox_rejected_total", "Calls refused because the sandbox queue was full.",
+    lambda: _scheduler.rejected, kind="counter",
+)
+metrics.REGISTRY.gauge(
+    "guardflow_sandbox_queue_timeouts_total", "Calls that gave up waiting for a sandbox slot.",
+    lambda: _scheduler.timed_out, kind="counter",
+)
+metrics.REGISTRY.gauge(
+    "guardflow_sandbox_pool_idle", "Idle warm containers.", lambda: _pool_stat("idle")
+)
+metrics.REGISTRY.gauge(
+    "guardflow_sandbox_pool_busy", "Warm containers running code.", lambda: _pool_stat("busy")
+)
+metrics.REGISTRY.gauge(
+    "guardflow_sandbox_pool_created_total", "Warm containers started.", lambda: _pool_stat("created"), kind="counter"
+)
+metrics.REGISTRY.gauge(
+    "guardflow_sandbox_pool_recycled_total", "Warm containers retired.", lambda: _pool_stat("recycled"), kind="counter"
+)
@@ -0,0 +1,298 @@
+"""Warm container pool for the python_exec sandbox.
+
+Starting a fresh ``python:3.12-slim`` container dominates the latency of a
+one-shot ``run_python`` call.  ``ContainerPool`` keeps a set of idle,
+pre-started containers and runs submitted code in them with ``exec``.
+
+Per-request isolation guarantees of a pooled run:
+
+- Containers have the same limits as the one-shot path: no network,
+  128 MiB memory, 0.5 CPU.  In addition the root filesystem is read-only,
+  ``/tmp`` is a small tmpfs, and the process count is capped.
+- Only one execution runs in a container at a time.
+- Code runs as the unprivileged ``nobody`` user in a fresh scratch
+  directory (also ``$HOME``) under ``/tmp``, with ``python -I``.
+- After every run, every process owned by ``nobody`` is killed and ``/tmp``
+  is wiped, so no background process or file survives into the next run.
+- A container is discarded after ``max_uses`` runs, and immediately after
+  any non-zero exit, timeout or Docker error.
+
+What is *not* reset between runs in the same container: the kernel
+page cache and anything a run could change as root, which it cannot do
+here.  Use ``max_uses=1`` to get a fresh container for every run.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+
+from guardflow import metrics, sandbox
+from guardflow.sandbox import (
+    SANDBOX_IMAGE,
+    SANDBOX_MEMORY,
+    SANDBOX_NANO_CPUS,
+    SANDBOX_TIMEOUT,
+    OutputLimiter,
+    SandboxError,
+    SandboxEvent,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_SIZE = 2
+DEFAULT_MAX_SIZE = 8
+DEFAULT_MAX_USES = 50
+DEFAULT_REFILL_INTERVAL = 1.0     # seconds between background refill passes
+POOL_LABEL = "guardflow.sandbox.pool"
+TIMEOUT_BACKSTOP = 5              # seconds past the deadline before the in-container `timeout` fires
+
+# Runs the submitted code (passed as $0) in a scratch dir, then cleans up:
+# `kill -9 -1` from the nobody user kills every other nobody process.
+# The deadline itself is enforced from outside by killing the container, so
+# an exit status chosen by the code (124 included) is never read as a
+# timeout; the in-container `timeout` only covers a kill that failed.
+_RUNNER = (
+    'd=$(mktemp -d) && cd "$d" && '
+    'HOME="$d" timeout -k 1 "$1" python -I -c "$0"; rc=$?; '
+    "cd /; kill -9 -1 2>/dev/null; rm -rf /tmp/* /tmp/.[!.]* 2>/dev/null; exit $rc"
+)
+
+
+@dataclass
+class WarmContainer:
+    container: object
+    uses: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class ContainerPool:
+    """Pool of pre-started sandbox containers with background refill.
+
+    ``run()`` takes an idle container, or starts one if the pool is below
+    ``max_size``.  If neither is possible, or Docker fails while preparing
+    a warm container, it falls back to the one-shot ``sandbox.run_python``.
+    """
+
+    def __init__(
+        self,
+        min_size: int = DEFAULT_MIN_SIZE,
+        max_size: int = DEFAULT_MAX_SIZE,
+        max_uses: int = DEFAULT_MAX_USES,
+        image: str = SANDBOX_IMAGE,
+        refill_interval: float = DEFAULT_REFILL_INTERVAL,
+        client_factory: Callable[[], object] = sandbox.get_client,
+    ) -> None:
+        if not 0 <= min_size <= max_size:
+            raise ValueError("pool sizes must satisfy 0 <= min_size <= max_size")
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.image = image
+        self.refill_interval = refill_interval
+        self._client_factory = client_factory
+        self._client = None
+        self._idle: deque[WarmContainer] = deque()
+        self._busy = 0
+        self._starting = 0
+        self._retired: deque[WarmContainer] = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.created = 0
+        self.recycled = 0
+        self.fallbacks = 0
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refill_loop, name="guardflow-sandbox-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            doomed = list(self._idle) + list(self._retired)
+            self._idle.clear()
+            self._retired.clear()
+        for warm in doomed:
+            self._remove(warm)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "idle": len(self._idle),
+                "busy": self._busy,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "created": self.created,
+                "recycled": self.recycled,
+                "fallbacks": self.fallbacks,
+            }
+
+    # -- execution ---------------------------------------------------------
+
+    def run(self, code: str, timeout: int = SANDBOX_TIMEOUT) -> dict:
+        """Execute ``code`` in a warm container; same result shape as ``run_python``."""
+        warm = self._acquire()
+        if warm is None:
+            with self._lock:
+                self.fallbacks += 1
+            return sandbox.run_python(code, timeout)
+        return sandbox.collect(self._stream(warm, code, timeout))
+
+    def stream(self, code: str, timeout: int = SANDBOX_TIMEOUT) -> Iterator[SandboxEvent]:
+        """Execute ``code`` in a warm container, yielding output as ``stream_python`` does."""
+        warm = self._acquire()
+        if warm is None:
+            with self._lock:
+                self.fallbacks += 1
+            yield from sandbox.stream_python(code, timeout)
+            return
+        yield from self._stream(warm, code, timeout)
+
+    def _stream(self, warm: WarmContainer, code: str, timeout: int) -> Iterator[SandboxEvent]:
+        limiter = OutputLimiter(sandbox.get_max_output())
+        healthy = False
+        timed_out = threading.Event()
+
+        def kill() -> None:
+            timed_out.set()
+            try:
+                warm.container.kill()
+            except Exception:
+                pass  # already gone; the in-container backstop ends the run
+
+        deadline = threading.Timer(timeout, kill)
+        deadline.daemon = True
+        try:
+            api = self._docker().api
+            cmd = ["sh", "-c", _RUNNER, code, str(timeout + TIMEOUT_BACKSTOP)]
+            exec_id = api.exec_create(warm.container.id, cmd, user="nobody")["Id"]
+            deadline.start()
+            for stdout, stderr in api.exec_start(exec_id, stream=True, demux=True):
+                yield from limiter.events(stdout, stderr)
+            exit_code = api.exec_inspect(exec_id)["ExitCode"]
+            if timed_out.is_set():
+                raise SandboxError(f"Code execution timed out after {timeout}s")
+            healthy = exit_code == 0
+            yield from limiter.exit(exit_code)
+        except SandboxError:
+            raise
+        except Exception as exc:
+            if timed_out.is_set():
+                raise SandboxError(f"Code execution timed out after {timeout}s") from exc
+            raise SandboxError(str(exc)) from exc
+        finally:
+            deadline.cancel()
+            # A run abandoned mid-stream (generator closed) is not healthy either.
+            self._release(warm, healthy)
+
+    def _acquire(self) -> WarmContainer | None:
+        with self._lock:
+            if self._idle:
+                self._busy += 1
+                return self._idle.popleft()
+            if len(self._idle) + self._busy + self._starting >= self.max_size:
+                return None
+            self._starting += 1
+        try:
+            warm = self._create()
+        except Exception as exc:
+            logger.warning("could not start warm sandbox container: %s", exc)
+            warm = None
+        with self._lock:
+            self._starting -= 1
+            if warm is not None:
+                self._busy += 1
+        return warm
+
+    def _release(self, warm: WarmContainer, healthy: bool) -> None:
+        warm.uses += 1
+        with self._lock:
+            self._busy -= 1
+            if healthy and warm.uses < self.max_uses and not self._stop.is_set():
+                self._idle.append(warm)
+                return
+            self._retired.append(warm)
+            self.recycled += 1
+        self._wake.set()
+
+    # -- container management ----------------------------------------------
+
+    def _docker(self):
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def _create(self) -> WarmContainer:
+        started = time.perf_counter()
+        container = self._docker().containers.run(
+            image=self.image,
+            command=["sleep", "infinity"],
+            network_mode="none",
+            mem_limit=SANDBOX_MEMORY,
+            nano_cpus=SANDBOX_NANO_CPUS,
+            read_only=True,
+            tmpfs={"/tmp": "rw,size=64m,mode=1777"},
+            pids_limit=64,
+            labels={POOL_LABEL: "1"},
+            detach=True,
+        )
+        metrics.CONTAINER_SECONDS.observe(time.perf_counter() - started, "start")
+        with self._lock:
+            self.created += 1
+        return WarmContainer(container)
+
+    def _remove(self, warm: WarmContainer) -> None:
+        started = time.perf_counter()
+        try:
+            warm.container.remove(force=True)
+        except Exception as exc:
+            logger.warning("could not remove sandbox container: %s", exc)
+        metrics.CONTAINER_SECONDS.observe(time.perf_counter() - started, "remove")
+
+    def refill(self) -> None:
+        """Remove retired containers and start new ones up to ``min_size`` idle."""
+        while True:
+            with self._lock:
+                warm = self._retired.popleft() if self._retired else None
+            if warm is None:
+                break
+            self._remove(warm)
+        while not self._stop.is_set():
+            with self._lock:
+                total = len(self._idle) + self._busy + self._starting
+                if len(self._idle) >= self.min_size or total >= self.max_size:
+                    return
+                self._starting += 1
+            try:
+                warm = self._create()
+            except Exception as exc:
+                logger.warning("sandbox pool refill failed: %s", exc)
+                with self._lock:
+                    self._starting -= 1
+                return
+            with self._lock:
+                self._starting -= 1
+                self._idle.append(warm)
+
+    def _refill_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refill()
+            except Exception:
+                logger.exception("sandbox pool refill failed")
+            self._wake.wait(self.refill_interval)
+            self._wake.clear()
@@ -1,16 +1,35 @@
 """FastAPI HTTP wrapper for the guardflow pipeline."""
 from __future__ import annotations
 
+import asyncio
+import json
 import logging
+import math
+import os
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Any
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.requests import ClientDisconnect
 from pydantic import BaseModel, ValidationError
 
-from guardflow.models import Actor, RunRequest, ToolCall, ToolResult
-from guardflow.pipeline import authorize, validate
-from guardflow.policy import Policy, PolicyViolation
-from guardflow.rbac import RbacDenial, RbacPolicy
+from guardflow import audit, events, metrics, pipeline, ratelimit, result_cache, sandbox, warmup
+from guardflow.arguments import ArgumentViolation
+from guardflow.jobs import DEFAULT_MAX_PENDING, DEFAULT_MAX_RESULTS, DEFAULT_RESULT_TTL, JobQueue, JobQueueFull
+from guardflow.jsonstream import JsonItemParser, JsonStreamError
+from guardflow.models import RunRequest, ToolResult
+from guardflow.pipeline import check_request, run_pipeline_async
+from guardflow.policy import PolicyViolation
+from guardflow.ratelimit import RateLimited
+from guardflow.rbac import RbacDenial
+from guardflow.sandbox_pool import DEFAULT_MAX_USES, ContainerPool
+from guardflow.snapshot import PolicySnapshot, PolicyStore
 
 logger = logging.getLogger(__name__)
 
@@ -19,33 +38,197 @@ _MODEL_CONF_PATH = Path("/app/model.conf")
 _RBAC_POLICY_PATH = Path("/app/rbac_policy.csv")
 
 
-def _load_policy() -> Policy:
-    path = _POLICY_PATH if _POLICY_PATH.exists() else Path("policy.json")
-    return Policy.load(path)
+_store: PolicyStore | None = None
+_jobs: JobQueue | None = None
 
+MAX_JOB_WAIT = 30.0             # seconds a GET /jobs/{id} long-poll may block
 
-def _load_rbac() -> RbacPolicy:
-    model_path = _MODEL_CONF_PATH if _MODEL_CONF_PATH.exists() else Path("model.conf")
-    policy_path = _RBAC_POLICY_PATH if _RBAC_POLICY_PATH.exists() else Path("rbac_policy.csv")
-    return RbacPolicy.load(model_path, policy_path)
 
+def _get_store() -> PolicyStore:
+    """Return the process-wide policy store, loading it on first use.
 
-app = FastAPI(title="guardflow", version="0.1.0")
+    If ``GUARDFLOW_COMPILED_POLICY`` names a file written by ``guardflow
+    policy compile``, the store maps that file instead of the source files.
+    """
+    global _store
+    if _store is None:
+        compiled = os.environ.get("GUARDFLOW_COMPILED_POLICY")
+        if compiled:
+            _store = PolicyStore(compiled=Path(compiled))
+            return _store
+        _store = PolicyStore(
+            _POLICY_PATH if _POLICY_PATH.exists() else Path("policy.json"),
+            _MODEL_CONF_PATH if _MODEL_CONF_PATH.exists() else Path("model.conf"),
+            _RBAC_POLICY_PATH if _RBAC_POLICY_PATH.exists() else Path("rbac_policy.csv"),
+        )
+    return _store
+
+
+def _get_jobs() -> JobQueue:
+    """Return the process-wide job queue, sized from the environment on first use."""
+    global _jobs
+    if _jobs is None:
+        _jobs = JobQueue(
+            workers=int(os.environ.get("GUARDFLOW_JOB_WORKERS", sandbox.SANDBOX_MAX_CONCURRENCY)),
+            max_pending=int(os.environ.get("GUARDFLOW_JOB_QUEUE", DEFAULT_MAX_PENDING)),
+            max_results=int(os.environ.get("GUARDFLOW_JOB_RESULTS", DEFAULT_MAX_RESULTS)),
+            result_ttl=float(os.environ.get("GUARDFLOW_JOB_TTL", DEFAULT_RESULT_TTL)),
+        )
+    return _jobs
+
+
+def _pool_from_env() -> ContainerPool | None:
+    """Build the warm sandbox pool if ``GUARDFLOW_SANDBOX_POOL_MAX`` is set above 0."""
+    max_size = int(os.environ.get("GUARDFLOW_SANDBOX_POOL_MAX", "0"))
+    if max_size <= 0:
+        return None
+    return ContainerPool(
+        min_size=int(os.environ.get("GUARDFLOW_SANDBOX_POOL_MIN", min(2, max_size))),
+        max_size=max_size,
+        max_uses=int(os.environ.get("GUARDFLOW_SANDBOX_POOL_MAX_USES", DEFAULT_MAX_USES)),
+    )
+
+
+def _scheduler_from_env() -> sandbox.SandboxScheduler:
+    return sandbox.SandboxScheduler(
+        max_concurrency=int(os.environ.get("GUARDFLOW_SANDBOX_MAX_CONCURRENCY", sandbox.SANDBOX_MAX_CONCURRENCY)),
+        max_queue=int(os.environ.get("GUARDFLOW_SANDBOX_MAX_QUEUE", sandbox.SANDBOX_MAX_QUEUE)),
+        queue_timeout=float(os.environ.get("GUARDFLOW_SANDBOX_QUEUE_TIMEOUT", sandbox.SANDBOX_QUEUE_TIMEOUT)),
+    )
+
+
+def _result_cache_from_env() -> result_cache.ResultCache | None:
+    """A python_exec result cache when ``GUARDFLOW_RESULT_CACHE`` (max entries) is > 0."""
+    max_entries = int(os.environ.get("GUARDFLOW_RESULT_CACHE", "0"))
+    if max_entries <= 0:
+        return None
+    directory = os.environ.get("GUARDFLOW_RESULT_CACHE_DIR")
+    return result_cache.ResultCache(
+        max_entries=max_entries,
+        ttl=float(os.environ.get("GUARDFLOW_RESULT_CACHE_TTL", result_cache.DEFAULT_TTL)),
+        directory=Path(directory) if directory else None,
+    )
+
+
+def _warmup_from_env() -> warmup.SandboxWarmup | None:
+    """Startup sandbox warmup, unless ``GUARDFLOW_SANDBOX_WARMUP=0``."""
+    if os.environ.get("GUARDFLOW_SANDBOX_WARMUP", "1") == "0":
+        return None
+    return warmup.SandboxWarmup(
+        pull=os.environ.get("GUARDFLOW_SANDBOX_WARMUP_PULL", "1") != "0",
+        digest=os.environ.get("GUARDFLOW_SANDBOX_IMAGE_DIGEST") or None,
+        smoke_test=os.environ.get("GUARDFLOW_SANDBOX_WARMUP_SMOKE", "1") != "0",
+    )
+
+
+def _events_from_env():
+    """Configure pipeline event logging; returns the queue listener to stop on shutdown.
+
+    ``GUARDFLOW_LOG_EVENTS=1`` enables the events, ``GUARDFLOW_LOG_SAMPLE``
+    sets per-stage sampling, e.g. ``validate=0.01,authorize=0.1``.
+    """
+    events.configure(sample_rates=events.parse_sample_rates(os.environ.get("GUARDFLOW_LOG_SAMPLE", "")))
+    if os.environ.get("GUARDFLOW_LOG_EVENTS", "") not in ("", "0"):
+        logging.getLogger(events.EVENT_LOGGER).setLevel(logging.INFO)
+    return events.install_queue_handler()
+
+
+def _audit_from_env() -> audit.AuditSink | None:
+    """Build the audit sink if ``GUARDFLOW_AUDIT_LOG`` names a file."""
+    path = os.environ.get("GUARDFLOW_AUDIT_LOG")
+    if not path:
+        return None
+    fsync = os.environ.get("GUARDFLOW_AUDIT_FSYNC", str(audit.DEFAULT_FSYNC_INTERVAL))
+    return audit.AuditSink(
+        Path(path),
+        max_bytes=int(os.environ.get("GUARDFLOW_AUDIT_MAX_BYTES", audit.DEFAULT_MAX_BYTES)),
+        backups=int(os.environ.get("GUARDFLOW_AUDIT_BACKUPS", audit.DEFAULT_BACKUPS)),
+        fsync_interval=None if fsync == "off" else float(fsync),
+        max_queue=int(os.environ.get("GUARDFLOW_AUDIT_MAX_QUEUE", audit.DEFAULT_MAX_QUEUE)),
+    )
+
+
+def _rate_limiter_from_env() -> ratelimit.SharedRateLimiter | None:
+    """A rate-limit table shared by every worker if ``GUARDFLOW_RATE_LIMIT_SHM`` names a file.
+
+    Without one, each worker process keeps its own in-process buckets.
+    """
+    path = os.environ.get("GUARDFLOW_RATE_LIMIT_SHM")
+    if not path:
+        return None
+    return ratelimit.SharedRateLimiter(
+        Path(path), slots=int(os.environ.get("GUARDFLOW_RATE_LIMIT_SLOTS", ratelimit.DEFAULT_SLOTS))
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listener = _events_from_env()
+    audit_sink = _audit_from_env()
+    if audit_sink is not None:
+        audit_sink.start()
+        audit.set_sink(audit_sink)
+    shared_limiter = _rate_limiter_from_env()
+    if shared_limiter is not None:
+        ratelimit.set_limiter(shared_limiter)
+    store = _get_store()
+    store.start()
+    scheduler = _scheduler_from_env()
+    sandbox.set_scheduler(scheduler)
+    sandbox.set_max_output(int(os.environ.get("GUARDFLOW_SANDBOX_MAX_OUTPUT", sandbox.SANDBOX_MAX_OUTPUT)))
+    result_cache.set_cache(_result_cache_from_env())
+    # One executor thread per call the scheduler can run or queue; beyond
+    # that it answers SANDBOX_BUSY without tying up a thread.
+    executor = ThreadPoolExecutor(
+        max_workers=scheduler.max_concurrency + scheduler.max_queue,
+        thread_name_prefix="guardflow-exec",
+    )
+    pipeline.set_executor(executor)
+    jobs = _get_jobs()
+    jobs.start()
+    pool = _pool_from_env()
+    if pool is not None:
+        pool.start()
+        sandbox.set_pool(pool)
+    sandbox_warmup = _warmup_from_env()
+    if sandbox_warmup is not None:
+        warmup.set_warmup(sandbox_warmup)
+        sandbox_warmup.start()
+    try:
+        yield
+    finally:
+        if sandbox_warmup is not None:
+            sandbox_warmup.stop()
+            warmup.set_warmup(None)
+        store.stop()
+        jobs.stop()
+        pipeline.set_executor(None)
+        result_cache.set_cache(None)
+        executor.shutdown(wait=False, cancel_futures=True)
+        if pool is not None:
+            sandbox.set_pool(None)
+            pool.stop()
+        if audit_sink is not None:
+            audit.set_sink(None)
+            audit_sink.close()
+        if shared_limiter is not None:
+            ratelimit.set_limiter(ratelimit.RateLimiter())
+            shared_limiter.close()
+        events.uninstall_queue_handler(listener)
+
+
+app = FastAPI(title="guardflow", version="0.1.0", lifespan=lifespan)
 
 
 class _HealthFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
-        return "GET /health" not in record.getMessage()
+        message = record.getMessage()
+        return "GET /health" not in message and "GET /ready" not in message
 
 
 logging.getLogger("uvicorn.access").addFilter(_HealthFilter())
 
 
-class AuthorizeRequest(BaseModel):
-    actor: Actor
-    tool_call: ToolCall
-
-
 class AuthorizeResponse(BaseModel):
     ok: bool
     step: str
@@ -53,32 +236,350 @@ class AuthorizeResponse(BaseModel):
 
 
 @app.get("/health")
-def health() -> dict:
+async def health() -> dict:
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready(response: Response) -> dict:
+    """Readiness probe: 200 once the sandbox backend can serve executions, 503 before."""
+    sandbox_warmup = warmup.get_warmup()
+    if sandbox_warmup is None:
+        return {"ready": True, "state": "disabled"}
+    report = await run_in_threadpool(sandbox_warmup.status)
+    if not report["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return report
+
+
+@app.get("/policy")
+async def policy_status() -> dict:
+    store = _get_store()
+    return {
+        "version": store.version,
+        "reloads": store.reload_count,
+        "last_error": store.last_error,
+        "compiled": store.current.decisions is not None,
+        "cache": store.cache.stats(),
+    }
+
+
+def _schema_errors(exc: ValidationError) -> list[dict]:
+    # A json_invalid error's input is the whole raw body; don't echo it back.
+    return [
+        {k: v for k, v in error.items() if k != "input"} if error["type"] == "json_invalid" else error
+        for error in exc.errors(include_url=False)
+    ]
+
+
+# Pipeline exception → (HTTP status, error body).  ``/authorize/batch``
+# reports the same status and body per item instead of raising.
+_ERRORS: tuple[tuple[type[Exception], int, Callable[[Any], dict]], ...] = (
+    (ValidationError, status.HTTP_422_UNPROCESSABLE_CONTENT,
+     lambda exc: {"code": "SCHEMA_REJECTED", "errors": _schema_errors(exc)}),
+    (PolicyViolation, status.HTTP_403_FORBIDDEN, lambda exc: {"code": "UNAUTHORIZED_TOOL", "tool": exc.tool}),
+    (RbacDenial, status.HTTP_403_FORBIDDEN, lambda exc: {"code": "RBAC_DENIED", "role": exc.role, "tool": exc.tool}),
+    (ArgumentViolation, status.HTTP_403_FORBIDDEN,
+     lambda exc: {"code": "ARGUMENT_DENIED", "tool": exc.tool, "arg": exc.arg, "detail": exc.reason}),
+    (RateLimited, status.HTTP_429_TOO_MANY_REQUESTS,
+     lambda exc: {"code": "RATE_LIMITED", "actor": exc.actor, "tool": exc.tool, "retry_after": exc.retry_after}),
+    (sandbox.SandboxBusy, status.HTTP_503_SERVICE_UNAVAILABLE,
+     lambda exc: {"code": "SANDBOX_BUSY", "detail": exc.message, "retry_after": exc.retry_after}),
+    (JobQueueFull, status.HTTP_503_SERVICE_UNAVAILABLE,
+     lambda exc: {"code": "JOB_QUEUE_FULL", "pending": exc.pending, "retry_after": exc.retry_after}),
+    (sandbox.SandboxError, status.HTTP_500_INTERNAL_SERVER_ERROR,
+     lambda exc: {"code": "SANDBOX_ERROR", "detail": exc.message}),
+)
+
+
+def _error(exc: Exception) -> tuple[int, dict] | None:
+    """The HTTP status and error body for a pipeline exception, or None if unknown."""
+    for exc_type, status_code, detail in _ERRORS:
+        if isinstance(exc, exc_type):
+            return status_code, detail(exc)
+    return None
+
+
+def _http_error(exc: Exception) -> HTTPException | None:
+    """Map a pipeline exception to the HTTP error the endpoints return, or None if unknown."""
+    error = _error(exc)
+    if error is None:
+        return None
+    status_code, detail = error
+    headers = None
+    if "retry_after" in detail:
+        headers = {"Retry-After": str(max(1, math.ceil(detail["retry_after"])))}
+    return HTTPException(status_code=status_code, detail=detail, headers=headers)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint() -> PlainTextResponse:
+    """Pipeline and sandbox metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def _authorized(request: RunRequest) -> Response:
+    """The ``/authorize`` success body, serialized straight from the validated request."""
+    return Response(
+        f'{{"ok":true,"step":"authorize","data":{request.model_dump_json()}}}', media_type="application/json"
+    )
+
+
+def _tool_result(result: ToolResult) -> Response:
+    return Response(result.model_dump_json(), media_type="application/json")
+
+
 @app.post("/authorize", response_model=AuthorizeResponse)
-def authorize_endpoint(request: AuthorizeRequest) -> AuthorizeResponse:
-    policy = _load_policy()
-    rbac = _load_rbac()
-    raw = request.model_dump()
+async def authorize_endpoint(request: Request) -> Response:
+    """Validate and authorize one request without executing it.
+
+    The body is validated straight from its raw bytes, and the validated
+    request is serialized once for the response.
+    """
+    # Validation and authorization are CPU-only lookups, cheap enough to run
+    # on the event loop without taking a threadpool slot.
+    body = await request.body()
+    snapshot = _get_store().current
     try:
-        run_request = validate(raw)
-    except ValidationError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail={"code": "SCHEMA_REJECTED", "errors": exc.errors()},
-        ) from exc
+        run_request = check_request(body, snapshot.policy, snapshot.rbac, snapshot.decisions, snapshot.version)
+    except (ValidationError, PolicyViolation, RbacDenial, ArgumentViolation, RateLimited) as exc:
+        raise _http_error(exc) from exc
+    return _authorized(run_request)
+
+
+CLIENT_CLOSED_REQUEST = 499     # nginx convention; never seen by the client
+
+
+async def _until_disconnected(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _cancel_on_disconnect(request: Request, coro):
+    """Await ``coro``, cancelling it if the client disconnects first.
+
+    Returns ``(True, result)`` on completion or ``(False, None)`` if the
+    client went away.  Must only be called once the body has been read.
+    """
+    task = asyncio.ensure_future(coro)
+    watcher = asyncio.ensure_future(_until_disconnected(request))
     try:
-        authorize(run_request, policy, rbac)
-    except PolicyViolation as exc:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={"code": "UNAUTHORIZED_TOOL", "tool": exc.tool},
-        ) from exc
-    except RbacDenial as exc:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            await asyncio.wait({task})
+    if task.cancelled():
+        return False, None
+    return True, task.result()
+
+
+@app.post("/run", response_model=AuthorizeResponse)
+async def run_endpoint(request: Request):
+    """Validate, authorize and execute one request, returning the tool result.
+
+    Execution of blocking tools is offloaded to a bounded executor, so
+    waiting requests hold no thread.  If the client disconnects before the
+    result is ready, the pending execution is cancelled.
+    """
+    body = await request.body()
+    snapshot = _get_store().current
+    try:
+        finished, result = await _cancel_on_disconnect(
+            request, run_pipeline_async(body, snapshot.policy, snapshot.rbac, snapshot.decisions, snapshot.version)
+        )
+    except Exception as exc:
+        error = _http_error(exc)
+        if error is None:
+            raise
+        raise error from exc
+    if not finished:
+        logger.info("client disconnected; execution cancelled")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    return _tool_result(result)
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+
+
+@app.post("/run/stream")
+async def run_stream_endpoint(request: Request):
+    """Validate and authorize a request, then stream its execution as Server-Sent Events.
+
+    python_exec output arrives as ``stdout`` / ``stderr`` events (JSON
+    string data, capped per stream at ``GUARDFLOW_SANDBOX_MAX_OUTPUT``
+    bytes) followed by one ``exit`` event; other tools send one ``result``
+    event.  Rejections, and failures before the first event (such as
+    ``SANDBOX_BUSY``), return the usual JSON errors; a failure after that
+    is sent as an ``error`` event.  A client that disconnects stops the
+    execution.
+    """
+    body = await request.body()
+    snapshot = _get_store().current
+    timings: dict[str, float] = {}
+    try:
+        run_request = check_request(
+            body, snapshot.policy, snapshot.rbac, snapshot.decisions, snapshot.version, timings=timings
+        )
+    except (ValidationError, PolicyViolation, RbacDenial, ArgumentViolation, RateLimited) as exc:
+        raise _http_error(exc) from exc
+
+    def record(exc: Exception | None) -> None:
+        timings["execute"] = time.perf_counter() - started
+        pipeline.record_outcome(run_request, exc, snapshot.version, timings)
+
+    started = time.perf_counter()
+    execution = pipeline.execute_stream_async(run_request)
+    try:
+        # Wait for the first event before answering, so queueing failures get a status code.
+        finished, first = await _cancel_on_disconnect(request, anext(execution, None))
+    except (sandbox.SandboxBusy, sandbox.SandboxError) as exc:
+        record(exc)
+        raise _http_error(exc) from exc
+    if not finished:
+        logger.info("client disconnected; execution cancelled")
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+
+    async def stream():
+        try:
+            if first is not None:
+                yield _sse(*first)
+            async for event in execution:
+                yield _sse(*event)
+        except (sandbox.SandboxBusy, sandbox.SandboxError) as exc:
+            record(exc)
+            yield _sse("error", _http_error(exc).detail)
+        else:
+            record(None)
+        finally:
+            await execution.aclose()
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/execute", status_code=status.HTTP_202_ACCEPTED)
+async def execute_endpoint(request: Request, response: Response) -> dict:
+    """Validate and authorize a request, then queue its execution.
+
+    Returns the job id straight away; poll ``GET /jobs/{id}`` for the result.
+    Schema and policy rejections are reported synchronously, as by ``/authorize``.
+    """
+    body = await request.body()
+    snapshot = _get_store().current
+    timings: dict[str, float] = {}
+    try:
+        run_request = check_request(
+            body, snapshot.policy, snapshot.rbac, snapshot.decisions, snapshot.version, timings=timings
+        )
+    except (ValidationError, PolicyViolation, RbacDenial, ArgumentViolation, RateLimited) as exc:
+        raise _http_error(exc) from exc
+    try:
+        # The job records its outcome when it finishes.
+        job = _get_jobs().submit(run_request, snapshot.version, timings)
+    except JobQueueFull as exc:
+        pipeline.record_outcome(run_request, exc, snapshot.version, timings, outcome="JOB_QUEUE_FULL")
+        raise _http_error(exc) from exc
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, wait: float = 0.0) -> dict:
+    """Return a job's status and, once finished, its result or error.
+
+    With ``wait`` > 0 the request long-polls for up to that many seconds
+    (capped at ``MAX_JOB_WAIT``) until the job finishes.
+    """
+    jobs = _get_jobs()
+    job = jobs.get(job_id)
+    if job is None:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={"code": "RBAC_DENIED", "role": exc.role, "tool": exc.tool},
-        ) from exc
-    return AuthorizeResponse(ok=True, step="authorize", data=run_request.model_dump())
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail={"code": "JOB_NOT_FOUND", "job_id": job_id},
+        )
+    if wait > 0 and not job.finished:
+        await jobs.wait(job, min(wait, MAX_JOB_WAIT))
+    return job.to_dict()
+
+
+def _batch_result(index: int, item, snapshot: PolicySnapshot) -> dict:
+    """Authorize one batch item, returning the same codes ``/authorize`` would."""
+    if isinstance(item, JsonStreamError):
+        return {
+            "index": index,
+            "ok": False,
+            "status": status.HTTP_422_UNPROCESSABLE_CONTENT,
+            "error": {"code": "SCHEMA_REJECTED", "errors": [{"type": "json_invalid", "msg": str(item)}]},
+        }
+    try:
+        run_request = check_request(item, snapshot.policy, snapshot.rbac, snapshot.decisions, snapshot.version)
+    except (ValidationError, PolicyViolation, RbacDenial, ArgumentViolation, RateLimited) as exc:
+        status_code, error = _error(exc)
+        return {"index": index, "ok": False, "status": status_code, "error": error}
+    return {"index": index, "ok": True, "step": "authorize", "data": run_request.model_dump()}
+
+
+class _RequestBodyStreamingResponse(StreamingResponse):
+    """A streaming response whose body iterator reads the request body.
+
+    ``StreamingResponse`` normally listens for ``http.disconnect`` in
+    parallel (for ASGI spec < 2.4), which would consume the request body
+    messages the iterator still needs.  Here the iterator is the only reader
+    of ``receive``: a disconnect during upload surfaces from
+    ``request.stream()`` and one during download from ``send``.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.stream_response(send)
+        except OSError:
+            raise ClientDisconnect() from None
+        if self.background is not None:
+            await self.background()
+
+
+def _batch_chunk(parser: JsonItemParser, chunk: bytes | None, start: int, snapshot: PolicySnapshot) -> tuple[bytes, int]:
+    """Parse one body chunk (``None`` = end of body) and authorize its items as NDJSON lines."""
+    items = parser.close() if chunk is None else parser.feed(chunk)
+    lines = "".join(
+        json.dumps(_batch_result(start + i, item, snapshot), default=str) + "\n"
+        for i, item in enumerate(items)
+    )
+    return lines.encode(), len(items)
+
+
+@app.post("/authorize/batch")
+async def authorize_batch_endpoint(request: Request) -> StreamingResponse:
+    """Authorize a JSON array or NDJSON body of requests.
+
+    Results stream back as NDJSON, one line per item in input order.  The
+    policy snapshot is resolved once for the whole batch and the body is
+    parsed as it arrives, so memory stays flat however large the batch is.
+    Parsing and authorization run in the threadpool, one body chunk at a
+    time, so a large batch does not block the event loop.
+    """
+    snapshot = _get_store().current
+
+    async def stream():
+        parser = JsonItemParser()
+        index = 0
+        async for chunk in request.stream():
+            if not chunk:
+                continue
+            body, count = await run_in_threadpool(_batch_chunk, parser, chunk, index, snapshot)
+            index += count
+            if body:
+                yield body
+        body, _ = await run_in_threadpool(_batch_chunk, parser, None, index, snapshot)
+        if body:
+            yield body
+
+    return _RequestBodyStreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Policy-Version": snapshot.version},
+    )
@@ -0,0 +1,211 @@
+"""Process-wide policy snapshot with atomic hot reload."""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from guardflow.compiled import CompiledPolicy
+from guardflow.decisions import DecisionTable, PolicyCompileError, compile_decisions, verify_decisions
+from guardflow.policy import DEFAULT_POLICY_PATH, Policy, policy_version
+from guardflow.rbac import DEFAULT_RBAC_MODEL_PATH, DEFAULT_RBAC_POLICY_PATH, DecisionCache, RbacPolicy
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 1.0   # seconds between mtime checks
+DEFAULT_DEBOUNCE = 0.5        # seconds a change must stay stable before reloading
+
+
+def _signature(paths: tuple[Path, ...]) -> tuple:
+    sig = []
+    for path in paths:
+        try:
+            st = path.stat()
+        except OSError:
+            sig.append(None)
+        else:
+            sig.append((st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+@dataclass(frozen=True)
+class PolicySnapshot:
+    """An immutable, fully-parsed view of the allowlist and RBAC policy.
+
+    ``decisions`` holds the compiled decision table when the RBAC model is a
+    plain ACL and the table was proven equivalent to Casbin; it is ``None``
+    for models that must be evaluated by the enforcer.  A snapshot loaded
+    from a compiled policy file answers from the mapped file and has no
+    ``rbac`` enforcer.
+    """
+
+    policy: Policy
+    rbac: RbacPolicy | None
+    version: str
+    loaded_at: float
+    decisions: DecisionTable | CompiledPolicy | None = None
+
+    @classmethod
+    def load(
+        cls,
+        policy_path: Path = DEFAULT_POLICY_PATH,
+        model_path: Path = DEFAULT_RBAC_MODEL_PATH,
+        rbac_policy_path: Path = DEFAULT_RBAC_POLICY_PATH,
+        cache: DecisionCache | None = None,
+    ) -> "PolicySnapshot":
+        # Each file is read exactly once so the version always labels the
+        # bytes that were actually parsed, even if a file changes mid-load.
+        policy_bytes = Path(policy_path).read_bytes()
+        model_bytes = Path(model_path).read_bytes()
+        rbac_bytes = Path(rbac_policy_path).read_bytes()
+        version = policy_version(policy_bytes, model_bytes, rbac_bytes)
+        policy = Policy.model_validate(json.loads(policy_bytes))
+        rbac = RbacPolicy.from_text(model_bytes.decode(), rbac_bytes.decode(), version, cache)
+        return cls(
+            policy=policy,
+            rbac=rbac,
+            version=version,
+            loaded_at=time.time(),
+            decisions=_compile(policy, rbac),
+        )
+
+    @classmethod
+    def load_compiled(cls, path: Path) -> "PolicySnapshot":
+        """Map a file written by ``guardflow policy compile``; only its ``policy.json`` is parsed."""
+        compiled = CompiledPolicy(path)
+        return cls(
+            policy=Policy.model_validate_json(compiled.policy_json),
+            rbac=None,
+            version=compiled.version,
+            loaded_at=time.time(),
+            decisions=compiled,
+        )
+
+
+def _compile(policy: Policy, rbac: RbacPolicy) -> DecisionTable | None:
+    try:
+        table = compile_decisions(policy, rbac)
+    except PolicyCompileError as exc:
+        logger.info("decision table not compiled, using Casbin enforcement: %s", exc)
+        return None
+    mismatches = verify_decisions(table, policy, rbac)
+    if mismatches:
+        logger.warning("compiled decision table disagrees with Casbin on %d pairs, discarding", len(mismatches))
+        return None
+    return table
+
+
+class PolicyStore:
+    """Holds the active ``PolicySnapshot`` and swaps it when the files change.
+
+    The snapshot is built once up front; readers take ``store.current`` and
+    use it for the whole request, so a concurrent reload never exposes a
+    half-built policy.  ``start()`` runs a daemon thread that polls file
+    mtimes and reloads once a change has been stable for ``debounce`` seconds.
+    A reload that fails to parse is logged and the previous snapshot is kept.
+
+    All snapshots share one ``DecisionCache`` for Casbin decisions, which is
+    cleared whenever a new version is swapped in.
+
+    With ``compiled``, the store serves that compiled policy file instead of
+    the three source files, and reloads when it is replaced.
+    """
+
+    def __init__(
+        self,
+        policy_path: Path = DEFAULT_POLICY_PATH,
+        model_path: Path = DEFAULT_RBAC_MODEL_PATH,
+        rbac_policy_path: Path = DEFAULT_RBAC_POLICY_PATH,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        debounce: float = DEFAULT_DEBOUNCE,
+        compiled: Path | None = None,
+    ) -> None:
+        self._compiled = compiled is not None
+        self._paths = (Path(compiled),) if compiled is not None else (
+            Path(policy_path), Path(model_path), Path(rbac_policy_path)
+        )
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.reload_count = 0
+        self.last_error: str | None = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._pending: tuple | None = None
+        self._pending_since = 0.0
+        self.cache = DecisionCache()
+        self._loaded_sig = _signature(self._paths)
+        self._current = self._load()
+
+    def _load(self) -> PolicySnapshot:
+        if self._compiled:
+            return PolicySnapshot.load_compiled(self._paths[0])
+        return PolicySnapshot.load(*self._paths, cache=self.cache)
+
+    @property
+    def current(self) -> PolicySnapshot:
+        return self._current
+
+    @property
+    def version(self) -> str:
+        return self._current.version
+
+    def reload(self) -> bool:
+        """Rebuild the snapshot from disk; return True if a new version was swapped in."""
+        with self._lock:
+            sig = _signature(self._paths)
+            try:
+                snapshot = self._load()
+            except Exception as exc:
+                self._loaded_sig = sig
+                self.last_error = str(exc)
+                logger.error("policy reload failed, keeping version %s: %s", self._current.version, exc)
+                return False
+            self._loaded_sig = sig
+            self.last_error = None
+            if snapshot.version == self._current.version:
+                return False
+            self._current = snapshot
+            self.cache.clear()
+            self.reload_count += 1
+            logger.info("policy reloaded: version %s", snapshot.version)
+            return True
+
+    def check(self, now: float | None = None) -> bool:
+        """Poll the files once; reload if a change has settled past the debounce window."""
+        now = time.monotonic() if now is None else now
+        sig = _signature(self._paths)
+        if sig == self._loaded_sig:
+            self._pending = None
+            return False
+        if sig != self._pending:
+            self._pending = sig
+            self._pending_since = now
+            return False
+        if now - self._pending_since < self.debounce:
+            return False
+        self._pending = None
+        return self.reload()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="guardflow-policy-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("policy watcher check failed")
@@ -0,0 +1,253 @@
+"""Sandbox warmup at startup, and the readiness report behind ``GET /ready``.
+
+``SandboxWarmup`` runs once in a background thread when the server starts.
+It checks that the Docker daemon answers and that the sandbox image is
+present, pulling it if allowed.  If a digest is pinned, it checks that the
+image matches it.  It then times one one-shot run as the cold-start
+baseline.  With a warm pool installed it also fills the pool to
+``min_size`` and times a warm run.  A failed attempt is retried every
+``retry_interval`` seconds.
+
+``status()`` is what the readiness probe reports.  Once warmup is done it
+re-pings Docker at most every ``recheck_interval`` seconds, so a replica
+whose daemon goes away drops out of rotation.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Callable
+
+import docker
+from docker.utils import parse_repository_tag
+
+from guardflow import metrics, sandbox
+from guardflow.sandbox import SANDBOX_IMAGE, SANDBOX_TIMEOUT, SandboxError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_INTERVAL = 5.0        # seconds between failed warmup attempts
+DEFAULT_RECHECK_INTERVAL = 5.0      # seconds a Docker ping result is reused by status()
+_STOP_TIMEOUT = 5.0                 # seconds stop() waits for an attempt in progress (e.g. a pull)
+SMOKE_CODE = "print('ok')"
+
+PENDING = "pending"
+WARMING = "warming"
+READY = "ready"
+FAILED = "failed"
+
+
+class SandboxWarmup:
+    """Prepares the sandbox backend and reports whether it can serve at full speed."""
+
+    def __init__(
+        self,
+        image: str | None = None,
+        pull: bool = True,
+        digest: str | None = None,
+        smoke_test: bool = True,
+        retry_interval: float = DEFAULT_RETRY_INTERVAL,
+        recheck_interval: float = DEFAULT_RECHECK_INTERVAL,
+        client_factory: Callable[[], object] = sandbox.get_client,
+    ) -> None:
+        self.image = image
+        self.pull = pull
+        self.digest = digest
+        self.smoke_test = smoke_test
+        self.retry_interval = retry_interval
+        self.recheck_interval = recheck_interval
+        self._client_factory = client_factory
+        self.state = PENDING
+        self.error: str | None = None
+        self.attempts = 0
+        self.image_id: str | None = None
+        self.pulled = False
+        self.cold_start_seconds: float | None = None
+        self.warm_start_seconds: float | None = None
+        self.warmup_seconds: float | None = None
+        self._docker_ok: bool | None = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="guardflow-sandbox-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(_STOP_TIMEOUT)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            if self.run_once():
+                return
+            self._stop.wait(self.retry_interval)
+
+    # -- warmup ------------------------------------------------------------
+
+    def run_once(self) -> bool:
+        """One warmup attempt; True once the backend is ready."""
+        with self._lock:
+            self.state = WARMING
+            self.attempts += 1
+        started = time.perf_counter()
+        try:
+            client = self._client_factory()
+            self._ping(client)
+            self._ensure_image(client)
+            cold = self._smoke(sandbox.run_python) if self.smoke_test else None
+            warm = None
+            pool = sandbox.get_pool()
+            if pool is not None:
+                pool.refill()
+                if self.smoke_test:
+                    warm = self._smoke(pool.run)
+        except Exception as exc:
+            logger.warning("sandbox warmup attempt %d failed: %s", self.attempts, exc)
+            with self._lock:
+                self.state = FAILED
+                self.error = str(exc)
+            return False
+        with self._lock:
+            self.state = READY
+            self.error = None
+            self.cold_start_seconds = cold
+            self.warm_start_seconds = warm
+            self.warmup_seconds = time.perf_counter() - started
+        logger.info(
+            "sandbox ready in %.2fs (image %s, cold start %s, warm start %s)",
+            self.warmup_seconds, self._image(), _seconds(cold), _seconds(warm),
+        )
+        return True
+
+    def _image(self) -> str:
+        return self.image or getattr(sandbox.get_pool(), "image", SANDBOX_IMAGE)
+
+    def _ping(self, client) -> None:
+        try:
+            client.ping()
+        except Exception as exc:
+            self._mark_docker(False)
+            raise SandboxError(f"Docker unavailable: {exc}") from exc
+        self._mark_docker(True)
+
+    def _mark_docker(self, ok: bool) -> None:
+        with self._lock:
+            self._docker_ok = ok
+            self._checked_at = time.monotonic()
+
+    def _ensure_image(self, client) -> None:
+        name = self._image()
+        try:
+            image = client.images.get(name)
+        except docker.errors.ImageNotFound:
+            if not self.pull:
+                raise SandboxError(f"sandbox image {name} is not present and pulling is disabled") from None
+            repository, tag = parse_repository_tag(name)
+            logger.info("pulling sandbox image %s", name)
+            image = client.images.pull(repository, tag=tag or "latest")
+            self.pulled = True
+        if self.digest and not any(d.endswith(f"@{self.digest}") for d in image.attrs.get("RepoDigests") or []):
+            raise SandboxError(f"sandbox image {name} does not match digest {self.digest}")
+        self.image_id = image.id
+
+    def _smoke(self, run: Callable[[str, int], dict]) -> float:
+        """Run ``SMOKE_CODE`` and return how long it took."""
+        started = time.perf_counter()
+        result = run(SMOKE_CODE, SANDBOX_TIMEOUT)
+        elapsed = time.perf_counter() - started
+        if result.get("exit_code") != 0 or result.get("stdout", "").strip() != "ok":
+            raise SandboxError(
+                f"sandbox smoke test failed (exit {result.get('exit_code')}): {result.get('stderr', '')[:200]}"
+            )
+        return elapsed
+
+    # -- readiness ---------------------------------------------------------
+
+    def docker_reachable(self) -> bool | None:
+        """Whether Docker answered a ping within the last ``recheck_interval`` seconds."""
+        with self._lock:
+            if self._checked_at and time.monotonic() - self._checked_at < self.recheck_interval:
+                return self._docker_ok
+        try:
+            self._ping(self._client_factory())
+        except Exception:
+            pass  # recorded by _ping / reported below
+        with self._lock:
+            return self._docker_ok
+
+    def status(self) -> dict:
+        """Readiness report: warmup state, Docker and image checks, baselines and warm capacity."""
+        with self._lock:
+            state, error = self.state, self.error
+        docker_ok = self.docker_reachable() if state == READY else self._docker_ok
+        pool = sandbox.get_pool()
+        pool_stats = pool.stats() if pool is not None else None
+        scheduler = sandbox.get_scheduler().stats()
+
+        reasons = []
+        if state != READY:
+            reasons.append(f"warmup {state}" + (f": {error}" if error else ""))
+        if docker_ok is False:
+            reasons.append("Docker unreachable")
+        if pool_stats is not None and pool_stats["min_size"] and pool_stats["idle"] + pool_stats["busy"] == 0:
+            reasons.append("no warm containers")
+        return {
+            "ready": not reasons,
+            "state": state,
+            "reasons": reasons,
+            "attempts": self.attempts,
+            "docker": {"reachable": docker_ok},
+            "image": {"name": self._image(), "id": self.image_id, "pulled": self.pulled, "digest": self.digest},
+            "cold_start_seconds": self.cold_start_seconds,
+            "warm_start_seconds": self.warm_start_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "capacity": {
+                "pool": pool_stats,
+                "scheduler": {
+                    "free": max(0, scheduler["max_concurrency"] - scheduler["active"]),
+                    "active": scheduler["active"],
+                    "waiting": scheduler["waiting"],
+                    "max_concurrency": scheduler["max_concurrency"],
+                    "max_queue": scheduler["max_queue"],
+                },
+            },
+        }
+
+
+def _seconds(value: float | None) -> str:
+    return "skipped" if value is None else f"{value:.2f}s"
+
+
+# -- process-wide warmup ---------------------------------------------------------
+
+_warmup: SandboxWarmup | None = None
+
+
+def set_warmup(warmup: SandboxWarmup | None) -> None:
+    global _warmup
+    _warmup = warmup
+
+
+def get_warmup() -> SandboxWarmup | None:
+    return _warmup
+
+
+metrics.REGISTRY.gauge(
+    "guardflow_sandbox_ready", "1 once sandbox warmup has completed, 0 before.",
+    lambda: None if _warmup is None else int(_warmup.state == READY),
+)
+metrics.REGISTRY.gauge(
+    "guardflow_sandbox_cold_start_seconds", "Duration of the warmup's one-shot smoke run.",
+    lambda: None if _warmup is None else _warmup.cold_start_seconds,
+)
@@ -0,0 +1,199 @@
+"""Argument-level policy rule tests for guardflow."""
+
+import json
+from pathlib import Path
+
+import pytest
+import typer.main
+from click.testing import CliRunner
+from pydantic import ValidationError
+
+from guardflow import audit
+from guardflow.arguments import (
+    ArgumentPolicy,
+    ArgumentRule,
+    ArgumentViolation,
+    CommandMatcher,
+    CommandRule,
+    PathMatcher,
+    PathRule,
+    UrlMatcher,
+    UrlRule,
+)
+from guardflow.batch import error_for
+from guardflow.cli import app
+from guardflow.decisions import compile_decisions
+from guardflow.models import RunRequest
+from guardflow.pipeline import authorize
+from guardflow.policy import Policy
+from guardflow.rbac import RbacPolicy
+
+runner = CliRunner()
+cli = typer.main.get_command(app)
+
+MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = r.sub == p.sub && r.act == p.act
+"""
+
+POLICY_CSV = """\
+p, viewer, file_read
+p, operator, file_read
+p, operator, http_request
+p, operator, shell_command
+"""
+
+RULES = [
+    {"tool": "file_read", "roles": ["viewer"], "path": {"allow": ["/srv/public"], "deny": ["/srv/public/private"]}},
+    {"tool": "http_request", "url": {"allow": ["example.com", "10.0.0.0/8"], "deny": ["admin.example.com"]}},
+    {"tool": "shell_command", "command": {"allow": ["ls", "cat"], "patterns": [r"git (status|log)( --oneline)?"]}},
+]
+
+
+def _request(role: str, tool: str, **args) -> RunRequest:
+    return RunRequest.model_validate({"actor": {"id": "u1", "role": role}, "tool_call": {"tool": tool, "args": args}})
+
+
+@pytest.mark.argument_rules
+def test_path_prefixes_match_whole_components_most_specific_first():
+    check = PathMatcher(PathRule(allow=["/srv/public", "/srv/public/private/shared/"], deny=["/srv/public/private"]))
+    assert check("/srv/public/report.csv") is None
+    assert check("/srv/public") is None
+    assert check("/srv/public/private/key.pem") is not None
+    assert check("/srv/public/private/shared/notes.txt") is None
+    assert check("/srv/publications/x") is not None
+    assert check("/srv/public/../../etc/passwd") is not None
+    assert check("//srv/./public//a") is None
+    for bad in ("srv/public/a", "/srv/public/a\0", 42, None):
+        assert check(bad) == "path must be an absolute path"
+    assert PathMatcher(PathRule(deny=["/etc"]))("/var/log/syslog") is None
+
+
+@pytest.mark.argument_rules
+def test_url_domains_match_subdomains_with_deny_overrides():
+    check = UrlMatcher(UrlRule(allow=["example.com", "*.corp.internal"], deny=["admin.example.com"]))
+    assert check("https://example.com/a") is None
+    assert check("https://API.Example.com./v1") is None
+    assert check("http://build.corp.internal:8080/") is None
+    assert check("https://admin.example.com/") is not None
+    assert check("https://x.admin.example.com/") is not None
+    assert check("https://example.com.evil.net/") is not None
+    assert check("https://notexample.com/") is not None
+    assert check("https://example.com@evil.net/") is not None
+    # HTTP clients end the authority at the backslash and connect to evil.com.
+    assert check("http://evil.com\\@example.com/") is not None
+    assert check("http://evil.com\\.example.com/") is not None
+    assert check("http://evil.com\t@example.com/") is not None
+    assert check("file:///etc/passwd") == "scheme 'file' is not permitted"
+    assert check("https:///nohost") is not None
+    assert check(["https://example.com"]) == "url must be a string"
+
+
+@pytest.mark.argument_rules
+def test_url_addresses_use_longest_prefix_and_canonical_forms():
+    check = UrlMatcher(UrlRule(allow=["10.0.0.0/8", "2001:db8::/32"], deny=["10.0.5.0/24"]))
+    assert check("http://10.1.2.3/") is None
+    assert check("http://10.0.5.9/") is not None
+    assert check("http://[2001:db8::1]:8443/") is None
+    assert check("http://11.0.0.1/") is not None
+
+    block = UrlMatcher(UrlRule(deny=["127.0.0.0/8", "169.254.169.254/32", "::1/128"]))
+    for url in (
+        "http://127.0.0.1/",
+        "http://2130706433/",
+        "http://0x7f.1/",
+        "http://0177.0.0.1/",
+        "http://[::ffff:127.0.0.1]/",
+        "http://[::1]/",
+        "http://169.254.169.254/latest/meta-data",
+    ):
+        assert block(url) is not None, url
+    assert block("https://example.com/") is None
+    # Fullwidth letters map to ASCII as an HTTP client would map them, so they can't dodge a deny entry.
+    assert UrlMatcher(UrlRule(deny=["evil.com"]))("https://ｅvil.com/") is not None
+    idn = UrlMatcher(UrlRule(deny=["bücher.example"]))
+    assert idn("https://BÜCHER.example/") is not None
+    assert idn("https://xn--bcher-kva.example/") is not None
+    assert idn("https://buecher.example/") is None
+
+
+@pytest.mark.argument_rules
+def test_commands_need_an_allowed_program_or_a_full_pattern_match():
+    check = CommandMatcher(CommandRule(allow=["ls", "cat"], patterns=[r"git (status|log)( --oneline)?"]))
+    assert check("ls -la /tmp") is None
+    assert check("git log --oneline") is None
+    assert check("git log --oneline; rm -rf /") is not None
+    assert check("ls; rm -rf /") is not None
+    assert check("cat $(whoami)") is not None
+    assert check("ls | sh") is not None
+    assert check("/tmp/ls") is not None
+    assert check("rm -rf /") is not None
+    assert check("   ") is not None
+
+
+@pytest.mark.argument_rules
+def test_rules_apply_per_role_and_require_the_argument():
+    rules = ArgumentPolicy(ArgumentRule.model_validate(rule) for rule in RULES)
+    rules.check("viewer", "file_read", {"path": "/srv/public/a"})
+    rules.check("operator", "file_read", {"path": "/etc/passwd"})     # the path rule is scoped to viewer
+    rules.check("viewer", "echo", {"text": "anything"})
+    with pytest.raises(ArgumentViolation) as info:
+        rules.check("viewer", "file_read", {"path": "/etc/passwd"})
+    assert (info.value.tool, info.value.arg) == ("file_read", "path")
+    with pytest.raises(ArgumentViolation, match="required"):
+        rules.check("operator", "http_request", {"method": "GET"})
+
+
+@pytest.mark.argument_rules
+def test_invalid_rules_fail_policy_validation():
+    for rule in (
+        {"tool": "file_read", "path": {"allow": ["relative/dir"]}},
+        {"tool": "http_request", "url": {"deny": ["10.0.0.0/33"]}},
+        {"tool": "http_request", "url": {"deny": ["ü" * 64 + ".example"]}},
+        {"tool": "shell_command", "command": {"patterns": ["(unclosed"]}},
+        {"tool": "shell_command", "command": {"allow": ["ls"], "regex": ["x"]}},
+    ):
+        with pytest.raises(ValidationError):
+            Policy.model_validate({"allowed_tools": ["file_read"], "argument_rules": [rule]})
+
+
+@pytest.mark.argument_rules
+def test_authorize_checks_arguments_after_both_gates(tmp_path):
+    (tmp_path / "model.conf").write_text(MODEL_CONF)
+    (tmp_path / "rbac_policy.csv").write_text(POLICY_CSV)
+    policy = Policy.model_validate(
+        {"allowed_tools": ["file_read", "http_request", "shell_command"], "argument_rules": RULES}
+    )
+    rbac = RbacPolicy.load(tmp_path / "model.conf", tmp_path / "rbac_policy.csv")
+    for decisions in (None, compile_decisions(policy, rbac)):
+        assert authorize(_request("viewer", "file_read", path="/srv/public/a"), policy, rbac, decisions)
+        with pytest.raises(ArgumentViolation) as info:
+            authorize(_request("operator", "http_request", url="http://169.254.169.254/"), policy, rbac, decisions)
+    assert audit.outcome_for(info.value) == "ARGUMENT_DENIED"
+    error = error_for(info.value)
+    assert (error.code, error.tool, error.arg) == ("ARGUMENT_DENIED", "http_request", "url")
+
+
+@pytest.mark.argument_rules
+def test_cli_run_reports_argument_denied(tmp_path: Path):
+    (tmp_path / "model.conf").write_text(MODEL_CONF)
+    (tmp_path / "rbac_policy.csv").write_text(POLICY_CSV)
+    (tmp_path / "policy.json").write_text(json.dumps({"allowed_tools": ["file_read"], "argument_rules": RULES}))
+    payload = {"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "file_read", "args": {"path": "/etc/shadow"}}}
+    result = runner.invoke(cli, [
+        "run", "--input", json.dumps(payload), "--policy", str(tmp_path / "policy.json"),
+        "--rbac-model", str(tmp_path / "model.conf"), "--rbac-policy", str(tmp_path / "rbac_policy.csv"),
+    ])
+    assert result.exit_code == 1
+    error = json.loads(result.stderr)
+    assert error["code"] == "ARGUMENT_DENIED" and error["arg"] == "path"
+    assert "/etc/shadow" in error["detail"]
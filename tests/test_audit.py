@@ -0,0 +1,126 @@
+"""Decision audit log tests for guardflow."""
+
+import json
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+from typer.testing import CliRunner
+
+from guardflow import audit, metrics
+from guardflow.audit import AuditSink, audit_files, read_audit
+from guardflow.cli import app
+from guardflow.pipeline import run_pipeline
+from guardflow.policy import Policy, PolicyViolation
+from guardflow.rbac import RbacPolicy
+
+REPO_ROOT = Path(__file__).parent.parent
+
+runner = CliRunner()
+
+
+def _request(role: str, tool: str) -> dict:
+    return {"actor": {"id": "u1", "role": role}, "tool_call": {"tool": tool, "args": {}}}
+
+
+@pytest.fixture
+def sink(tmp_path: Path):
+    sink = AuditSink(tmp_path / "audit.jsonl")
+    sink.start()
+    audit.set_sink(sink)
+    yield sink
+    audit.set_sink(None)
+    sink.close()
+
+
+@pytest.mark.audit_log
+def test_pipeline_records_every_decision(sink):
+    """Allowed and denied requests both leave a record with outcome, version and stage latencies."""
+    policy = Policy.load(REPO_ROOT / "policy.json")
+    rbac = RbacPolicy.load(REPO_ROOT / "model.conf", REPO_ROOT / "rbac_policy.csv")
+    run_pipeline(_request("viewer", "echo"), policy, rbac, version="v1")
+    with pytest.raises(PolicyViolation):
+        run_pipeline(_request("viewer", "rm_rf"), policy, rbac, version="v1")
+    sink.close()
+
+    ok, denied = read_audit(sink.path)
+    assert (ok["actor"], ok["tool"], ok["outcome"], ok["policy"]) == ("u1", "echo", "ok", "v1")
+    assert set(ok["ms"]) == {"validate", "authorize", "execute"}
+    assert denied["outcome"] == "UNAUTHORIZED_TOOL"
+    assert set(denied["ms"]) == {"validate", "authorize"}
+
+
+@pytest.mark.audit_log
+def test_raw_json_rejections_keep_request_fields(sink):
+    """Requests passed as raw bytes are still attributed when they are rejected."""
+    policy = Policy.load(REPO_ROOT / "policy.json")
+    rbac = RbacPolicy.load(REPO_ROOT / "model.conf", REPO_ROOT / "rbac_policy.csv")
+    with pytest.raises(PolicyViolation):
+        run_pipeline(json.dumps(_request("viewer", "rm_rf")).encode(), policy, rbac, version="v1")
+    with pytest.raises(ValidationError):
+        run_pipeline(b"{not json", policy, rbac, version="v1")
+    sink.close()
+
+    denied, malformed = read_audit(sink.path)
+    assert (denied["actor"], denied["role"], denied["tool"]) == ("u1", "viewer", "rm_rf")
+    assert (malformed["actor"], malformed["outcome"]) == (None, "SCHEMA_REJECTED")
+
+
+@pytest.mark.audit_log
+def test_records_are_group_committed(tmp_path):
+    """Records queued while the writer is busy are written together, in order."""
+    sink = AuditSink(tmp_path / "audit.jsonl", fsync_interval=0)
+    for i in range(500):
+        sink.submit({"ts": i, "outcome": "ok"})
+    sink.start()
+    sink.close()
+    assert [r["ts"] for r in read_audit(sink.path)] == list(range(500))
+    assert sink.stats()["batches"] == 1
+    assert sink.stats()["fsyncs"] >= 1
+
+
+@pytest.mark.audit_log
+def test_full_queue_drops_and_counts_records(tmp_path):
+    """A stalled writer never blocks submit(); overflow is dropped, counted and exported."""
+    sink = AuditSink(tmp_path / "audit.jsonl", max_queue=10)
+    for i in range(25):
+        sink.submit({"ts": i, "outcome": "ok"})
+    assert sink.stats()["dropped"] == 15 and sink.stats()["queued"] == 10
+    audit.set_sink(sink)
+    try:
+        assert "guardflow_audit_dropped_total 15" in metrics.REGISTRY.render()
+    finally:
+        audit.set_sink(None)
+    sink.start()
+    sink.close()
+    assert [r["ts"] for r in read_audit(sink.path)] == list(range(10))
+
+
+@pytest.mark.audit_log
+def test_rotation_and_filtered_read(tmp_path):
+    """Size rotation keeps a bounded number of backups; the reader spans them oldest first."""
+    path = tmp_path / "audit.jsonl"
+    sink = AuditSink(path, max_bytes=200, backups=3, batch_size=2)
+    sink.start()
+    for i in range(40):
+        sink.submit({"ts": i, "tool": "echo" if i % 2 else "file_read", "outcome": "ok"})
+    sink.close()
+    assert sink.stats()["rotations"] > 0
+    assert len(audit_files(path)) <= 4
+    timestamps = [r["ts"] for r in read_audit(path)]
+    assert timestamps == sorted(timestamps)
+    assert timestamps[-1] == 39
+    assert all(r["ts"] % 2 for r in read_audit(path, tool="echo"))
+    assert [r["ts"] for r in read_audit(path, since=37, until=39)] == [37, 38]
+
+
+@pytest.mark.audit_log
+def test_cli_audit_log_and_show(tmp_path):
+    """guardflow run --audit-log writes records that guardflow audit show can filter."""
+    log = tmp_path / "audit.jsonl"
+    for role in ("viewer", "guest"):
+        runner.invoke(app, ["run", "--input", json.dumps(_request(role, "echo")), "--audit-log", str(log)])
+    result = runner.invoke(app, ["audit", "show", "--log", str(log), "--outcome", "RBAC_DENIED"])
+    assert result.exit_code == 0
+    records = [json.loads(line) for line in result.output.splitlines()]
+    assert [(r["role"], r["outcome"]) for r in records] == [("guest", "RBAC_DENIED")]
@@ -0,0 +1,104 @@
+"""JSONL batch mode tests for guardflow run --batch."""
+
+import json
+from pathlib import Path
+
+import pytest
+import typer.main
+from click.testing import CliRunner
+
+from guardflow.batch import run_batch
+from guardflow.cli import app
+
+runner = CliRunner()
+cli = typer.main.get_command(app)
+
+MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = r.sub == p.sub && r.act == p.act
+"""
+
+POLICY_CSV = """\
+p, viewer, echo
+p, operator, echo
+p, operator, http_request
+"""
+
+ALLOWLIST = json.dumps({"allowed_tools": ["echo", "http_request"]})
+
+LINES = [
+    json.dumps({"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "echo", "args": {"text": "hi"}}}),
+    json.dumps({"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "http_request", "args": {}}}),
+    json.dumps({"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "rm_rf", "args": {}}}),
+    json.dumps({"actor": {"id": "u1"}, "tool_call": {"tool": "echo", "args": {}}}),
+    "{not json",
+]
+EXPECTED = [None, "RBAC_DENIED", "UNAUTHORIZED_TOOL", "SCHEMA_REJECTED", "SCHEMA_REJECTED"]
+
+
+def _write_policy_files(tmp_path: Path) -> tuple[Path, Path, Path]:
+    allowlist = tmp_path / "policy.json"
+    model_file = tmp_path / "model.conf"
+    policy_file = tmp_path / "rbac_policy.csv"
+    allowlist.write_text(ALLOWLIST)
+    model_file.write_text(MODEL_CONF)
+    policy_file.write_text(POLICY_CSV)
+    return allowlist, model_file, policy_file
+
+
+def _codes(output: str) -> list:
+    return [json.loads(line).get("code") for line in output.splitlines()]
+
+
+def _invoke(tmp_path: Path, args: list[str], stdin: str | None = None):
+    allowlist, model_file, policy_file = _write_policy_files(tmp_path)
+    return runner.invoke(
+        cli,
+        ["run", *args, "--policy", str(allowlist), "--rbac-model", str(model_file), "--rbac-policy", str(policy_file)],
+        input=stdin,
+    )
+
+
+@pytest.mark.batch_mode
+def test_batch_file(tmp_path):
+    """Each non-blank line yields one result or error object, in order."""
+    batch = tmp_path / "requests.jsonl"
+    batch.write_text("\n".join(LINES[:2]) + "\n\n" + "\n".join(LINES[2:]) + "\n")
+    result = _invoke(tmp_path, ["--batch", str(batch)])
+    assert result.exit_code == 0
+    assert _codes(result.output) == EXPECTED
+    assert json.loads(result.output.splitlines()[0])["ok"] is True
+
+
+@pytest.mark.batch_mode
+def test_batch_stdin(tmp_path):
+    result = _invoke(tmp_path, ["--batch", "-"], stdin="\n".join(LINES) + "\n")
+    assert result.exit_code == 0
+    assert _codes(result.output) == EXPECTED
+
+
+@pytest.mark.batch_mode
+def test_batch_workers_preserve_order(tmp_path):
+    """A process pool with small chunks returns outputs in input order."""
+    paths = _write_policy_files(tmp_path)
+    lines = [
+        json.dumps({"actor": {"id": f"u{i}", "role": "viewer"}, "tool_call": {"tool": "echo", "args": {"n": i}}})
+        for i in range(200)
+    ]
+    outputs = list(run_batch(iter(lines), *paths, workers=3, chunk_size=7))
+    assert [json.loads(o)["data"]["tool_call"]["args"]["n"] for o in outputs] == list(range(200))
+
+
+@pytest.mark.batch_mode
+def test_input_and_batch_are_exclusive(tmp_path):
+    result = _invoke(tmp_path, ["--input", LINES[0], "--batch", "-"])
+    assert result.exit_code != 0
@@ -0,0 +1,66 @@
+"""Pipeline microbenchmark tests for guardflow (no Docker required)."""
+
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from guardflow import sandbox
+from guardflow.bench import Workload, compare, run_bench
+from guardflow.cli import app
+
+runner = CliRunner()
+
+SMALL = Workload(roles=3, tools=6, rules=10, arg_bytes=64, deny_ratio=0.3, requests=50)
+
+
+@pytest.mark.bench
+def test_run_bench_reports_every_stage_without_docker(monkeypatch):
+    """python_exec requests hit the stub sandbox, never the one-shot Docker path."""
+
+    def no_docker(code, timeout):
+        raise AssertionError("bench must not start containers")
+
+    monkeypatch.setattr(sandbox, "run_python", no_docker)
+    results = run_bench(Workload(tools=1, rules=8, deny_ratio=0.0, requests=20), iterations=40, alloc_iterations=5)
+    assert set(results["stages"]) == {
+        "policy_load", "rbac_load", "validate", "validate_json", "authorize", "authorize_compiled", "compiled_load",
+        "authorize_mmap", "check_arguments", "rate_limit", "rate_limit_shared", "run_pipeline",
+    }
+    for row in results["stages"].values():
+        assert row["ops_per_sec"] > 0
+        assert row["p50_us"] <= row["p99_us"]
+        assert row["alloc_bytes"] >= 0
+    assert sandbox.get_pool() is None
+
+
+@pytest.mark.bench
+def test_compare_flags_throughput_and_tail_regressions():
+    baseline = {"stages": {"validate": {"ops_per_sec": 1000.0, "p99_us": 10.0}}}
+    fine = {"stages": {"validate": {"ops_per_sec": 950.0, "p99_us": 10.5}}}
+    slow = {"stages": {"validate": {"ops_per_sec": 800.0, "p99_us": 20.0}}}
+    assert compare(fine, baseline, 0.1) == []
+    assert {r.metric for r in compare(slow, baseline, 0.1)} == {"ops_per_sec", "p99_us"}
+
+
+@pytest.mark.bench
+def test_bench_cli_writes_json_and_checks_baseline(tmp_path):
+    out = tmp_path / "results.json"
+    args = ["bench", "-n", "50", "-s", "validate", "--tools", "4", "--rules", "4"]
+    result = runner.invoke(app, [*args, "--output", str(out)])
+    assert result.exit_code == 0
+    doc = json.loads(out.read_text())
+    assert doc["stages"]["validate"]["iterations"] == 50
+
+    doc["stages"]["validate"]["ops_per_sec"] *= 1000
+    fast_baseline = tmp_path / "baseline.json"
+    fast_baseline.write_text(json.dumps(doc))
+    result = runner.invoke(app, [*args, "--baseline", str(fast_baseline)])
+    assert result.exit_code == 1
+    assert "REGRESSION" in result.output
+
+
+@pytest.mark.bench
+def test_bench_rejects_unknown_stage():
+    with pytest.raises(ValueError):
+        run_bench(SMALL, stages=("nope",))
@@ -0,0 +1,176 @@
+"""Compiled (mmap-loaded) policy file tests for guardflow."""
+
+import json
+import random
+from pathlib import Path
+
+import pytest
+import typer.main
+from click.testing import CliRunner
+
+from guardflow import server
+from guardflow.cli import app
+from guardflow.compiled import CompiledPolicy, CompiledPolicyError, compile_policy, dump_compiled
+from guardflow.decisions import ALLOW, RBAC_DENIED, UNAUTHORIZED_TOOL, PolicyCompileError, compile_decisions
+from guardflow.models import RunRequest
+from guardflow.pipeline import authorize
+from guardflow.policy import Policy, PolicyViolation
+from guardflow.rbac import RbacDenial, RbacPolicy
+from guardflow.snapshot import PolicySnapshot, PolicyStore
+
+runner = CliRunner()
+cli = typer.main.get_command(app)
+
+MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[role_definition]
+g = _, _
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = g(r.sub, p.sub) && r.act == p.act
+"""
+
+POLICY_CSV = "p, viewer, echo\np, operator, file_read\np, admin, python_exec\ng, operator, viewer\ng, admin, operator\n"
+
+
+def _write(directory: Path, tools: list[str], rules: str, extra: dict | None = None) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "policy.json").write_text(json.dumps({"allowed_tools": tools, **(extra or {})}))
+    (directory / "model.conf").write_text(MODEL_CONF)
+    (directory / "rbac_policy.csv").write_text(rules)
+    return directory
+
+
+def _compile(directory: Path) -> CompiledPolicy:
+    return compile_policy(
+        directory / "policy.bin", directory / "policy.json", directory / "model.conf", directory / "rbac_policy.csv"
+    )
+
+
+def _request(role: str, tool: str) -> RunRequest:
+    return RunRequest.model_validate({"actor": {"id": "u1", "role": role}, "tool_call": {"tool": tool, "args": {}}})
+
+
+@pytest.mark.compiled_policy
+def test_mapped_lookups_match_the_decision_table(tmp_path):
+    rng = random.Random(3)
+    # Non-ASCII names and more than 64 tools, so masks span several words.
+    tools = [f"tool_{i}" for i in range(150)] + ["écho", "工具"]
+    roles = [f"role_{i}" for i in range(40)] + ["rôle"]
+    pairs = {(rng.choice(roles), rng.choice(tools + ["gone"])) for _ in range(900)}
+    rules = "".join(f"p, {role}, {tool}\n" for role, tool in sorted(pairs))
+    rules += "".join(f"g, {rng.choice(roles)}, {rng.choice(roles)}\n" for _ in range(30))
+    policy = Policy.model_validate({"allowed_tools": tools})
+    table = compile_decisions(policy, RbacPolicy.from_text(MODEL_CONF, rules, "v1"))
+    (tmp_path / "policy.bin").write_bytes(dump_compiled(table, "v1", b"{}"))
+    with CompiledPolicy(tmp_path / "policy.bin") as mapped:
+        assert mapped.version == "v1" and mapped.policy_json == b"{}"
+        assert mapped.roles == table.roles and mapped.tools == table.tools
+        for role in table.roles + ("nobody", "\ud800"):
+            assert mapped.grants(role) == table.grants(role)
+            for tool in tools + ["gone", "", "\ud800"]:
+                assert mapped.decide(role, tool) == table.decide(role, tool), (role, tool)
+
+
+@pytest.mark.compiled_policy
+def test_corrupt_or_foreign_files_are_rejected(tmp_path):
+    directory = _write(tmp_path, ["echo", "file_read", "python_exec"], POLICY_CSV)
+    _compile(directory).close()
+    data = (directory / "policy.bin").read_bytes()
+
+    for name, broken, message in (
+        ("flipped.bin", data[:-3] + bytes([data[-3] ^ 1]) + data[-2:], "checksum"),
+        ("truncated.bin", data[:-8], "header says"),
+        ("foreign.bin", b"NOTAPOLI" + data[8:], "not a compiled policy"),
+        ("future.bin", data[:8] + (2).to_bytes(4, "little") + data[12:], "format version 2"),
+        ("empty.bin", b"", "too short"),
+    ):
+        (tmp_path / name).write_bytes(broken)
+        with pytest.raises(CompiledPolicyError, match=message):
+            CompiledPolicy(tmp_path / name)
+
+
+@pytest.mark.compiled_policy
+def test_snapshot_from_compiled_file_authorizes_like_the_sources(tmp_path):
+    rules = [{"tool": "file_read", "path": {"allow": ["/srv"]}}]
+    directory = _write(tmp_path, ["echo", "file_read", "python_exec"], POLICY_CSV, {"argument_rules": rules})
+    _compile(directory).close()
+    source = PolicySnapshot.load(directory / "policy.json", directory / "model.conf", directory / "rbac_policy.csv")
+    snapshot = PolicySnapshot.load_compiled(directory / "policy.bin")
+    assert snapshot.version == source.version and snapshot.rbac is None
+    assert snapshot.policy.argument_rules == source.policy.argument_rules
+
+    decisions = snapshot.decisions
+    assert decisions.decide("admin", "echo") == ALLOW              # inherited through operator → viewer
+    assert decisions.decide("viewer", "python_exec") == RBAC_DENIED
+    assert decisions.decide("admin", "rm_rf") == UNAUTHORIZED_TOOL
+    assert authorize(_request("operator", "echo"), snapshot.policy, snapshot.rbac, decisions)
+    with pytest.raises(PolicyViolation):
+        authorize(_request("admin", "rm_rf"), snapshot.policy, snapshot.rbac, decisions)
+    with pytest.raises(RbacDenial):
+        authorize(_request("operator", "python_exec"), snapshot.policy, snapshot.rbac, decisions)
+
+
+@pytest.mark.compiled_policy
+def test_recompiling_replaces_the_file_without_disturbing_open_mappings(tmp_path):
+    directory = _write(tmp_path, ["echo", "python_exec"], POLICY_CSV)
+    _compile(directory).close()
+    store = PolicyStore(compiled=directory / "policy.bin")
+    old = store.current
+
+    (directory / "rbac_policy.csv").write_text(POLICY_CSV + "p, viewer, python_exec\n")
+    _compile(directory).close()
+    assert store.reload() is True
+    assert store.current.decisions.decide("viewer", "python_exec") == ALLOW
+    assert old.decisions.decide("viewer", "python_exec") == RBAC_DENIED
+
+    (directory / "policy.bin").write_bytes(b"garbage")
+    assert store.reload() is False and "too short" in store.last_error
+
+
+@pytest.mark.compiled_policy
+def test_uncompilable_models_are_refused(tmp_path):
+    directory = _write(tmp_path, ["echo"], "p, viewer, echo\n")
+    (directory / "model.conf").write_text(MODEL_CONF.replace("r.act == p.act", "keyMatch(r.act, p.act)"))
+    with pytest.raises(PolicyCompileError):
+        _compile(directory)
+    assert not (directory / "policy.bin").exists()
+
+
+@pytest.mark.compiled_policy
+def test_cli_compile_and_check(tmp_path):
+    directory = _write(tmp_path, ["echo", "file_read", "python_exec"], POLICY_CSV)
+    output = tmp_path / "out" / "policy.bin"
+    output.parent.mkdir()
+    result = runner.invoke(cli, [
+        "policy", "compile", "--policy", str(directory / "policy.json"), "--rbac-model", str(directory / "model.conf"),
+        "--rbac-policy", str(directory / "rbac_policy.csv"), "-o", str(output),
+    ])
+    assert result.exit_code == 0, result.output
+    assert "3 roles × 3 tools" in result.output
+
+    result = runner.invoke(cli, ["policy", "check", "--role", "admin", "--tool", "echo", "--compiled", str(output)])
+    assert result.exit_code == 0 and "ALLOWED" in result.output
+    result = runner.invoke(cli, ["policy", "check", "--role", "viewer", "--tool", "rm", "--compiled", str(output)])
+    assert result.exit_code == 1 and "UNAUTHORIZED_TOOL" in result.stderr
+
+    result = runner.invoke(cli, ["policy", "compile", "--policy", str(tmp_path / "missing.json"), "-o", str(output)])
+    assert result.exit_code == 1 and "policy file not found" in result.stderr
+
+
+@pytest.mark.compiled_policy
+def test_server_serves_compiled_policy_from_env(tmp_path, monkeypatch):
+    directory = _write(tmp_path, ["echo"], POLICY_CSV)
+    compiled = _compile(directory)
+    monkeypatch.setenv("GUARDFLOW_COMPILED_POLICY", str(directory / "policy.bin"))
+    monkeypatch.setattr(server, "_store", None)
+    assert server._get_store().version == compiled.version
+    assert isinstance(server._get_store().current.decisions, CompiledPolicy)
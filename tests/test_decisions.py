@@ -0,0 +1,110 @@
+"""Compiled decision table tests for guardflow."""
+
+from pathlib import Path
+
+import pytest
+
+from guardflow.decisions import (
+    ALLOW,
+    RBAC_DENIED,
+    UNAUTHORIZED_TOOL,
+    PolicyCompileError,
+    compile_decisions,
+    verify_decisions,
+)
+from guardflow.models import RunRequest
+from guardflow.pipeline import authorize
+from guardflow.policy import Policy, PolicyViolation
+from guardflow.rbac import RbacDenial, RbacPolicy
+
+REPO_ROOT = Path(__file__).parent.parent
+
+MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = r.sub == p.sub && r.act == p.act
+"""
+
+KEYMATCH_MODEL_CONF = MODEL_CONF.replace("r.act == p.act", "keyMatch(r.act, p.act)")
+
+POLICY_CSV = """\
+p, viewer, echo
+p, viewer, file_read
+p, operator, echo
+p, operator, http_request
+p, operator, rm_rf
+"""
+
+
+def _load(tmp_path: Path, model: str = MODEL_CONF) -> tuple[Policy, RbacPolicy]:
+    model_file = tmp_path / "model.conf"
+    policy_file = tmp_path / "rbac_policy.csv"
+    model_file.write_text(model)
+    policy_file.write_text(POLICY_CSV)
+    policy = Policy(allowed_tools=["echo", "file_read", "http_request"])
+    return policy, RbacPolicy.load(model_file, policy_file)
+
+
+@pytest.mark.decision_table
+def test_decisions_match_gates(tmp_path):
+    """The table reproduces the allowlist-then-RBAC ordering of reason codes."""
+    table = compile_decisions(*_load(tmp_path))
+    assert table.decide("viewer", "echo") == ALLOW
+    assert table.decide("viewer", "http_request") == RBAC_DENIED
+    assert table.decide("operator", "rm_rf") == UNAUTHORIZED_TOOL
+    assert table.decide("nobody", "echo") == RBAC_DENIED
+    assert table.decide("operator", "unknown") == UNAUTHORIZED_TOOL
+
+
+@pytest.mark.decision_table
+def test_table_equivalent_to_casbin_for_repo_policy():
+    """The shipped policy files compile to a table with no mismatches against Casbin."""
+    policy = Policy.load(REPO_ROOT / "policy.json")
+    rbac = RbacPolicy.load(REPO_ROOT / "model.conf", REPO_ROOT / "rbac_policy.csv")
+    table = compile_decisions(policy, rbac)
+    assert verify_decisions(table, policy, rbac) == []
+
+
+@pytest.mark.decision_table
+def test_non_acl_model_not_compiled(tmp_path):
+    """Matchers beyond plain equality are rejected so callers fall back to Casbin."""
+    with pytest.raises(PolicyCompileError):
+        compile_decisions(*_load(tmp_path, KEYMATCH_MODEL_CONF))
+
+
+@pytest.mark.decision_table
+def test_authorize_uses_table(tmp_path):
+    """pipeline.authorize raises the usual gate exceptions when given a table."""
+    policy, rbac = _load(tmp_path)
+    table = compile_decisions(policy, rbac)
+    ok = RunRequest.model_validate(
+        {"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "echo", "args": {}}}
+    )
+    assert authorize(ok, policy, rbac, table) is ok
+    with pytest.raises(RbacDenial):
+        authorize(ok.model_copy(update={"actor": ok.actor.model_copy(update={"role": "guest"})}), policy, rbac, table)
+    with pytest.raises(PolicyViolation):
+        authorize(
+            ok.model_copy(update={"tool_call": ok.tool_call.model_copy(update={"tool": "rm_rf"})}),
+            policy,
+            rbac,
+            table,
+        )
+
+
+@pytest.mark.decision_table
+def test_extra_rule_fields_not_compiled(tmp_path):
+    """Rules with extra CSV fields are left to Casbin instead of failing the load."""
+    policy, rbac = _load(tmp_path)
+    (tmp_path / "rbac_policy.csv").write_text(POLICY_CSV + "p, viewer, echo, extra\n")
+    rbac = RbacPolicy.load(tmp_path / "model.conf", tmp_path / "rbac_policy.csv")
+    with pytest.raises(PolicyCompileError):
+        compile_decisions(policy, rbac)
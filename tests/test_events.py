@@ -0,0 +1,123 @@
+"""Structured pipeline event logging tests for guardflow."""
+
+import logging
+import threading
+
+import pytest
+
+from guardflow.events import (
+    REDACTED,
+    Event,
+    EventLogger,
+    Summarizer,
+    install_queue_handler,
+    parse_sample_rates,
+    uninstall_queue_handler,
+)
+
+REQUEST = {"actor": {"id": "u1", "role": "admin"}, "tool_call": {"tool": "python_exec", "args": {"code": "x" * 10_000}}}
+
+
+class CountingSummarizer(Summarizer):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def summarize(self, payload):
+        self.calls += 1
+        return super().summarize(payload)
+
+
+class Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = []
+
+    def emit(self, record):
+        self.records.append(self.format(record))
+        self.threads.append(threading.current_thread().name)
+
+
+def _logger(name: str, level: int = logging.INFO) -> tuple[logging.Logger, Capture]:
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    logger.propagate = False
+    handler = Capture()
+    logger.handlers = [handler]
+    return logger, handler
+
+
+@pytest.mark.event_logging
+def test_emit_defers_summary_until_formatted():
+    """Emitting never touches the payload; only formatting the record does."""
+    summarizer = CountingSummarizer()
+    logger = logging.getLogger("guardflow.test.defer")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    records = []
+    logger.handlers = [type("Keep", (logging.Handler,), {"emit": lambda self, r: records.append(r)})()]
+    EventLogger(summarizer=summarizer, logger=logger).emit("validate", REQUEST)
+    assert summarizer.calls == 0
+    assert isinstance(records[0].args[0], Event)
+    assert '"event": "pipeline.validate"' in records[0].getMessage()
+    assert summarizer.calls == 1
+
+
+@pytest.mark.event_logging
+def test_disabled_level_and_sampling_skip_events():
+    logger, capture = _logger("guardflow.test.sample", logging.WARNING)
+    EventLogger(logger=logger).emit("validate", REQUEST)
+    assert capture.records == []
+
+    logger.setLevel(logging.INFO)
+    draws = iter([0.05, 0.5, 0.09])
+    events = EventLogger(sample_rates={"validate": 0.1}, logger=logger, rng=lambda: next(draws))
+    for _ in range(3):
+        events.emit("validate", REQUEST)
+    events.emit("execute", REQUEST)
+    assert len(capture.records) == 3
+
+
+@pytest.mark.event_logging
+def test_summary_truncates_and_redacts():
+    summary = Summarizer(max_value_chars=8, max_items=2).summarize(
+        {
+            "actor": {"id": "u1", "role": "admin"},
+            "tool_call": {"tool": "http_request", "args": {"url": "https://example.com", "Token": "s3cret", "x": 1}},
+        }
+    )
+    assert summary["tool"] == "http_req…[+4 chars]"
+    assert summary["args"] == {"url": "https://…[+11 chars]", "Token": REDACTED, "…": "+1 keys"}
+
+
+@pytest.mark.event_logging
+def test_summary_parses_raw_json_bodies():
+    raw = b'{"actor": {"id": "u1", "role": "admin"}, "tool_call": {"tool": "echo", "args": {"password": "x"}}}'
+    summary = Summarizer().summarize(raw)
+    assert (summary["actor"], summary["tool"], summary["args"]) == ("u1", "echo", {"password": REDACTED})
+    assert Summarizer(max_value_chars=4).summarize(b"{not json") == {"payload": "b'{n…[+8 chars]"}
+
+
+@pytest.mark.event_logging
+def test_queue_handler_formats_on_listener_thread():
+    capture = Capture()
+    listener = install_queue_handler(capture)
+    try:
+        logger = logging.getLogger("guardflow.events")
+        logger.setLevel(logging.INFO)
+        EventLogger(logger=logger).emit("authorize", REQUEST)
+    finally:
+        uninstall_queue_handler(listener)
+        logging.getLogger("guardflow.events").setLevel(logging.NOTSET)
+    assert len(capture.records) == 1
+    assert capture.threads[0] != threading.current_thread().name
+    assert len(capture.records[0]) < 1000
+
+
+@pytest.mark.event_logging
+def test_parse_sample_rates():
+    assert parse_sample_rates("validate=0.01, authorize=1") == {"validate": 0.01, "authorize": 1.0}
+    assert parse_sample_rates("") == {}
+    with pytest.raises(ValueError):
+        parse_sample_rates("validate=2")
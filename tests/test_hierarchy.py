@@ -0,0 +1,166 @@
+"""Role hierarchy (Casbin g rules) tests for guardflow."""
+
+import json
+import random
+from pathlib import Path
+
+import pytest
+import typer.main
+from click.testing import CliRunner
+
+from guardflow.cli import app
+from guardflow.decisions import ALLOW, RBAC_DENIED, PolicyCompileError, compile_decisions, verify_decisions
+from guardflow.hierarchy import MAX_ROLE_DEPTH, RoleHierarchy
+from guardflow.policy import Policy
+from guardflow.policy_diff import diff_policies, policy_paths
+from guardflow.rbac import RbacPolicy
+from guardflow.snapshot import PolicySnapshot
+
+REPO_ROOT = Path(__file__).parent.parent
+
+runner = CliRunner()
+cli = typer.main.get_command(app)
+
+RBAC_MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[role_definition]
+g = _, _
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = g(r.sub, p.sub) && r.act == p.act
+"""
+
+TOOLS = ["echo", "file_read", "http_request", "python_exec"]
+
+
+def _write(directory: Path, rules: str, tools: list[str] = TOOLS) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "policy.json").write_text(json.dumps({"allowed_tools": tools}))
+    (directory / "model.conf").write_text(RBAC_MODEL_CONF)
+    (directory / "rbac_policy.csv").write_text(rules)
+    return directory
+
+
+def _load(directory: Path) -> tuple[Policy, RbacPolicy]:
+    policy_path, model_path, rbac_path = policy_paths(directory)
+    return Policy.load(policy_path), RbacPolicy.load(model_path, rbac_path)
+
+
+@pytest.mark.role_hierarchy
+def test_closure_depth_and_size():
+    """admin → operator → viewer, admin → auditor → viewer: a diamond two levels deep."""
+    hierarchy = RoleHierarchy(
+        [("admin", "operator"), ("operator", "viewer"), ("admin", "auditor"), ("auditor", "viewer")]
+    )
+    assert hierarchy.ancestors("admin") == {"admin", "operator", "auditor", "viewer"}
+    assert hierarchy.ancestors("viewer") == {"viewer"}
+    assert hierarchy.ancestors("stranger") == {"stranger"}
+    assert hierarchy.depth == 2 and hierarchy.cycles == []
+    assert hierarchy.closure_size == 3 + 1 + 1
+    flat = hierarchy.flatten({"viewer": 0b001, "operator": 0b010, "intern": 0b100})
+    assert flat == {"viewer": 0b001, "operator": 0b011, "auditor": 0b001, "admin": 0b011, "intern": 0b100}
+
+
+@pytest.mark.role_hierarchy
+def test_cycles_are_reported_and_share_grants():
+    hierarchy = RoleHierarchy([("a", "b"), ("b", "c"), ("c", "a"), ("d", "d"), ("e", "a")])
+    assert hierarchy.cycles == [["a", "b", "c"], ["d"]]
+    flat = hierarchy.flatten({"a": 1, "b": 2, "c": 4})
+    assert flat["a"] == flat["b"] == flat["c"] == flat["e"] == 7
+    assert flat["d"] == 0
+
+
+@pytest.mark.role_hierarchy
+def test_deep_chain_is_flattened_without_recursion():
+    chain = [(f"r{i}", f"r{i + 1}") for i in range(20_000)]
+    hierarchy = RoleHierarchy(chain)
+    assert hierarchy.depth == 20_000
+    assert hierarchy.flatten({"r20000": 1})["r0"] == 1
+
+
+@pytest.mark.role_hierarchy
+def test_compiled_table_matches_casbin_for_random_hierarchies(tmp_path):
+    rng = random.Random(7)
+    for trial in range(5):
+        rules = [f"p, r{rng.randrange(30)}, {rng.choice(TOOLS + ['rm_rf'])}" for _ in range(40)]
+        # Random links, so most trials include cycles as well as chains.
+        rules += [f"g, r{rng.randrange(30)}, r{rng.randrange(30)}" for _ in range(45)]
+        policy, rbac = _load(_write(tmp_path / str(trial), "\n".join(rules) + "\n"))
+        table = compile_decisions(policy, rbac)
+        assert verify_decisions(table, policy, rbac) == []
+
+
+@pytest.mark.role_hierarchy
+def test_hierarchy_deeper_than_casbin_default_compiles(tmp_path):
+    """Casbin stops at 10 levels by default; RbacPolicy raises the limit so both paths agree."""
+    rules = ["p, level30, python_exec"] + [f"g, level{i}, level{i + 1}" for i in range(30)]
+    policy, rbac = _load(_write(tmp_path, "\n".join(rules) + "\n"))
+    table = compile_decisions(policy, rbac)
+    assert table.decide("level0", "python_exec") == ALLOW
+    assert rbac.is_allowed("level0", "python_exec")
+    assert verify_decisions(table, policy, rbac) == []
+
+    too_deep = [f"g, level{i}, level{i + 1}" for i in range(MAX_ROLE_DEPTH + 1)]
+    policy, rbac = _load(_write(tmp_path / "deep", "\n".join(too_deep) + "\n"))
+    with pytest.raises(PolicyCompileError):
+        compile_decisions(policy, rbac)
+
+
+@pytest.mark.role_hierarchy
+def test_repo_policy_uses_inheritance_and_compiles():
+    snapshot = PolicySnapshot.load(REPO_ROOT / "policy.json", REPO_ROOT / "model.conf", REPO_ROOT / "rbac_policy.csv")
+    assert snapshot.rbac.role_links
+    table = snapshot.decisions
+    assert table is not None
+    assert table.decide("admin", "report_generate") == ALLOW
+    assert table.decide("responder", "log_read") == ALLOW
+    assert table.decide("operator", "python_exec") == RBAC_DENIED
+
+
+@pytest.mark.role_hierarchy
+def test_policy_diff_follows_inheritance_changes(tmp_path):
+    base = "p, viewer, echo\np, operator, http_request\np, admin, python_exec\ng, operator, viewer\n"
+    old = _write(tmp_path / "old", base + "g, admin, operator\n")
+    new = _write(tmp_path / "new", base + "p, viewer, file_read\n")
+    delta = diff_policies(policy_paths(old), policy_paths(new))
+    assert delta.granted == [("operator", "file_read"), ("viewer", "file_read")]
+    assert delta.revoked == [("admin", "echo"), ("admin", "http_request")]
+
+
+@pytest.mark.role_hierarchy
+def test_policy_diff_rejects_hierarchies_deeper_than_the_limit(tmp_path):
+    old = _write(tmp_path / "old", "p, level0, echo\n")
+    too_deep = [f"g, level{i}, level{i + 1}" for i in range(MAX_ROLE_DEPTH + 1)]
+    new = _write(tmp_path / "new", "p, level0, echo\n" + "\n".join(too_deep) + "\n")
+    with pytest.raises(PolicyCompileError, match="levels deep"):
+        diff_policies(policy_paths(old), policy_paths(new))
+
+    result = runner.invoke(cli, ["policy", "diff", "--old", str(old), "--new", str(new)])
+    assert result.exit_code == 1
+    assert f"role hierarchy is {MAX_ROLE_DEPTH + 1} levels deep" in result.stderr
+
+
+@pytest.mark.role_hierarchy
+def test_validate_reports_closure_and_rejects_cycles(tmp_path):
+    directory = _write(tmp_path, "p, viewer, echo\np, admin, python_exec\ng, operator, viewer\ng, admin, operator\n")
+    args = ["policy", "validate", "--policy", str(directory / "policy.json"),
+            "--rbac-model", str(directory / "model.conf"), "--rbac-policy", str(directory / "rbac_policy.csv")]
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 0, result.output
+    assert "3 roles, 2 grant rules, 2 inheritance rules" in result.output
+    assert "depth 2, closure size 3" in result.output
+    assert "4 effective grants" in result.output
+
+    (directory / "rbac_policy.csv").write_text("p, viewer, echo\ng, viewer, admin\ng, admin, viewer\ng, root, root\n")
+    result = runner.invoke(cli, args)
+    assert result.exit_code == 1
+    assert "role inheritance cycle: admin ↔ viewer" in result.stderr
+    assert "role root inherits from itself" in result.stderr
@@ -0,0 +1,93 @@
+"""In-process job queue tests for guardflow (no Docker required)."""
+
+import asyncio
+import threading
+
+import pytest
+
+from guardflow import sandbox
+from guardflow.jobs import FAILED, SUCCEEDED, JobQueue, JobQueueFull
+from guardflow.models import RunRequest
+
+
+def _request(tool: str = "echo", **args) -> RunRequest:
+    return RunRequest.model_validate({"actor": {"id": "u1", "role": "admin"}, "tool_call": {"tool": tool, "args": args}})
+
+
+def _finish(queue: JobQueue, job, timeout: float = 5.0):
+    return asyncio.run(queue.wait(job, timeout))
+
+
+@pytest.mark.job_queue
+def test_job_runs_and_reports_result():
+    queue = JobQueue(workers=2)
+    job = queue.submit(_request(text="hi"))
+    assert _finish(queue, job).status == SUCCEEDED
+    assert job.to_dict()["result"]["data"]["tool_call"]["args"] == {"text": "hi"}
+    queue.stop()
+
+
+@pytest.mark.job_queue
+def test_sandbox_failure_is_recorded_as_error(monkeypatch):
+    def boom(code, timeout):
+        raise sandbox.SandboxError("no docker")
+
+    monkeypatch.setattr(sandbox, "run_python", boom)
+    queue = JobQueue(workers=1)
+    job = _finish(queue, queue.submit(_request("python_exec", code="print(1)")))
+    assert job.status == FAILED
+    assert job.error == {"code": "SANDBOX_ERROR", "detail": "no docker"}
+    queue.stop()
+
+
+@pytest.mark.job_queue
+def test_queue_full_rejects_submission(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(sandbox, "run_python", lambda code, timeout: release.wait(5) and {})
+    queue = JobQueue(workers=1, max_pending=2, max_results=2)
+    first = queue.submit(_request("python_exec", code=""))
+    queue.submit(_request("python_exec", code=""))
+    with pytest.raises(JobQueueFull):
+        queue.submit(_request())
+    release.set()
+    _finish(queue, first)
+    queue.stop()
+
+
+@pytest.mark.job_queue
+def test_store_evicts_oldest_finished_jobs():
+    queue = JobQueue(workers=1, max_pending=2, max_results=2)
+    jobs = []
+    for _ in range(4):
+        jobs.append(queue.submit(_request()))
+        _finish(queue, jobs[-1])
+    assert queue.get(jobs[0].id) is None
+    assert queue.get(jobs[-1].id) is jobs[-1]
+    assert queue.stats()["evicted"] == 2
+    queue.stop()
+
+
+@pytest.mark.job_queue
+def test_finished_jobs_expire_after_ttl():
+    queue = JobQueue(workers=1, result_ttl=0.0)
+    job = _finish(queue, queue.submit(_request()))
+    assert job.finished
+    assert queue.get(job.id) is None
+    queue.stop()
+
+
+@pytest.mark.job_queue
+def test_eviction_keeps_running_jobs_and_skips_ones_already_expired(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(sandbox, "run_python", lambda code, timeout: release.wait(5) and {})
+    queue = JobQueue(workers=2, max_pending=2, max_results=2, result_ttl=0.0)
+    done = _finish(queue, queue.submit(_request()))
+    assert queue.get(done.id) is None               # expired on read, before any eviction pass
+    running = queue.submit(_request("python_exec", code=""))
+    finished = _finish(queue, queue.submit(_request()))
+    queue.submit(_request())                        # the store is full: only the finished job can go
+    assert queue.stats()["stored"] == 2 and queue.stats()["evicted"] == 2
+    assert queue.get(finished.id) is None and queue.get(running.id) is running
+    release.set()
+    _finish(queue, running)
+    queue.stop()
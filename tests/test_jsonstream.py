@@ -0,0 +1,71 @@
+"""Incremental JSON-array / NDJSON parser tests for guardflow."""
+
+import json
+
+import pytest
+
+from guardflow.jsonstream import JsonItemParser, JsonStreamError
+
+ECHO = {"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "echo", "args": {"text": "hi"}}}
+
+
+def _parse(data: bytes, step: int, **kwargs) -> list:
+    parser = JsonItemParser(**kwargs)
+    parsed = []
+    for i in range(0, len(data), step):
+        parsed += parser.feed(data[i:i + step])
+    return parsed + parser.close()
+
+
+@pytest.mark.json_stream
+def test_array_handles_arbitrary_chunking():
+    """Items split across any chunk boundary are reassembled exactly once."""
+    items = [ECHO, {"text": "]},"}, 12345, 3.5, None, "x"]
+    data = json.dumps(items).encode()
+    for step in (1, 2, 7, len(data)):
+        assert _parse(data, step) == items
+
+
+@pytest.mark.json_stream
+def test_empty_array():
+    assert _parse(b"  [ ]  ", 1) == []
+
+
+@pytest.mark.json_stream
+def test_truncated_array_reported_in_line():
+    parser = JsonItemParser()
+    assert parser.feed(b'[{"a": 1}, {"b"') == [{"a": 1}]
+    (error,) = parser.close()
+    assert isinstance(error, JsonStreamError)
+
+
+@pytest.mark.json_stream
+def test_ndjson_bad_line_does_not_affect_neighbours():
+    data = (json.dumps(ECHO) + "\n{bad\n\n" + json.dumps(ECHO)).encode()
+    first, bad, last = _parse(data, 5)
+    assert first == last == ECHO
+    assert isinstance(bad, JsonStreamError)
+
+
+@pytest.mark.json_stream
+def test_ndjson_oversized_line_skipped_in_line():
+    """A line over max_item_bytes becomes one error item and parsing resumes at the next newline."""
+    long_line = json.dumps({"text": "x" * 100}).encode()
+    data = b'{"a": 1}\n' + long_line + b'\n{"b": 2}\n'
+    for step in (3, len(data)):
+        first, error, last = _parse(data, step, max_item_bytes=32)
+        assert first == {"a": 1}
+        assert isinstance(error, JsonStreamError)
+        assert "exceeds" in str(error)
+        assert last == {"b": 2}
+
+
+@pytest.mark.json_stream
+def test_invalid_utf8_ends_the_stream_with_an_error():
+    """Items before undecodable bytes are kept; the error is the last item and later input is ignored."""
+    line = json.dumps(ECHO).encode() + b"\n"
+    for data in (line + b"\xff\xfe\n" + line, b"[" + line + b", \xc3(]", line + b'{"text": "\xe2\x82'):
+        for step in (1, 4, len(data)):
+            *items, error = _parse(data, step)
+            assert items == [ECHO], (data, step)
+            assert isinstance(error, JsonStreamError) and "UTF-8" in str(error)
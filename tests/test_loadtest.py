@@ -0,0 +1,154 @@
+"""HTTP load-test harness tests for guardflow (in-process ASGI and loopback sockets)."""
+
+import asyncio
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from guardflow import sandbox, server, warmup
+from guardflow.jobs import JobQueue
+from guardflow.loadtest import (
+    HttpConnection,
+    LevelResult,
+    find_knee,
+    route_request,
+    run_asgi,
+)
+from guardflow.snapshot import PolicyStore
+
+MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = r.sub == p.sub && r.act == p.act
+"""
+
+VIEWER_ECHO = {"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "echo", "args": {"text": "hi"}}}
+
+
+@pytest.fixture
+def app_state(tmp_path: Path, monkeypatch):
+    """A small policy plus fresh job queue and scheduler, so the app lifespan touches no shared state."""
+    (tmp_path / "policy.json").write_text(json.dumps({"allowed_tools": ["echo"]}))
+    (tmp_path / "model.conf").write_text(MODEL_CONF)
+    (tmp_path / "rbac_policy.csv").write_text("p, viewer, echo\n")
+    store = PolicyStore(tmp_path / "policy.json", tmp_path / "model.conf", tmp_path / "rbac_policy.csv")
+    monkeypatch.setattr(server, "_store", store)
+    monkeypatch.setattr(server, "_jobs", JobQueue(workers=1))
+    monkeypatch.setattr(sandbox, "_scheduler", sandbox.get_scheduler())
+    return store
+
+
+def _level(concurrency: int, throughput: float) -> LevelResult:
+    return LevelResult(concurrency, 100, 0, 1.0, throughput, 1.0, 1.0, 1.0, 1.0)
+
+
+@pytest.mark.loadtest
+def test_asgi_sweep_reports_every_level(app_state):
+    """Each level reports throughput, ordered percentiles and status counts; the knee is one of the levels."""
+    report = run_asgi("authorize", levels=(1, 4), duration=0.2, payload=VIEWER_ECHO, app=server.app)
+    assert report["target"] == {"mode": "asgi"}
+    assert [row["concurrency"] for row in report["levels"]] == [1, 4]
+    for row in report["levels"]:
+        assert row["requests"] > 0
+        assert row["errors"] == 0
+        assert row["statuses"] == {"200": row["requests"]}
+        assert row["p50_ms"] <= row["p90_ms"] <= row["p99_ms"] <= row["max_ms"]
+    assert report["knee"] in (1, 4)
+
+
+@pytest.mark.loadtest
+def test_asgi_sweep_skips_sandbox_warmup_unless_asked(app_state, monkeypatch):
+    started = []
+
+    class RecordingWarmup:
+        def __init__(self, **kwargs):
+            started.append(kwargs)
+
+        def start(self):
+            pass
+
+        def stop(self):
+            pass
+
+    monkeypatch.setattr(warmup, "SandboxWarmup", RecordingWarmup)
+    monkeypatch.delenv("GUARDFLOW_SANDBOX_WARMUP", raising=False)
+    run_asgi("health", levels=(1,), duration=0.05, app=server.app)
+    assert started == [] and "GUARDFLOW_SANDBOX_WARMUP" not in os.environ
+    run_asgi("health", levels=(1,), duration=0.05, app=server.app, warmup=True)
+    assert len(started) == 1
+
+
+@pytest.mark.loadtest
+def test_asgi_sweep_counts_denials_as_errors(app_state):
+    denied = {"actor": {"id": "u1", "role": "guest"}, "tool_call": {"tool": "echo", "args": {}}}
+    report = run_asgi("authorize", levels=(2,), duration=0.1, payload=denied, app=server.app)
+    row = report["levels"][0]
+    assert row["errors"] == row["requests"] > 0
+    assert set(row["statuses"]) == {"403"}
+
+
+@pytest.mark.loadtest
+def test_batch_route_sends_ndjson_of_batch_size_items(app_state):
+    method, path, body, headers = route_request("batch", VIEWER_ECHO, batch_size=3)
+    assert (method, path) == ("POST", "/authorize/batch")
+    assert headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in body.splitlines()] == [VIEWER_ECHO] * 3
+
+    report = run_asgi("batch", levels=(1,), duration=0.1, payload=VIEWER_ECHO, batch_size=3, app=server.app)
+    assert report["levels"][0]["statuses"] == {"200": report["levels"][0]["requests"]}
+
+
+@pytest.mark.loadtest
+def test_unknown_route_is_rejected():
+    with pytest.raises(ValueError, match="unknown route"):
+        route_request("nope", VIEWER_ECHO)
+
+
+@pytest.mark.loadtest
+def test_knee_is_first_level_near_peak_throughput():
+    levels = [_level(1, 100.0), _level(2, 190.0), _level(4, 380.0), _level(8, 400.0), _level(16, 395.0)]
+    assert find_knee(levels) == 4          # 380 is within 5% of the 400 peak
+    assert find_knee(levels, tolerance=0.0) == 8
+    assert find_knee([]) is None
+
+
+@pytest.mark.loadtest
+def test_http_connection_reads_sized_and_chunked_bodies_on_one_connection():
+    """Keep-alive client: content-length and chunked responses back to back, then a closing one."""
+    responses = [
+        b"HTTP/1.1 200 OK\r\ncontent-length: 5\r\n\r\nhello",
+        b"HTTP/1.1 403 Forbidden\r\ntransfer-encoding: chunked\r\n\r\n3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n",
+        b"HTTP/1.1 503 Service Unavailable\r\ncontent-length: 0\r\nconnection: close\r\n\r\n",
+    ]
+    connections = []
+
+    async def handle(reader, writer):
+        connections.append(writer)
+        for response in responses:
+            await reader.readuntil(b"\r\n\r\n")
+            writer.write(response)
+            await writer.drain()
+        writer.close()
+
+    async def main():
+        srv = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = srv.sockets[0].getsockname()[1]
+        conn = HttpConnection("127.0.0.1", port)
+        statuses = [await conn.send("GET", "/health", b"", {}) for _ in responses]
+        await conn.close()
+        srv.close()
+        await srv.wait_closed()
+        return statuses
+
+    assert asyncio.run(main()) == [200, 403, 503]
+    assert len(connections) == 1
@@ -0,0 +1,82 @@
+"""Pipeline metrics tests for guardflow."""
+
+import math
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from guardflow import metrics
+from guardflow.cli import app
+from guardflow.metrics import OTHER, Counter, Histogram, Registry, bucket_quantile, parse_text
+from guardflow.pipeline import run_pipeline
+from guardflow.policy import Policy, PolicyViolation
+from guardflow.rbac import RbacPolicy
+
+REPO_ROOT = Path(__file__).parent.parent
+
+runner = CliRunner()
+
+
+@pytest.mark.metrics
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    hist = registry.register(Histogram("h_seconds", "help", ("stage",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        hist.observe(value, "validate")
+    samples = {(n, tuple(sorted(l.items()))): v for n, l, v in parse_text(registry.render())}
+    assert samples[("h_seconds_bucket", (("le", "0.1"), ("stage", "validate")))] == 1
+    assert samples[("h_seconds_bucket", (("le", "1.0"), ("stage", "validate")))] == 3
+    assert samples[("h_seconds_bucket", (("le", "+Inf"), ("stage", "validate")))] == 4
+    assert samples[("h_seconds_count", (("stage", "validate"),))] == 4
+    assert samples[("h_seconds_sum", (("stage", "validate"),))] == pytest.approx(6.05)
+
+
+@pytest.mark.metrics
+def test_label_series_are_capped():
+    """Request-controlled label values cannot grow a metric without bound."""
+    counter = Counter("c_total", "help", ("tool",), max_series=2)
+    for tool in ("a", "b", "c", "d", "a"):
+        counter.inc(tool)
+    assert counter.value("a") == 2
+    assert counter.value(OTHER) == 2
+
+
+@pytest.mark.metrics
+def test_pipeline_counts_outcomes_by_role_and_tool():
+    policy = Policy.load(REPO_ROOT / "policy.json")
+    rbac = RbacPolicy.load(REPO_ROOT / "model.conf", REPO_ROOT / "rbac_policy.csv")
+    before_ok = metrics.DECISIONS.value("ok", "viewer", "echo")
+    before_denied = metrics.DECISIONS.value("UNAUTHORIZED_TOOL", "viewer", "rm_rf")
+    before_validate = (metrics.STAGE_SECONDS.snapshot("validate") or ([0], 0))[0]
+    run_pipeline({"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "echo", "args": {}}}, policy, rbac)
+    with pytest.raises(PolicyViolation):
+        run_pipeline({"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "rm_rf", "args": {}}}, policy, rbac)
+    assert metrics.DECISIONS.value("ok", "viewer", "echo") == before_ok + 1
+    assert metrics.DECISIONS.value("UNAUTHORIZED_TOOL", "viewer", "rm_rf") == before_denied + 1
+    assert sum(metrics.STAGE_SECONDS.snapshot("validate")[0]) == sum(before_validate) + 2
+
+
+@pytest.mark.metrics
+def test_bucket_quantile():
+    buckets = [(0.1, 50), (1.0, 99), (math.inf, 100)]
+    assert bucket_quantile(0.5, buckets) == 0.1
+    assert bucket_quantile(0.99, buckets) == 1.0
+    assert math.isnan(bucket_quantile(0.5, []))
+
+
+@pytest.mark.metrics
+def test_stats_command_reads_exposition(tmp_path):
+    """guardflow stats summarises a scraped exposition; --raw passes it through."""
+    registry = Registry()
+    registry.register(Histogram("guardflow_stage_seconds", "help", ("stage",))).observe(0.002, "authorize")
+    registry.register(Counter("guardflow_decisions_total", "help", ("outcome",))).inc("RBAC_DENIED")
+    exposition = tmp_path / "metrics.txt"
+    exposition.write_text(registry.render())
+    url = exposition.as_uri()
+    result = runner.invoke(app, ["stats", "--url", url])
+    assert result.exit_code == 0
+    assert "authorize" in result.output
+    assert "RBAC_DENIED" in result.output
+    raw = runner.invoke(app, ["stats", "--url", url, "--raw"])
+    assert raw.output == exposition.read_text()
@@ -0,0 +1,124 @@
+"""Effective-permission diff tests for guardflow policy diff."""
+
+import json
+import random
+from pathlib import Path
+
+import pytest
+import typer.main
+from click.testing import CliRunner
+
+from guardflow.cli import app
+from guardflow.decisions import PolicyCompileError, acl_rules, parse_policy_rules
+from guardflow.policy import Policy
+from guardflow.policy_diff import diff_policies, policy_paths
+from guardflow.rbac import RbacPolicy
+
+runner = CliRunner()
+cli = typer.main.get_command(app)
+
+MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = r.sub == p.sub && r.act == p.act
+"""
+
+
+def _write(directory: Path, tools: list[str], rules: str, model: str = MODEL_CONF) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "policy.json").write_text(json.dumps({"allowed_tools": tools}))
+    (directory / "model.conf").write_text(model)
+    (directory / "rbac_policy.csv").write_text(rules)
+    return directory
+
+
+def _effective(directory: Path) -> set[tuple[str, str]]:
+    """Brute-force reference: every (role, tool) pair the allowlist and Casbin both allow."""
+    policy_path, model_path, rbac_path = policy_paths(directory)
+    policy = Policy.load(policy_path)
+    rbac = RbacPolicy.load(model_path, rbac_path)
+    roles = {rule[0] for rule in rbac.enforcer.get_policy()}
+    return {(r, t) for r in roles for t in policy.allowed_tools if rbac.enforcer.enforce(r, t)}
+
+
+@pytest.mark.policy_diff
+def test_diff_reports_rbac_and_allowlist_changes(tmp_path):
+    old = _write(tmp_path / "old", ["echo", "http_request", "python_exec"],
+                 "p, viewer, echo\np, admin, echo\np, admin, python_exec\np, admin, http_request\n")
+    new = _write(tmp_path / "new", ["echo", "python_exec", "log_read"],
+                 "p, viewer, echo\np, viewer, python_exec\np, admin, echo\np, admin, http_request\np, intern, log_read\n")
+    delta = diff_policies(policy_paths(old), policy_paths(new))
+    assert delta.granted == [("intern", "log_read"), ("viewer", "python_exec")]
+    # admin keeps its http_request rule, but the tool left the allowlist.
+    assert delta.revoked == [("admin", "http_request"), ("admin", "python_exec")]
+    assert (delta.roles_added, delta.roles_removed) == (["intern"], [])
+    assert (delta.tools_added, delta.tools_removed) == (["log_read"], ["http_request"])
+    assert delta.old_version != delta.new_version and delta.changed
+
+
+@pytest.mark.policy_diff
+def test_diff_matches_brute_force_enforcement(tmp_path):
+    rng = random.Random(0)
+    for trial in range(5):
+        sides = []
+        for side in ("old", "new"):
+            tools = rng.sample([f"t{i}" for i in range(40)], 30)
+            rules = "".join(f"p, r{rng.randrange(25)}, t{rng.randrange(45)}\n" for _ in range(300))
+            sides.append(_write(tmp_path / f"{trial}-{side}", tools, rules))
+        before, after = _effective(sides[0]), _effective(sides[1])
+        delta = diff_policies(policy_paths(sides[0]), policy_paths(sides[1]))
+        assert set(delta.granted) == after - before
+        assert set(delta.revoked) == before - after
+
+
+@pytest.mark.policy_diff
+def test_acl_rules_matches_the_general_parser():
+    text = "p, viewer , echo\n# comment\n\n  p,admin,python_exec  \r\ng, admin, viewer\np, ops, [a, b]\n"
+    rules = list(parse_policy_rules(text))
+    assert acl_rules(text) == (
+        [tuple(f) for ptype, f in rules if ptype == "p"],
+        [tuple(f) for ptype, f in rules if ptype == "g"],
+    )
+    assert acl_rules("p, viewer, echo\ng, admin, viewer\n") == ([("viewer", "echo")], [("admin", "viewer")])
+    with pytest.raises(PolicyCompileError):
+        acl_rules("p, viewer, echo, extra\n")
+
+
+@pytest.mark.policy_diff
+def test_diff_rejects_models_it_cannot_compile(tmp_path):
+    keymatch = MODEL_CONF.replace("r.act == p.act", "keyMatch(r.act, p.act)")
+    old = _write(tmp_path / "old", ["echo"], "p, viewer, echo\n")
+    new = _write(tmp_path / "new", ["echo"], "p, viewer, *\n", model=keymatch)
+    with pytest.raises(PolicyCompileError):
+        diff_policies(policy_paths(old), policy_paths(new))
+
+
+@pytest.mark.policy_diff
+def test_policy_diff_cli_json_and_exit_code(tmp_path):
+    old = _write(tmp_path / "old", ["echo", "file_read"], "p, viewer, echo\n")
+    new = _write(tmp_path / "new", ["echo", "file_read"], "p, viewer, echo\np, viewer, file_read\n")
+
+    result = runner.invoke(cli, ["policy", "diff", "--old", str(old), "--new", str(new), "--json", "--exit-code"])
+    assert result.exit_code == 1
+    body = json.loads(result.stdout)
+    assert body["granted"] == [{"role": "viewer", "tool": "file_read"}] and body["revoked"] == []
+
+    result = runner.invoke(cli, ["policy", "diff", "--old", str(old), "--new", str(new)])
+    assert result.exit_code == 0
+    assert "file_read" in result.output and "1 grant(s) added, 0 revoked" in result.output
+
+    result = runner.invoke(cli, ["policy", "diff", "--old", str(old), "--new", str(old), "--exit-code"])
+    assert result.exit_code == 0
+    assert "No effective permission changes" in result.output
+
+    result = runner.invoke(cli, ["policy", "diff", "--old", str(tmp_path / "missing"), "--new", str(new)])
+    assert result.exit_code == 1
+    assert "policy file not found" in result.stderr
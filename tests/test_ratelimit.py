@@ -0,0 +1,197 @@
+"""Per-actor rate limit tests for guardflow."""
+
+import json
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from guardflow import audit, ratelimit
+from guardflow.batch import error_for
+from guardflow.models import RunRequest
+from guardflow.pipeline import authorize
+from guardflow.policy import Policy, PolicyViolation
+from guardflow.ratelimit import RateLimit, RateLimited, RateLimiter, RateLimitPolicy, RateLimitRule, SharedRateLimiter
+from guardflow.rbac import RbacPolicy
+
+MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = r.sub == p.sub && r.act == p.act
+"""
+
+POLICY_CSV = """\
+p, viewer, echo
+p, viewer, file_read
+p, operator, echo
+p, operator, python_exec
+"""
+
+RATE_LIMITS = [
+    {"role": "viewer", "requests": 3, "per": 60},
+    {"role": "operator", "tool": "python_exec", "requests": 1, "per": 10},
+    {"requests": 100, "per": 1},
+]
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    """A fake clock driving a fresh process-wide limiter."""
+    clock = Clock()
+    monkeypatch.setattr(ratelimit, "_limiter", RateLimiter(clock=clock))
+    return clock
+
+
+def _request(actor: str, role: str, tool: str) -> RunRequest:
+    return RunRequest.model_validate({"actor": {"id": actor, "role": role}, "tool_call": {"tool": tool, "args": {}}})
+
+
+@pytest.mark.rate_limit
+def test_bucket_allows_bursts_then_refills():
+    clock = Clock()
+    limiter = RateLimiter(clock=clock)
+    limit = RateLimit("\0viewer\0*", rate=0.5, burst=2)
+    assert [limiter.acquire("u1", limit) for _ in range(3)] == [0.0, 0.0, 2.0]
+    assert limiter.acquire("u2", limit) == 0.0          # every actor has its own bucket
+    clock.now += 1.0
+    assert limiter.acquire("u1", limit) == pytest.approx(1.0)
+    clock.now += 1.0
+    assert limiter.acquire("u1", limit) == 0.0
+    with pytest.raises(RateLimited) as info:
+        limiter.check("u1", "echo", limit)
+    assert info.value.retry_after == pytest.approx(2.0) and info.value.actor == "u1"
+
+
+@pytest.mark.rate_limit
+def test_most_specific_rule_applies():
+    limits = RateLimitPolicy(RateLimitRule.model_validate(rule) for rule in RATE_LIMITS)
+    viewer = limits.limit_for("viewer", "echo")
+    assert viewer == limits.limit_for("viewer", "file_read")     # one budget across the role's tools
+    assert viewer.burst == 3 and viewer.rate == pytest.approx(0.05)
+    assert limits.limit_for("operator", "python_exec").burst == 1
+    assert limits.limit_for("operator", "echo").burst == 100
+    assert RateLimitPolicy().limit_for("viewer", "echo") is None
+
+
+@pytest.mark.rate_limit
+def test_idle_buckets_are_evicted_and_table_is_bounded():
+    clock = Clock()
+    limiter = RateLimiter(stripes=1, max_entries=50, clock=clock)
+    limit = RateLimit("\0*\0*", rate=1.0, burst=5)
+    for i in range(40):
+        limiter.acquire(f"u{i}", limit)
+    assert len(limiter) == 40
+    clock.now += ratelimit.SWEEP_INTERVAL      # every bucket is full again, so the sweep drops them all
+    limiter.acquire("fresh", limit)
+    assert len(limiter) == 1
+    for i in range(200):
+        limiter.acquire(f"v{i}", limit)
+    assert len(limiter) == 50
+
+
+@pytest.mark.rate_limit
+def test_concurrent_callers_share_one_budget():
+    limiter = RateLimiter(stripes=4, clock=Clock())
+    limit = RateLimit("\0*\0*", rate=1.0, burst=500)
+    granted = []
+
+    def worker():
+        granted.append(sum(limiter.acquire(actor, limit) == 0.0 for actor in ["a", "b"] * 400))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(granted) == 2 * 500
+
+
+def _shared_grants(path: str, calls: int) -> int:
+    limiter = SharedRateLimiter(Path(path), slots=1024, clock=lambda: 1000.0)
+    try:
+        limit = RateLimit("\0*\0*", rate=1.0, burst=300)
+        return sum(limiter.acquire("u1", limit) == 0.0 for _ in range(calls))
+    finally:
+        limiter.close()
+
+
+@pytest.mark.rate_limit
+def test_shared_table_is_one_budget_across_processes(tmp_path):
+    path = str(tmp_path / "ratelimit")
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        grants = list(pool.map(_shared_grants, [path] * 3, [200] * 3))
+    assert sum(grants) == 300
+
+    with pytest.raises(ValueError, match="different layout"):
+        SharedRateLimiter(tmp_path / "ratelimit", slots=2048)
+
+
+@pytest.mark.rate_limit
+def test_shared_table_refills_and_reuses_slots(tmp_path):
+    clock = Clock()
+    limiter = SharedRateLimiter(tmp_path / "ratelimit", slots=16, stripes=1, clock=clock)
+    limit = RateLimit("\0*\0*", rate=1.0, burst=1)
+    assert limiter.acquire("u1", limit) == 0.0
+    assert limiter.acquire("u1", limit) == pytest.approx(1.0)
+    clock.now += 1.0
+    assert limiter.acquire("u1", limit) == 0.0
+    # More actors than slots: live buckets nearest to full are evicted, never an error.
+    assert all(limiter.acquire(f"v{i}", limit) == 0.0 for i in range(64))
+    limiter.close()
+
+
+@pytest.mark.rate_limit
+def test_invalid_rate_limits_fail_policy_validation():
+    for limits in (
+        [{"role": "viewer", "requests": 1}, {"role": "viewer", "requests": 2}],
+        [{"requests": 0}],
+        [{"requests": 1, "per": 0}],
+        [{"requests": 1, "window": 60}],
+    ):
+        with pytest.raises(ValidationError):
+            Policy.model_validate({"allowed_tools": ["echo"], "rate_limits": limits})
+
+
+@pytest.mark.rate_limit
+def test_authorize_charges_only_calls_that_pass_every_gate(tmp_path, clock):
+    (tmp_path / "model.conf").write_text(MODEL_CONF)
+    (tmp_path / "rbac_policy.csv").write_text(POLICY_CSV)
+    policy = Policy.model_validate({"allowed_tools": ["echo", "file_read", "python_exec"], "rate_limits": RATE_LIMITS})
+    rbac = RbacPolicy.load(tmp_path / "model.conf", tmp_path / "rbac_policy.csv")
+
+    for _ in range(5):
+        with pytest.raises(PolicyViolation):
+            authorize(_request("u1", "viewer", "http_request"), policy, rbac)
+    authorize(_request("u1", "viewer", "echo"), policy, rbac)
+    authorize(_request("u1", "viewer", "file_read"), policy, rbac)
+    authorize(_request("u1", "viewer", "echo"), policy, rbac)
+    with pytest.raises(RateLimited) as info:
+        authorize(_request("u1", "viewer", "file_read"), policy, rbac)
+    assert info.value.retry_after == pytest.approx(20.0)
+    authorize(_request("u2", "viewer", "echo"), policy, rbac)
+    clock.now += 20.0
+    authorize(_request("u1", "viewer", "echo"), policy, rbac)
+
+    assert audit.outcome_for(info.value) == "RATE_LIMITED"
+    error = error_for(info.value)
+    assert (error.code, error.actor, error.tool) == ("RATE_LIMITED", "u1", "file_read")
+    assert error.retry_after == pytest.approx(20.0)
+
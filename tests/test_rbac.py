@@ -8,6 +8,8 @@ import typer.main
 from click.testing import CliRunner
 
 from guardflow.cli import app
+from guardflow.policy import policy_version
+from guardflow.rbac import DecisionCache, RbacPolicy
 
 runner = CliRunner()
 cli = typer.main.get_command(app)
@@ -178,3 +180,59 @@ def test_missing_rbac_file(tmp_path):
         ],
     )
     assert result.exit_code != 0
+
+
+@pytest.mark.rbac_authorization
+def test_decision_cache_hits(tmp_path):
+    """Repeated decisions are served from the cache and counted as hits."""
+    model_file, policy_file = _write_rbac_files(tmp_path)
+    rbac = RbacPolicy.load(model_file, policy_file)
+    for _ in range(10):
+        assert rbac.is_allowed("viewer", "echo") is True
+        assert rbac.is_allowed("viewer", "http_request") is False
+    stats = rbac.cache.stats()
+    assert stats["misses"] == 2
+    assert stats["hits"] == 18
+
+
+@pytest.mark.rbac_authorization
+def test_decision_cache_bounded():
+    """The cache never grows past maxsize and counts evictions."""
+    cache = DecisionCache(maxsize=2)
+    cache.put(("a", "echo", "v1"), True)
+    cache.put(("b", "echo", "v1"), True)
+    assert cache.get(("a", "echo", "v1")) is True     # refreshes "a"
+    cache.put(("c", "echo", "v1"), False)
+    assert cache.get(("b", "echo", "v1")) is None     # least recently used went first
+    assert cache.get(("a", "echo", "v1")) is True
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["evictions"] == 1
+
+
+@pytest.mark.rbac_authorization
+def test_decision_cache_keyed_on_version(tmp_path):
+    """A policy with different content never reuses another version's decisions."""
+    model_file, policy_file = _write_rbac_files(tmp_path)
+    cache = DecisionCache()
+    old = RbacPolicy.load(model_file, policy_file, cache)
+    assert old.is_allowed("viewer", "http_request") is False
+    policy_file.write_text(POLICY_CSV + "p, viewer, http_request\n")
+    new = RbacPolicy.load(model_file, policy_file, cache)
+    assert new.version != old.version
+    assert new.is_allowed("viewer", "http_request") is True
+
+
+@pytest.mark.rbac_authorization
+def test_decision_cache_ttl():
+    """Entries older than the TTL are treated as misses."""
+    cache = DecisionCache(ttl=0.0)
+    cache.put(("a", "echo", "v1"), True)
+    assert cache.get(("a", "echo", "v1")) is None
+
+
+@pytest.mark.rbac_authorization
+def test_version_hashes_loaded_files(tmp_path):
+    """A standalone RbacPolicy labels its cache entries with policy_version of the files it parsed."""
+    model_file, policy_file = _write_rbac_files(tmp_path)
+    rbac = RbacPolicy.load(model_file, policy_file)
+    assert rbac.version == policy_version(model_file.read_bytes(), policy_file.read_bytes())
@@ -1,5 +1,7 @@
 """Red-team adversarial guardrail regression suite tests."""
 import json
+import random
+import re
 from pathlib import Path
 
 import pytest
@@ -7,7 +9,16 @@ import typer.main
 from click.testing import CliRunner
 
 from guardflow.cli import app
-from guardflow.redteam import REDTEAM_CASES
+from guardflow.fuzz import GATE_ORDER, confusable_tool, fuzz_case, run_fuzz
+from guardflow.redteam import (
+    REDTEAM_CASES,
+    CaseLoadError,
+    RedteamCase,
+    ResultLog,
+    load_cases,
+    parse_shard,
+    run_cases,
+)
 
 runner = CliRunner()
 cli = typer.main.get_command(app)
@@ -147,3 +158,203 @@ def test_redteam_run_output_contains_case_names(tmp_path):
     assert result.exit_code == 0
     for case in REDTEAM_CASES:
         assert case.name in result.output
+
+
+ECHO_OK = RedteamCase(
+    name="echo_ok",
+    description="viewer echo",
+    payload={"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "echo", "args": {"text": "hi"}}},
+    expected="ok",
+)
+
+
+@pytest.mark.redteam_suite
+def test_fuzz_cases_are_deterministic_per_seed_and_index():
+    case = fuzz_case(7, 42)
+    assert case == fuzz_case(7, 42)
+    assert case.name == "fuzz-7-42" and case.tags
+    assert fuzz_case(7, 43) != case and fuzz_case(8, 42) != case
+
+
+@pytest.mark.redteam_suite
+def test_fuzz_expected_outcome_is_the_earliest_gate_tripped():
+    """Mutations force their gate's outcome; the earliest gate wins over the base case."""
+    for index in range(300):
+        case = fuzz_case(0, index, base=[ECHO_OK])
+        forced = {"confusable_tool": "UNAUTHORIZED_TOOL", "role_case": "RBAC_DENIED"}
+        candidates = {"ok", "SCHEMA_REJECTED"} | {forced[t] for t in case.tags if t in forced}
+        assert case.expected in candidates
+        if set(case.tags) <= {"huge_args"}:
+            assert case.expected == "ok"
+        if "confusable_tool" in case.tags:
+            assert GATE_ORDER.index(case.expected) <= GATE_ORDER.index("UNAUTHORIZED_TOOL")
+            assert case.payload["tool_call"]["tool"] != "echo"
+
+
+@pytest.mark.redteam_suite
+def test_confusable_tool_names_never_equal_the_original():
+    rng = random.Random(0)
+    for _ in range(200):
+        payload = {"tool_call": {"tool": "python_exec", "args": {}}}
+        assert confusable_tool(rng, payload) == "UNAUTHORIZED_TOOL"
+        assert payload["tool_call"]["tool"] != "python_exec"
+
+
+@pytest.mark.redteam_suite
+def test_fuzz_process_pool_matches_single_process(tmp_path):
+    paths = _write_policy_files(tmp_path)
+    single = list(run_fuzz(300, *paths, seed=3, chunk_size=50))
+    pooled = list(run_fuzz(300, *paths, seed=3, workers=2, chunk_size=50))
+    assert pooled == single
+    assert [r.name for r in single] == [f"fuzz-3-{i}" for i in range(300)]
+    assert all(r.passed for r in single)
+
+
+@pytest.mark.redteam_suite
+def test_redteam_fuzz_writes_jsonl_report(tmp_path):
+    allowlist, model_file, policy_file = _write_policy_files(tmp_path)
+    report = tmp_path / "fuzz.jsonl"
+    result = runner.invoke(
+        cli,
+        ["redteam", "fuzz", "--count", "200", "--workers", "1", "--report", str(report),
+         "--policy", str(allowlist), "--rbac-model", str(model_file), "--rbac-policy", str(policy_file)],
+    )
+    assert result.exit_code == 0, result.output
+    assert "200/200 fuzz cases passed" in result.output
+    lines = [json.loads(line) for line in report.read_text().splitlines()]
+    assert len(lines) == 201
+    assert lines[0]["name"] == "fuzz-0-0" and lines[0]["passed"] is True
+    summary = lines[-1]["summary"]
+    assert summary["total"] == 200 and summary["failed"] == 0
+    assert set(summary["mutations"]) == {"confusable_tool", "nested_extra", "huge_args", "role_case"}
+
+
+@pytest.mark.redteam_suite
+def test_redteam_fuzz_reports_failure_classes(tmp_path):
+    """A policy that also grants a differently-cased role is caught and grouped by failure class."""
+    allowlist, model_file, policy_file = _write_policy_files(tmp_path)
+    policy_file.write_text(POLICY_CSV + "p, VIEWER, echo\np, Viewer, echo\n")
+    report = tmp_path / "fuzz.jsonl"
+    result = runner.invoke(
+        cli,
+        ["redteam", "fuzz", "--count", "1000", "--workers", "1", "--report", str(report),
+         "--policy", str(allowlist), "--rbac-model", str(model_file), "--rbac-policy", str(policy_file)],
+    )
+    assert result.exit_code == 1
+    assert "Failure classes" in result.output
+    summary = json.loads(report.read_text().splitlines()[-1])["summary"]
+    assert summary["failed"] > 0
+    assert all("role_case" in row["class"] and row["class"].endswith("got ok") for row in summary["failure_classes"])
+
+
+def _corpus(tmp_path, n: int = 30) -> Path:
+    """A JSONL corpus alternating allowed and RBAC-denied cases."""
+    corpus = tmp_path / "corpus" / "cases.jsonl"
+    corpus.parent.mkdir()
+    lines = []
+    for i in range(n):
+        role, expected = ("viewer", "ok") if i % 2 else ("viewer", "RBAC_DENIED")
+        tool = "echo" if expected == "ok" else "http_request"
+        payload = {"actor": {"id": f"u{i}", "role": role}, "tool_call": {"tool": tool, "args": {"i": i}}}
+        lines.append(json.dumps({"payload": payload, "expected": expected}))
+    corpus.write_text("\n".join(lines) + "\n")
+    return corpus.parent
+
+
+def _redteam(*args):
+    return runner.invoke(cli, ["redteam", "run", *args])
+
+
+@pytest.mark.redteam_suite
+def test_redteam_run_loads_fixture_directory(tmp_path):
+    """Bare payload fixtures take their expected outcome from the directory's expected.json."""
+    allowlist, model_file, policy_file = _write_policy_files(tmp_path)
+    result = _redteam("--cases", str(FIXTURES), "--policy", str(allowlist),
+                      "--rbac-model", str(model_file), "--rbac-policy", str(policy_file))
+    assert result.exit_code == 0, result.output
+    assert "6/6 cases passed" in result.output
+    names = sorted(case.name for case in load_cases([FIXTURES]))
+    assert names == sorted(f"{case.name}.json" for case in REDTEAM_CASES)
+
+
+@pytest.mark.redteam_suite
+def test_load_cases_is_lazy_and_names_lines_by_location(tmp_path):
+    corpus = _corpus(tmp_path, n=3)
+    with (corpus / "cases.jsonl").open("a") as fh:
+        fh.write("{not json\n")
+    cases = load_cases([corpus])
+    first = next(cases)
+    assert first.name == "cases.jsonl:1" and first.expected == "RBAC_DENIED"
+    next(cases), next(cases)
+    with pytest.raises(CaseLoadError, match="cases.jsonl:4"):
+        next(cases)
+
+
+@pytest.mark.redteam_suite
+def test_bare_payload_without_expected_outcome_is_rejected(tmp_path):
+    (tmp_path / "lonely.json").write_text(json.dumps({"actor": {"id": "u", "role": "viewer"}}))
+    with pytest.raises(CaseLoadError, match="no expected outcome"):
+        list(load_cases([tmp_path]))
+    (tmp_path / "expected.json").write_text(json.dumps({"lonely": "MAYBE"}))
+    with pytest.raises(CaseLoadError, match="unknown expected outcome"):
+        list(load_cases([tmp_path]))
+
+
+@pytest.mark.redteam_suite
+def test_shards_partition_the_corpus(tmp_path):
+    corpus = _corpus(tmp_path, n=60)
+    everything = [case.name for case in load_cases([corpus])]
+    shards = [[case.name for case in load_cases([corpus], (i, 3))] for i in (1, 2, 3)]
+    assert sorted(sum(shards, [])) == sorted(everything)
+    assert all(shards)
+    assert parse_shard("2/4") == (2, 4)
+    for bad in ("0/4", "5/4", "2", "a/b"):
+        with pytest.raises(ValueError):
+            parse_shard(bad)
+
+
+@pytest.mark.redteam_suite
+def test_result_log_skips_cases_passed_under_the_same_policy_version(tmp_path):
+    corpus = _corpus(tmp_path)
+    paths = _write_policy_files(tmp_path)
+    path = tmp_path / "results.jsonl"
+
+    log = ResultLog(path, "v1")
+    results = list(run_cases(log.pending(load_cases([corpus])), paths))
+    for r in results:
+        log.record(r)
+    log.close()
+    assert len(results) == 30 and log.skipped == 0
+
+    log = ResultLog(path, "v1")
+    assert list(log.pending(load_cases([corpus]))) == []
+    assert log.skipped == 30
+    log.close()
+    assert len(list(ResultLog(path, "v2").pending(load_cases([corpus])))) == 30
+
+
+@pytest.mark.redteam_suite
+def test_redteam_run_corpus_with_results_shard_and_workers(tmp_path):
+    """Failures are listed and never recorded; passes are skipped on the next run."""
+    corpus = _corpus(tmp_path)
+    allowlist, model_file, policy_file = _write_policy_files(tmp_path)
+    (corpus / "wrong.jsonl").write_text(json.dumps({
+        "name": "wrongly_expected",
+        "payload": {"actor": {"id": "u", "role": "viewer"}, "tool_call": {"tool": "echo", "args": {}}},
+        "expected": "RBAC_DENIED",
+    }) + "\n")
+    common = ["--cases", str(corpus), "--policy", str(allowlist), "--rbac-model", str(model_file),
+              "--rbac-policy", str(policy_file), "--results", str(tmp_path / "results.jsonl")]
+
+    first = _redteam(*common, "--workers", "2")
+    assert first.exit_code == 1
+    assert "30/31 cases passed" in first.stderr
+    assert "wrongly_expected" in first.output and "cases.jsonl:1" not in first.output
+
+    second = _redteam(*common)
+    assert second.exit_code == 1
+    assert "0/1 cases passed" in second.stderr and "30 already passed" in second.stderr
+
+    sharded = [_redteam(*common[:-2], "--shard", f"{i}/2") for i in (1, 2)]
+    totals = [int(re.search(r"\d+/(\d+) cases passed", r.output).group(1)) for r in sharded]
+    assert sum(totals) == 31
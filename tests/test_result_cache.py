@@ -0,0 +1,163 @@
+"""python_exec result cache tests for guardflow (no Docker required)."""
+
+import json
+import time
+
+import pytest
+
+from guardflow import result_cache, sandbox
+from guardflow.models import RunRequest
+from guardflow.pipeline import execute_stream, run_pipeline
+from guardflow.policy import Policy
+from guardflow.rbac import RbacPolicy
+from guardflow.result_cache import ResultCache, cache_key
+
+MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = r.sub == p.sub && r.act == p.act
+"""
+
+POLICY = Policy(allowed_tools=["python_exec"])
+RBAC = RbacPolicy.from_text(MODEL_CONF, "p, admin, python_exec\np, analyst, python_exec\n", version="v1")
+OK = {"stdout": "4\n", "stderr": "", "exit_code": 0}
+
+
+def _request(role: str, code: str = "print(2+2)", **args) -> dict:
+    return {"actor": {"id": "u1", "role": role}, "tool_call": {"tool": "python_exec", "args": {"code": code, **args}}}
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """Install a fresh cache and count one-shot sandbox runs."""
+    calls = []
+
+    def fake_run(code, timeout):
+        calls.append(code)
+        return {"stdout": "4\n", "stderr": "", "exit_code": 1 if "fail" in code else 0}
+
+    monkeypatch.setattr(sandbox, "run_python", fake_run)
+    monkeypatch.setattr(sandbox, "_pool", None)
+    monkeypatch.setattr(result_cache, "_cache", ResultCache())
+    return calls
+
+
+@pytest.mark.result_cache
+def test_lru_and_ttl_eviction():
+    cache = ResultCache(max_entries=2, ttl=0.05)
+    cache.put("a", OK)
+    cache.put("b", OK)
+    assert cache.get("a") == OK           # a is now most recently used
+    cache.put("c", OK)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None and cache.get("c") is None
+
+
+@pytest.mark.result_cache
+def test_only_successful_runs_are_stored_and_hits_are_copies():
+    cache = ResultCache()
+    cache.put("fail", {**OK, "exit_code": 1})
+    assert cache.get("fail") is None
+    cache.put("ok", {**OK, "cache": "miss"})
+    hit = cache.get("ok")
+    assert hit == OK
+    hit["stdout"] = "mutated"
+    assert cache.get("ok") == OK
+
+
+@pytest.mark.result_cache
+def test_disk_tier_survives_a_new_cache_and_drops_bad_entries(tmp_path):
+    ResultCache(directory=tmp_path).put("k1", OK)
+    fresh = ResultCache(directory=tmp_path)
+    assert fresh.get("k1") == OK
+    assert fresh.stats()["disk_hits"] == 1
+    assert fresh.get("k1") == OK
+    assert fresh.stats()["hits"] == 1      # promoted into memory
+
+    path = tmp_path / "k2" / "k2.json"        # <dir>/<key[:2]>/<key>.json
+    path.parent.mkdir(exist_ok=True)
+    path.write_text("{torn")
+    assert fresh.get("k2") is None and not path.exists()
+
+    expired = tmp_path / "k3" / "k3.json"
+    expired.parent.mkdir(exist_ok=True)
+    expired.write_text(json.dumps({"expires": time.time() - 1, "result": OK}))
+    assert fresh.get("k3") is None and not expired.exists()
+
+    # Valid JSON of the wrong shape is a miss too, never an error on the execute path.
+    for i, malformed in enumerate(([OK], {"expires": None}, {"result": "x"}, {"expires": "soon", "result": OK}, 7)):
+        path = tmp_path / "k4" / f"k4{i}.json"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(json.dumps(malformed))
+        assert fresh.get(f"k4{i}") is None and not path.exists(), malformed
+
+
+@pytest.mark.result_cache
+def test_disk_prune_keeps_newest_entries(tmp_path):
+    cache = ResultCache(directory=tmp_path, disk_max_entries=2)
+    for i in range(4):
+        cache.put(f"key{i}", OK)
+        time.sleep(0.01)
+    cache.prune()
+    assert sorted(p.stem for p in tmp_path.glob("*/*.json")) == ["key2", "key3"]
+
+
+@pytest.mark.result_cache
+def test_key_covers_role_code_and_limits(monkeypatch):
+    base = cache_key("admin", "print(1)")
+    assert cache_key("admin", "print(1)") == base
+    assert cache_key("analyst", "print(1)") != base
+    assert cache_key("admin", "print(2)") != base
+    assert cache_key("admin", "print(1)", timeout=5) != base
+    monkeypatch.setattr(sandbox, "_max_output", 10)
+    assert cache_key("admin", "print(1)") != base
+
+
+@pytest.mark.result_cache
+def test_pipeline_reports_hits_misses_and_bypass_per_role(runs):
+    """A repeat run is a hit for the same role only; cache=false always runs; failures are not cached."""
+    first = run_pipeline(_request("admin"), POLICY, RBAC).data["sandbox"]
+    second = run_pipeline(_request("admin"), POLICY, RBAC).data["sandbox"]
+    other_role = run_pipeline(_request("analyst"), POLICY, RBAC).data["sandbox"]
+    bypass = run_pipeline(_request("admin", cache=False), POLICY, RBAC).data["sandbox"]
+    assert (first["cache"], second["cache"], other_role["cache"], bypass["cache"]) == ("miss", "hit", "miss", "bypass")
+    assert second["stdout"] == "4\n"
+    assert len(runs) == 3
+
+    for _ in range(2):
+        assert run_pipeline(_request("admin", code="fail()"), POLICY, RBAC).data["sandbox"]["cache"] == "miss"
+    assert len(runs) == 5
+
+
+@pytest.mark.result_cache
+def test_disabled_cache_leaves_results_unchanged(runs, monkeypatch):
+    monkeypatch.setattr(result_cache, "_cache", None)
+    assert run_pipeline(_request("admin"), POLICY, RBAC).data["sandbox"] == OK
+
+
+@pytest.mark.result_cache
+def test_streamed_runs_are_cached_and_replayed(runs, monkeypatch):
+    streamed = []
+
+    def fake_stream(code, timeout):
+        streamed.append(code)
+        yield sandbox.SandboxEvent("stdout", "4\n")
+        yield sandbox.SandboxEvent("exit", {"exit_code": 0, "truncated": {}})
+
+    monkeypatch.setattr(sandbox, "stream_python", fake_stream)
+    request = RunRequest.model_validate(_request("admin", code="print(4)"))
+    miss = list(execute_stream(request))
+    hit = list(execute_stream(request))
+    assert miss[-1].data["cache"] == "miss"
+    assert hit == [("stdout", "4\n"), ("exit", {"exit_code": 0, "truncated": {}, "cache": "hit"})]
+    assert len(streamed) == 1
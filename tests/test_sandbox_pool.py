@@ -0,0 +1,334 @@
+"""Warm sandbox container pool tests for guardflow (fake Docker, no daemon needed)."""
+
+import threading
+import time
+
+import pytest
+
+from guardflow import sandbox
+from guardflow.batch import error_for
+from guardflow.sandbox import SandboxBusy, SandboxError, SandboxScheduler
+from guardflow.sandbox_pool import ContainerPool
+
+
+class FakeContainer:
+    def __init__(self, results):
+        self.id = f"c{id(self)}"
+        self.results = results
+        self.execs = []
+        self.removed = False
+        self.killed = threading.Event()
+        self.exec_ids = []
+
+    def kill(self):
+        self.killed.set()
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeApi:
+    """The low-level exec calls ``ContainerPool`` streams through."""
+
+    def __init__(self, client):
+        self.client = client
+        self.pending = {}
+
+    def exec_create(self, container_id, cmd, user=""):
+        container = next(c for c, _ in self.client.started if c.id == container_id)
+        container.execs.append((cmd, user))
+        exec_id = f"e{len(self.pending)}"
+        container.exec_ids.append(exec_id)
+        self.pending[exec_id] = container.results.pop(0) if container.results else (0, (b"ok\n", None))
+        return {"Id": exec_id}
+
+    def exec_start(self, exec_id, stream=False, demux=False):
+        exit_code, (stdout, stderr) = self.pending[exec_id]
+        if exit_code is None:                   # runs until the container is killed
+            container = next(c for c, _ in self.client.started if exec_id in c.exec_ids)
+            container.killed.wait(10)
+            self.pending[exec_id] = (137, (None, None))
+            return iter([])
+        if isinstance(stdout, list):            # a list of (stdout, stderr) chunks
+            return iter(stdout)
+        return iter([(stdout, stderr)])
+
+    def exec_inspect(self, exec_id):
+        return {"ExitCode": self.pending[exec_id][0]}
+
+
+class FakeClient:
+    def __init__(self, results=None):
+        self.results = results if results is not None else []
+        self.started = []
+        self.containers = self
+        self.api = FakeApi(self)
+
+    def run(self, **kwargs):
+        container = FakeContainer(self.results)
+        self.started.append((container, kwargs))
+        return container
+
+
+def _pool(client, **kwargs) -> ContainerPool:
+    kwargs.setdefault("min_size", 0)
+    return ContainerPool(client_factory=lambda: client, **kwargs)
+
+
+@pytest.mark.sandbox_isolation
+def test_pool_reuses_warm_container():
+    """Successful runs go back to the idle set and the next run reuses the container."""
+    client = FakeClient()
+    pool = _pool(client, max_size=2)
+    assert pool.run("print('ok')") == {"stdout": "ok\n", "stderr": "", "exit_code": 0}
+    pool.run("print('ok')")
+    assert len(client.started) == 1
+    assert pool.stats()["idle"] == 1
+
+
+@pytest.mark.sandbox_isolation
+def test_pool_container_isolation_settings():
+    """Warm containers keep the one-shot limits and add read-only root, tmpfs and a pid cap."""
+    client = FakeClient()
+    pool = _pool(client)
+    pool.run("print(1)")
+    container, kwargs = client.started[0]
+    assert kwargs["network_mode"] == "none"
+    assert kwargs["mem_limit"] == sandbox.SANDBOX_MEMORY
+    assert kwargs["nano_cpus"] == sandbox.SANDBOX_NANO_CPUS
+    assert kwargs["read_only"] is True
+    assert "/tmp" in kwargs["tmpfs"]
+    cmd, user = container.execs[0]
+    assert user == "nobody"
+    assert cmd[3] == "print(1)"                 # code is passed as an argument, never interpolated
+    assert "kill -9 -1" in cmd[2] and "rm -rf /tmp/*" in cmd[2]
+
+
+@pytest.mark.sandbox_isolation
+def test_pool_recycles_after_max_uses():
+    client = FakeClient()
+    pool = _pool(client, max_uses=2)
+    for _ in range(3):
+        pool.run("pass")
+    assert len(client.started) == 2
+    pool.refill()
+    assert client.started[0][0].removed is True
+
+
+@pytest.mark.sandbox_isolation
+def test_pool_recycles_on_failure_and_timeout():
+    """A non-zero exit returns normally but discards the container; a timeout kills it and raises."""
+    client = FakeClient(results=[(1, (None, b"boom")), (124, (None, None)), (None, (None, None))])
+    pool = _pool(client)
+    assert pool.run("raise SystemExit(1)")["exit_code"] == 1
+    # 124 is what coreutils `timeout` returns, but code may exit with it too; only the deadline means a timeout.
+    assert pool.run("raise SystemExit(124)")["exit_code"] == 124
+    with pytest.raises(SandboxError, match="timed out"):
+        pool.run("while True: pass", timeout=1)
+    assert client.started[2][0].killed.is_set()
+    assert len(client.started) == 3
+    assert pool.stats()["recycled"] == 3
+    assert pool.stats()["idle"] == 0
+
+
+@pytest.mark.sandbox_isolation
+def test_pool_falls_back_to_one_shot(monkeypatch):
+    """When no warm container can be had the one-shot path is used."""
+    monkeypatch.setattr(sandbox, "run_python", lambda code, timeout: {"stdout": "cold", "stderr": "", "exit_code": 0})
+
+    def broken():
+        raise RuntimeError("docker unavailable")
+
+    pool = ContainerPool(min_size=0, client_factory=broken)
+    assert pool.run("print(1)")["stdout"] == "cold"
+    assert pool.stats()["fallbacks"] == 1
+
+
+@pytest.mark.sandbox_isolation
+def test_pool_refill_to_min_size():
+    client = FakeClient()
+    pool = _pool(client, min_size=3, max_size=4)
+    pool.refill()
+    assert pool.stats()["idle"] == 3
+    pool.stop()
+    assert all(c.removed for c, _ in client.started)
+
+
+@pytest.mark.sandbox_isolation
+def test_execute_python_routes_through_pool(monkeypatch):
+    client = FakeClient()
+    pool = _pool(client)
+    monkeypatch.setattr(sandbox, "_pool", None)
+    sandbox.set_pool(pool)
+    assert sandbox.execute_python("print(1)")["stdout"] == "ok\n"
+    assert len(client.started) == 1
+
+
+@pytest.mark.sandbox_isolation
+def test_shared_docker_client_is_reused(monkeypatch):
+    """get_client() connects once and hands every caller the same client."""
+    calls = []
+    monkeypatch.setattr(sandbox, "_client", None)
+    monkeypatch.setattr(sandbox.docker, "from_env", lambda **kw: calls.append(kw) or FakeClient())
+    assert sandbox.get_client() is sandbox.get_client()
+    assert len(calls) == 1
+    assert calls[0]["max_pool_size"] >= sandbox.SANDBOX_MAX_CONCURRENCY
+
+
+@pytest.mark.sandbox_isolation
+def test_docker_client_pool_follows_the_configured_scheduler(monkeypatch):
+    """A scheduler admitting more callers than the cached client can serve gets a bigger client."""
+    calls = []
+    monkeypatch.setattr(sandbox, "_client", None)
+    monkeypatch.setattr(sandbox, "_scheduler", sandbox.SandboxScheduler())
+    monkeypatch.setattr(sandbox.docker, "from_env", lambda **kw: calls.append(kw) or FakeClient())
+    monkeypatch.setattr(FakeClient, "close", lambda self: None, raising=False)
+    small = sandbox.get_client()
+    sandbox.set_scheduler(sandbox.SandboxScheduler(max_concurrency=64, max_queue=256))
+    assert sandbox.get_client() is not small
+    assert calls[1]["max_pool_size"] >= 64 + 256
+    sandbox.set_scheduler(sandbox.SandboxScheduler(max_concurrency=1, max_queue=0))
+    assert len(calls) == 2
+
+
+@pytest.mark.sandbox_isolation
+def test_scheduler_rejects_when_queue_full():
+    """With every slot taken and no queue, callers get SandboxBusy immediately."""
+    scheduler = SandboxScheduler(max_concurrency=1, max_queue=0, queue_timeout=5.0)
+    with scheduler.slot():
+        with pytest.raises(SandboxBusy) as exc_info:
+            scheduler.acquire()
+    assert exc_info.value.retry_after == 5.0
+    assert scheduler.stats()["rejected"] == 1
+    assert scheduler.stats()["active"] == 0
+
+
+@pytest.mark.sandbox_isolation
+def test_scheduler_queue_timeout_and_handoff():
+    """A queued caller times out if no slot frees up, and proceeds once one does."""
+    scheduler = SandboxScheduler(max_concurrency=1, max_queue=1, queue_timeout=0.05)
+    scheduler.acquire()
+    with pytest.raises(SandboxBusy):
+        scheduler.acquire()
+    assert scheduler.stats()["timed_out"] == 1
+
+    scheduler.queue_timeout = 5.0
+    acquired = threading.Event()
+
+    def waiter():
+        scheduler.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    while scheduler.stats()["waiting"] == 0:
+        time.sleep(0.001)
+    scheduler.release()
+    thread.join(timeout=5)
+    assert acquired.is_set()
+    assert scheduler.stats()["active"] == 1
+
+
+@pytest.mark.sandbox_isolation
+def test_execute_python_maps_busy_to_error_model(monkeypatch):
+    """A saturated scheduler surfaces as the SANDBOX_BUSY error model."""
+    scheduler = SandboxScheduler(max_concurrency=0, max_queue=0)
+    monkeypatch.setattr(sandbox, "_scheduler", scheduler)
+    with pytest.raises(SandboxBusy) as exc_info:
+        sandbox.execute_python("print(1)")
+    err = error_for(exc_info.value)
+    assert err.code == "SANDBOX_BUSY"
+    assert err.retry_after == scheduler.queue_timeout
+
+
+class FakeOneShot:
+    """A one-shot container whose attach stream yields ``chunks``, or blocks until killed."""
+
+    def __init__(self, chunks=None, exit_code=0):
+        self.chunks = chunks
+        self.exit_code = exit_code
+        self.killed = threading.Event()
+        self.removed = False
+
+    def attach(self, **kwargs):
+        assert kwargs["demux"] and kwargs["stream"] and kwargs["logs"]
+        if self.chunks is None:
+            self.killed.wait(5)
+            return iter([])
+        return iter(self.chunks)
+
+    def wait(self, timeout=None):
+        return {"StatusCode": 137 if self.killed.is_set() else self.exit_code}
+
+    def kill(self):
+        self.killed.set()
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeOneShotClient:
+    def __init__(self, container):
+        self.container = container
+        self.containers = self
+
+    def run(self, **kwargs):
+        return self.container
+
+
+@pytest.mark.sandbox_isolation
+def test_output_limiter_caps_streams_and_keeps_utf8_intact():
+    limiter = sandbox.OutputLimiter(max_bytes=6)
+    euro = "€".encode()                         # 3 bytes, split across two chunks
+    assert limiter.feed("stdout", b"ab" + euro[:1]) == "ab"
+    assert limiter.feed("stdout", euro[1:]) == "€"
+    assert limiter.feed("stdout", b"xyz") == "x" + sandbox.TRUNCATION_MARKER.format(stream="stdout", limit=6)
+    assert limiter.feed("stdout", b"more") == ""
+    assert limiter.feed("stderr", b"err") == "err"
+    assert list(limiter.exit(0)) == [("exit", {"exit_code": 0, "truncated": {"stdout": 6}})]
+
+
+@pytest.mark.sandbox_isolation
+def test_stream_python_yields_demuxed_output_and_removes_container(monkeypatch):
+    container = FakeOneShot([(b"out1\n", None), (None, b"warn\n"), (b"x" * 100, None)], exit_code=3)
+    monkeypatch.setattr(sandbox, "get_client", lambda: FakeOneShotClient(container))
+    events = list(sandbox.stream_python("print(1)", max_output=10))
+    assert events[:2] == [("stdout", "out1\n"), ("stderr", "warn\n")]
+    assert events[2].data.startswith("xxxxx\n[guardflow: stdout truncated at 10 bytes]")
+    assert events[-1] == ("exit", {"exit_code": 3, "truncated": {"stdout": 95}})
+    assert container.removed
+
+    monkeypatch.setattr(sandbox, "_max_output", 4)
+    container = FakeOneShot([(b"hello", b"ok")])
+    monkeypatch.setattr(sandbox, "get_client", lambda: FakeOneShotClient(container))
+    result = sandbox.run_python("print(1)")
+    assert result["stdout"].startswith("hell\n[guardflow: stdout truncated")
+    assert (result["stderr"], result["exit_code"], result["truncated"]) == ("ok", 0, {"stdout": 1})
+
+
+@pytest.mark.sandbox_isolation
+def test_stream_python_timeout_kills_container(monkeypatch):
+    container = FakeOneShot(chunks=None)
+    monkeypatch.setattr(sandbox, "get_client", lambda: FakeOneShotClient(container))
+    with pytest.raises(SandboxError, match="timed out"):
+        list(sandbox.stream_python("while True: pass", timeout=0.05))
+    assert container.killed.is_set() and container.removed
+
+
+@pytest.mark.sandbox_isolation
+def test_pool_stream_delivers_chunks_as_they_arrive(monkeypatch):
+    """Pool output is streamed chunk by chunk; closing the stream early retires the container."""
+    monkeypatch.setattr(sandbox, "_max_output", 8)
+    chunks = [(b"1\n", None), (b"2\n", None), (b"3456789\n", None)]
+    client = FakeClient(results=[(0, (chunks, None)), (0, (chunks, None))])
+    pool = _pool(client)
+    events = list(pool.stream("..."))
+    assert [e.kind for e in events] == ["stdout", "stdout", "stdout", "exit"]
+    assert events[-1].data == {"exit_code": 0, "truncated": {"stdout": 4}}
+    assert pool.stats()["idle"] == 1
+
+    stream = pool.stream("...")
+    assert next(stream) == ("stdout", "1\n")
+    stream.close()
+    assert pool.stats()["recycled"] == 1
+    assert pool.stats()["busy"] == 0
@@ -54,3 +54,27 @@ def test_wrong_type():
     result = runner.invoke(cli, ["run", "--input", json.dumps(payload)])
     assert result.exit_code != 0
     assert "SCHEMA_REJECTED" in result.stderr
+
+
+@pytest.mark.schema_validation
+def test_validate_accepts_raw_json_bytes():
+    """Raw JSON bytes and text validate in one pass to the same RunRequest as the dict."""
+    from pydantic import ValidationError
+
+    from guardflow.pipeline import validate
+
+    expected = validate(VALID_PAYLOAD)
+    assert validate(json.dumps(VALID_PAYLOAD).encode()) == expected
+    assert validate(json.dumps(VALID_PAYLOAD)) == expected
+    with pytest.raises(ValidationError) as exc_info:
+        validate(b"{not json")
+    assert exc_info.value.errors()[0]["type"] == "json_invalid"
+    with pytest.raises(ValidationError):
+        validate(json.dumps({**VALID_PAYLOAD, "unexpected": "field"}).encode())
+
+
+@pytest.mark.schema_validation
+def test_invalid_json_input_is_schema_rejected():
+    result = runner.invoke(cli, ["run", "--input", "{not valid json}"])
+    assert result.exit_code != 0
+    assert "SCHEMA_REJECTED" in result.stderr
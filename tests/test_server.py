@@ -0,0 +1,440 @@
+"""HTTP server tests for guardflow, driven in-process over ASGI."""
+
+import asyncio
+import json
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from guardflow import metrics, ratelimit, sandbox, server, warmup
+from guardflow.jobs import JobQueue
+from guardflow.snapshot import PolicyStore
+
+MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = r.sub == p.sub && r.act == p.act
+"""
+
+POLICY_CSV = """\
+p, viewer, echo
+p, viewer, file_read
+p, operator, echo
+p, operator, http_request
+"""
+
+ALLOWLIST = json.dumps({"allowed_tools": ["echo", "file_read", "http_request"]})
+
+VIEWER_ECHO = {"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "echo", "args": {"text": "hi"}}}
+
+
+def _call(
+    method: str,
+    path: str,
+    body: bytes | list[bytes] = b"",
+    headers: dict | None = None,
+    disconnect_after: float = 3600,
+) -> tuple[int, dict, bytes]:
+    """Send one request straight into the ASGI app and collect the response.
+
+    ``body`` may be a list of chunks, each delivered as its own ``http.request`` message.
+    The client disconnects ``disconnect_after`` seconds after the body is sent.
+    """
+    chunks_in = [body] if isinstance(body, bytes) else list(body)
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+        + [(b"content-length", str(sum(map(len, chunks_in))).encode())],
+        "client": ("test", 0),
+        "server": ("test", 80),
+    }
+    status_code, resp_headers, chunks = 0, {}, []
+
+    async def receive():
+        if chunks_in:
+            chunk = chunks_in.pop(0)
+            return {"type": "http.request", "body": chunk, "more_body": bool(chunks_in)}
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status_code, resp_headers
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            resp_headers = {k.decode(): v.decode() for k, v in message.get("headers", [])}
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    asyncio.run(server.app(scope, receive, send))
+    return status_code, resp_headers, b"".join(chunks)
+
+
+def _post_json(path: str, payload) -> tuple[int, dict]:
+    code, _, body = _call("POST", path, json.dumps(payload).encode(), {"content-type": "application/json"})
+    return code, json.loads(body)
+
+
+@pytest.fixture
+def store(tmp_path: Path, monkeypatch):
+    allowlist = tmp_path / "policy.json"
+    model_file = tmp_path / "model.conf"
+    policy_file = tmp_path / "rbac_policy.csv"
+    allowlist.write_text(ALLOWLIST)
+    model_file.write_text(MODEL_CONF)
+    policy_file.write_text(POLICY_CSV)
+    store = PolicyStore(allowlist, model_file, policy_file)
+    monkeypatch.setattr(server, "_store", store)
+    return store
+
+
+@pytest.mark.http_server
+def test_authorize_allowed(store):
+    code, body = _post_json("/authorize", VIEWER_ECHO)
+    assert code == 200
+    assert body["ok"] is True
+    assert body["data"]["tool_call"]["tool"] == "echo"
+
+
+@pytest.mark.http_server
+def test_authorize_rbac_denied(store):
+    payload = {"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "http_request", "args": {}}}
+    code, body = _post_json("/authorize", payload)
+    assert code == 403
+    assert body["detail"]["code"] == "RBAC_DENIED"
+
+
+@pytest.mark.http_server
+def test_authorize_argument_denied(store, tmp_path):
+    rules = [{"tool": "http_request", "url": {"deny": ["169.254.0.0/16"]}}]
+    (tmp_path / "policy.json").write_text(json.dumps({"allowed_tools": ["http_request"], "argument_rules": rules}))
+    store.reload()
+    call = {"tool": "http_request", "args": {"url": "http://169.254.169.254/latest"}}
+    code, body = _post_json("/authorize", {"actor": {"id": "u1", "role": "operator"}, "tool_call": call})
+    assert code == 403
+    assert body["detail"]["code"] == "ARGUMENT_DENIED"
+    assert body["detail"]["arg"] == "url"
+
+
+@pytest.mark.http_server
+def test_authorize_rate_limited_is_429_with_retry_after(store, tmp_path, monkeypatch):
+    monkeypatch.setattr(ratelimit, "_limiter", ratelimit.RateLimiter(clock=lambda: 1000.0))
+    limits = [{"role": "viewer", "requests": 2, "per": 30}]
+    (tmp_path / "policy.json").write_text(json.dumps({"allowed_tools": ["echo"], "rate_limits": limits}))
+    store.reload()
+    assert [_post_json("/authorize", VIEWER_ECHO)[0] for _ in range(2)] == [200, 200]
+    code, headers, body = _call("POST", "/authorize", json.dumps(VIEWER_ECHO).encode(), {"content-type": "application/json"})
+    assert code == 429
+    assert headers["retry-after"] == "15"
+    assert json.loads(body)["detail"]["code"] == "RATE_LIMITED"
+
+    _, _, results = _batch(json.dumps([VIEWER_ECHO]).encode(), "application/json")
+    assert results[0]["status"] == 429 and results[0]["error"]["code"] == "RATE_LIMITED"
+
+
+@pytest.mark.http_server
+def test_authorize_validates_raw_body(store):
+    """The body is validated as sent: malformed JSON and top-level extras are SCHEMA_REJECTED."""
+    code, _, raw = _call("POST", "/authorize", b"{not json", {"content-type": "application/json"})
+    assert code == 422
+    body = json.loads(raw)
+    assert body["detail"]["code"] == "SCHEMA_REJECTED"
+    assert body["detail"]["errors"][0]["type"] == "json_invalid"
+
+    code, body = _post_json("/authorize", {**VIEWER_ECHO, "inject": "x"})
+    assert code == 422
+    assert body["detail"]["errors"][0]["type"] == "extra_forbidden"
+
+
+@pytest.mark.http_server
+def test_policy_status_reports_version_and_reloads(store, tmp_path):
+    code, _, raw = _call("GET", "/policy")
+    status = json.loads(raw)
+    assert code == 200
+    assert status["version"] == store.version
+    assert status["reloads"] == 0
+
+    (tmp_path / "policy.json").write_text(json.dumps({"allowed_tools": ["echo"]}))
+    assert store.reload() is True
+    code, body = _post_json("/authorize", {**VIEWER_ECHO, "tool_call": {"tool": "file_read", "args": {}}})
+    assert code == 403
+    assert body["detail"]["code"] == "UNAUTHORIZED_TOOL"
+    assert json.loads(_call("GET", "/policy")[2])["reloads"] == 1
+
+
+def _batch(body: bytes | list[bytes], content_type: str) -> tuple[int, dict, list[dict]]:
+    code, headers, raw = _call("POST", "/authorize/batch", body, {"content-type": content_type})
+    return code, headers, [json.loads(line) for line in raw.decode().splitlines()]
+
+
+BATCH = [
+    VIEWER_ECHO,
+    {"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "http_request", "args": {}}},
+    {"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "rm_rf", "args": {}}},
+    {"actor": {"id": "u1"}, "tool_call": {"tool": "echo", "args": {}}},
+]
+
+
+@pytest.mark.http_server
+def test_batch_json_array(store):
+    """A JSON array body yields one NDJSON result per item, in order, with the usual codes."""
+    code, headers, results = _batch(json.dumps(BATCH).encode(), "application/json")
+    assert code == 200
+    assert headers["x-policy-version"] == store.version
+    assert [r["index"] for r in results] == [0, 1, 2, 3]
+    assert results[0]["ok"] is True
+    assert [r["error"]["code"] for r in results[1:]] == ["RBAC_DENIED", "UNAUTHORIZED_TOOL", "SCHEMA_REJECTED"]
+
+
+@pytest.mark.http_server
+def test_batch_ndjson_with_bad_line(store):
+    """A malformed NDJSON line is rejected in place without affecting its neighbours."""
+    body = (json.dumps(VIEWER_ECHO) + "\n{not json\n" + json.dumps(VIEWER_ECHO) + "\n").encode()
+    code, _, results = _batch(body, "application/x-ndjson")
+    assert code == 200
+    assert [r["ok"] for r in results] == [True, False, True]
+    assert results[1]["error"]["code"] == "SCHEMA_REJECTED"
+
+
+@pytest.mark.http_server
+def test_batch_invalid_utf8_is_rejected_in_place(store):
+    """Undecodable bytes end the batch with a SCHEMA_REJECTED item, as /authorize answers 422."""
+    code, _, results = _batch([json.dumps(VIEWER_ECHO).encode() + b"\n", b"\xff\xfe\n"], "application/x-ndjson")
+    assert code == 200
+    assert [r["ok"] for r in results] == [True, False]
+    assert results[1]["status"] == 422 and results[1]["error"]["code"] == "SCHEMA_REJECTED"
+    assert _call("POST", "/authorize", b"\xff\xfe", {"content-type": "application/json"})[0] == 422
+
+
+@pytest.mark.http_server
+def test_batch_body_split_across_messages(store):
+    """Items split across request body messages are authorized once each, in order."""
+    data = json.dumps(BATCH * 25).encode()
+    pieces = [data[i:i + 13] for i in range(0, len(data), 13)]
+    code, _, results = _batch(pieces, "application/json")
+    assert code == 200
+    assert [r["index"] for r in results] == list(range(100))
+    assert [r["ok"] for r in results[:4]] == [True, False, False, False]
+
+
+@pytest.fixture
+def exec_store(store, tmp_path: Path):
+    """The ``store`` policy plus python_exec for the viewer role."""
+    (tmp_path / "policy.json").write_text(json.dumps({"allowed_tools": ["echo", "python_exec"]}))
+    (tmp_path / "rbac_policy.csv").write_text(POLICY_CSV + "p, viewer, python_exec\n")
+    store.reload()
+    return store
+
+
+VIEWER_EXEC = {"actor": {"id": "u1", "role": "viewer"}, "tool_call": {"tool": "python_exec", "args": {"code": "print(1)"}}}
+
+
+@pytest.mark.http_server
+def test_run_executes_through_async_pipeline(exec_store, monkeypatch):
+    """POST /run returns the tool result, with python_exec offloaded to the sandbox."""
+    monkeypatch.setattr(sandbox, "run_python", lambda code, timeout: {"stdout": "1\n", "stderr": "", "exit_code": 0})
+    code, body = _post_json("/run", VIEWER_EXEC)
+    assert code == 200
+    assert body["step"] == "execute"
+    assert body["data"]["sandbox"]["stdout"] == "1\n"
+    code, body = _post_json("/run", {**VIEWER_EXEC, "tool_call": {"tool": "file_read", "args": {}}})
+    assert code == 403
+    assert body["detail"]["code"] == "UNAUTHORIZED_TOOL"
+
+
+@pytest.mark.http_server
+def test_run_sandbox_busy_is_503(exec_store, monkeypatch):
+    """A saturated sandbox answers SANDBOX_BUSY with a Retry-After header."""
+    monkeypatch.setattr(sandbox, "_scheduler", sandbox.SandboxScheduler(max_concurrency=0, max_queue=0))
+    code, headers, raw = _call("POST", "/run", json.dumps(VIEWER_EXEC).encode(), {"content-type": "application/json"})
+    assert code == 503
+    assert headers["retry-after"] == "5"
+    assert json.loads(raw)["detail"]["code"] == "SANDBOX_BUSY"
+
+
+def _sse_events(raw: bytes) -> list[tuple[str, object]]:
+    events = []
+    for block in raw.decode().split("\n\n"):
+        if block:
+            fields = dict(line.split(": ", 1) for line in block.splitlines())
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+@pytest.mark.http_server
+def test_run_stream_sends_output_as_server_sent_events(exec_store, monkeypatch):
+    """python_exec output is streamed as stdout/stderr events, then exit; other tools send one result."""
+
+    def fake_stream(code, timeout):
+        yield sandbox.SandboxEvent("stdout", "1\n")
+        yield sandbox.SandboxEvent("stderr", "warn\n")
+        yield sandbox.SandboxEvent("exit", {"exit_code": 0, "truncated": {}})
+
+    monkeypatch.setattr(sandbox, "stream_python", fake_stream)
+    code, headers, raw = _call("POST", "/run/stream", json.dumps(VIEWER_EXEC).encode(), {"content-type": "application/json"})
+    assert code == 200
+    assert headers["content-type"].startswith("text/event-stream")
+    assert _sse_events(raw) == [("stdout", "1\n"), ("stderr", "warn\n"), ("exit", {"exit_code": 0, "truncated": {}})]
+
+    code, _, raw = _call("POST", "/run/stream", json.dumps(VIEWER_ECHO).encode(), {"content-type": "application/json"})
+    [(event, data)] = _sse_events(raw)
+    assert (event, data["step"], data["data"]["tool_call"]["tool"]) == ("result", "execute", "echo")
+
+
+@pytest.mark.http_server
+def test_run_stream_errors_before_first_event_keep_status_codes(exec_store, monkeypatch):
+    """Rejections and a saturated sandbox are answered with status codes, not an event stream."""
+    monkeypatch.setattr(sandbox, "_scheduler", sandbox.SandboxScheduler(max_concurrency=0, max_queue=0))
+    code, headers, raw = _call("POST", "/run/stream", json.dumps(VIEWER_EXEC).encode(), {"content-type": "application/json"})
+    assert code == 503
+    assert json.loads(raw)["detail"]["code"] == "SANDBOX_BUSY"
+    code, body = _post_json("/run/stream", {**VIEWER_EXEC, "tool_call": {"tool": "file_read", "args": {}}})
+    assert (code, body["detail"]["code"]) == (403, "UNAUTHORIZED_TOOL")
+
+    def failing_stream(code, timeout):
+        yield sandbox.SandboxEvent("stdout", "partial")
+        raise sandbox.SandboxError("Code execution timed out after 10s")
+
+    monkeypatch.setattr(sandbox, "_scheduler", sandbox.SandboxScheduler())
+    monkeypatch.setattr(sandbox, "stream_python", failing_stream)
+    code, _, raw = _call("POST", "/run/stream", json.dumps(VIEWER_EXEC).encode(), {"content-type": "application/json"})
+    assert code == 200
+    assert _sse_events(raw) == [
+        ("stdout", "partial"),
+        ("error", {"code": "SANDBOX_ERROR", "detail": "Code execution timed out after 10s"}),
+    ]
+
+
+@pytest.mark.http_server
+def test_run_disconnect_cancels_queued_execution(exec_store, monkeypatch):
+    """A client that disconnects while queued for the sandbox leaves the queue; nothing runs."""
+    scheduler = sandbox.SandboxScheduler(max_concurrency=0, max_queue=4, queue_timeout=30)
+    monkeypatch.setattr(sandbox, "_scheduler", scheduler)
+    ran = threading.Event()
+    monkeypatch.setattr(sandbox, "run_python", lambda code, timeout: ran.set())
+    started = time.monotonic()
+    code, _, _ = _call(
+        "POST", "/run", json.dumps(VIEWER_EXEC).encode(), {"content-type": "application/json"}, disconnect_after=0.1
+    )
+    assert code == server.CLIENT_CLOSED_REQUEST
+    assert time.monotonic() - started < 5
+    deadline = time.monotonic() + 5
+    while scheduler.stats()["waiting"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert scheduler.stats()["waiting"] == 0
+    assert not ran.is_set()
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    queue = JobQueue(workers=2)
+    monkeypatch.setattr(server, "_jobs", queue)
+    yield queue
+    queue.stop()
+
+
+@pytest.mark.http_server
+def test_execute_returns_job_and_long_poll_gets_result(exec_store, jobs, monkeypatch):
+    """POST /execute answers 202 with a job id; GET /jobs/{id}?wait= returns the finished result."""
+    monkeypatch.setattr(sandbox, "run_python", lambda code, timeout: {"stdout": "1\n", "stderr": "", "exit_code": 0})
+    code, headers, raw = _call("POST", "/execute", json.dumps(VIEWER_EXEC).encode(), {"content-type": "application/json"})
+    assert code == 202
+    job_id = json.loads(raw)["job_id"]
+    assert headers["location"] == f"/jobs/{job_id}"
+    code, _, raw = _call("GET", f"/jobs/{job_id}?wait=5")
+    job = json.loads(raw)
+    assert code == 200
+    assert job["status"] == "succeeded"
+    assert job["result"]["data"]["sandbox"]["stdout"] == "1\n"
+
+
+@pytest.mark.http_server
+def test_execute_rejects_synchronously_and_unknown_job_is_404(exec_store, jobs):
+    code, body = _post_json("/execute", {**VIEWER_EXEC, "tool_call": {"tool": "file_read", "args": {}}})
+    assert code == 403
+    assert body["detail"]["code"] == "UNAUTHORIZED_TOOL"
+    assert jobs.stats()["submitted"] == 0
+    code, _, raw = _call("GET", "/jobs/nope")
+    assert code == 404
+    assert json.loads(raw)["detail"]["code"] == "JOB_NOT_FOUND"
+
+
+@pytest.mark.http_server
+def test_execute_and_stream_count_each_request_once_with_its_final_outcome(exec_store, jobs, monkeypatch):
+    def count(outcome: str) -> float:
+        return metrics.DECISIONS.value(outcome, "viewer", "python_exec")
+
+    def boom(code, timeout):
+        raise sandbox.SandboxError("no docker")
+        yield
+
+    def ok(code, timeout):
+        yield sandbox.SandboxEvent("exit", {"exit_code": 0, "truncated": {}})
+
+    before = {outcome: count(outcome) for outcome in ("ok", "SANDBOX_ERROR")}
+    monkeypatch.setattr(sandbox, "run_python", lambda code, timeout: next(boom(code, timeout)))
+    _, _, raw = _call("POST", "/execute", json.dumps(VIEWER_EXEC).encode(), {"content-type": "application/json"})
+    _call("GET", f"/jobs/{json.loads(raw)['job_id']}?wait=5")
+    monkeypatch.setattr(sandbox, "stream_python", boom)
+    assert _call("POST", "/run/stream", json.dumps(VIEWER_EXEC).encode(), {"content-type": "application/json"})[0] == 500
+    monkeypatch.setattr(sandbox, "stream_python", ok)
+    assert _call("POST", "/run/stream", json.dumps(VIEWER_EXEC).encode(), {"content-type": "application/json"})[0] == 200
+    assert count("SANDBOX_ERROR") - before["SANDBOX_ERROR"] == 2
+    assert count("ok") - before["ok"] == 1
+
+
+@pytest.mark.http_server
+def test_metrics_route_exposes_pipeline_metrics(exec_store, monkeypatch):
+    monkeypatch.setattr(sandbox, "run_python", lambda code, timeout: {"stdout": "", "stderr": "", "exit_code": 0})
+    _post_json("/run", VIEWER_EXEC)
+    code, headers, raw = _call("GET", "/metrics")
+    text = raw.decode()
+    assert code == 200
+    assert headers["content-type"].startswith("text/plain")
+    assert 'guardflow_decisions_total{outcome="ok",role="viewer",tool="python_exec"}' in text
+    assert 'guardflow_sandbox_seconds_count{mode="oneshot"}' in text
+    assert "guardflow_sandbox_queue_depth 0" in text
+
+
+@pytest.mark.http_server
+def test_ready_reflects_sandbox_warmup(monkeypatch):
+    """GET /ready is 503 until warmup succeeds and 200 after; /health stays a liveness probe."""
+
+    class Warmup:
+        def __init__(self):
+            self.report = {"ready": False, "state": "warming", "reasons": ["warmup warming"]}
+
+        def status(self):
+            return self.report
+
+    fake = Warmup()
+    monkeypatch.setattr(warmup, "_warmup", fake)
+    code, _, raw = _call("GET", "/ready")
+    assert code == 503
+    assert json.loads(raw)["state"] == "warming"
+    assert _call("GET", "/health")[0] == 200
+
+    fake.report = {"ready": True, "state": "ready", "reasons": []}
+    assert _call("GET", "/ready")[0] == 200
+
+    monkeypatch.setattr(warmup, "_warmup", None)
+    code, _, raw = _call("GET", "/ready")
+    assert (code, json.loads(raw)) == (200, {"ready": True, "state": "disabled"})
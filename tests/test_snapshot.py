@@ -0,0 +1,131 @@
+"""Policy snapshot and hot-reload tests for guardflow."""
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from guardflow.policy import policy_version
+from guardflow.snapshot import PolicyStore
+
+MODEL_CONF = """\
+[request_definition]
+r = sub, act
+
+[policy_definition]
+p = sub, act
+
+[policy_effect]
+e = some(where (p.eft == allow))
+
+[matchers]
+m = r.sub == p.sub && r.act == p.act
+"""
+
+POLICY_CSV = """\
+p, viewer, echo
+p, operator, echo
+p, operator, http_request
+"""
+
+
+def _write_policy_files(tmp_path: Path) -> tuple[Path, Path, Path]:
+    allowlist = tmp_path / "policy.json"
+    model_file = tmp_path / "model.conf"
+    policy_file = tmp_path / "rbac_policy.csv"
+    allowlist.write_text(json.dumps({"allowed_tools": ["echo"]}))
+    model_file.write_text(MODEL_CONF)
+    policy_file.write_text(POLICY_CSV)
+    return allowlist, model_file, policy_file
+
+
+def _touch_later(path: Path, content: str) -> None:
+    """Rewrite a file and push its mtime forward so the change is always visible."""
+    path.write_text(content)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.mark.policy_snapshot
+def test_snapshot_loaded_once(tmp_path):
+    """The store builds a versioned snapshot at construction time."""
+    store = PolicyStore(*_write_policy_files(tmp_path))
+    assert store.current.policy.is_allowed("echo")
+    assert store.current.rbac.is_allowed("viewer", "echo")
+    assert len(store.version) == 12
+    assert store.current.decisions is not None
+    assert store.reload_count == 0
+    assert store.check(now=0.0) is False
+
+
+@pytest.mark.policy_snapshot
+def test_reload_is_debounced(tmp_path):
+    """A file change is only picked up after it has been stable for the debounce window."""
+    allowlist, model_file, policy_file = _write_policy_files(tmp_path)
+    store = PolicyStore(allowlist, model_file, policy_file, debounce=0.5)
+    old = store.current
+    _touch_later(allowlist, json.dumps({"allowed_tools": ["echo", "http_request"]}))
+
+    assert store.check(now=10.0) is False   # change first seen
+    assert store.check(now=10.2) is False   # still inside the debounce window
+    assert store.current is old
+    assert store.check(now=10.6) is True
+    assert store.current.policy.is_allowed("http_request")
+    assert store.current.version != old.version
+    assert store.reload_count == 1
+
+
+@pytest.mark.policy_snapshot
+def test_invalid_reload_keeps_previous_snapshot(tmp_path):
+    """A broken policy file is reported and the last good snapshot stays active."""
+    allowlist, model_file, policy_file = _write_policy_files(tmp_path)
+    store = PolicyStore(allowlist, model_file, policy_file)
+    old = store.current
+    _touch_later(allowlist, "{not json")
+    assert store.reload() is False
+    assert store.current is old
+    assert store.last_error
+    assert store.reload_count == 0
+
+
+@pytest.mark.policy_snapshot
+def test_unchanged_content_does_not_bump_version(tmp_path):
+    """Touching a file without changing it does not count as a reload."""
+    allowlist, model_file, policy_file = _write_policy_files(tmp_path)
+    store = PolicyStore(allowlist, model_file, policy_file)
+    _touch_later(allowlist, allowlist.read_text())
+    assert store.reload() is False
+    assert store.reload_count == 0
+
+
+@pytest.mark.policy_snapshot
+def test_reload_clears_decision_cache(tmp_path):
+    """Swapping in a new version empties the shared decision cache."""
+    allowlist, model_file, policy_file = _write_policy_files(tmp_path)
+    store = PolicyStore(allowlist, model_file, policy_file)
+    store.current.rbac.is_allowed("viewer", "echo")
+    assert store.cache.stats()["size"] == 1
+    _touch_later(policy_file, POLICY_CSV + "p, viewer, http_request\n")
+    assert store.reload() is True
+    assert store.cache.stats()["size"] == 0
+    assert store.current.rbac.cache is store.cache
+
+
+@pytest.mark.policy_snapshot
+def test_uncompilable_rules_fall_back_to_casbin(tmp_path):
+    """A CSV row with extra fields still loads; the snapshot just skips the compiled table."""
+    allowlist, model_file, policy_file = _write_policy_files(tmp_path)
+    policy_file.write_text(POLICY_CSV + "p, viewer, echo, extra\n")
+    store = PolicyStore(allowlist, model_file, policy_file)
+    assert store.current.decisions is None
+    assert store.current.rbac.is_allowed("viewer", "echo")
+
+
+@pytest.mark.policy_snapshot
+def test_version_labels_parsed_content(tmp_path):
+    """The snapshot and its RBAC decisions share one version, hashed from the bytes that were parsed."""
+    paths = _write_policy_files(tmp_path)
+    store = PolicyStore(*paths)
+    assert store.version == policy_version(*(p.read_bytes() for p in paths))
+    assert store.current.rbac.version == store.version
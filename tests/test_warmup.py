@@ -0,0 +1,198 @@
+"""Sandbox warmup and readiness tests for guardflow (fake Docker, no daemon needed)."""
+
+import docker
+import pytest
+
+from guardflow import sandbox
+from guardflow.sandbox_pool import ContainerPool
+from guardflow.warmup import FAILED, PENDING, READY, SMOKE_CODE, SandboxWarmup
+
+
+class FakeImage:
+    def __init__(self, digests=()):
+        self.id = "sha256:image"
+        self.attrs = {"RepoDigests": [f"python@{d}" for d in digests]}
+
+
+class FakeImages:
+    def __init__(self, present: bool, digests=()):
+        self.present = present
+        self.digests = digests
+        self.pulls = []
+
+    def get(self, name):
+        if not self.present:
+            raise docker.errors.ImageNotFound(name)
+        return FakeImage(self.digests)
+
+    def pull(self, repository, tag=None):
+        self.pulls.append((repository, tag))
+        self.present = True
+        return FakeImage(self.digests)
+
+
+class FakeDocker:
+    def __init__(self, present: bool = True, digests=()):
+        self.images = FakeImages(present, digests)
+        self.reachable = True
+        self.pings = 0
+
+    def ping(self):
+        self.pings += 1
+        if not self.reachable:
+            raise ConnectionError("socket closed")
+        return True
+
+
+class FakePool:
+    image = "python:3.12-slim"
+
+    def __init__(self, min_size: int = 2):
+        self.min_size = min_size
+        self.idle = 0
+        self.runs = []
+
+    def refill(self):
+        self.idle = self.min_size
+
+    def run(self, code, timeout):
+        self.runs.append(code)
+        return {"stdout": "ok\n", "stderr": "", "exit_code": 0}
+
+    def stats(self):
+        return {"idle": self.idle, "busy": 0, "min_size": self.min_size, "max_size": 4}
+
+
+@pytest.fixture
+def oneshot(monkeypatch):
+    """Count one-shot smoke runs; no pool installed unless a test sets one."""
+    runs = []
+
+    def fake_run(code, timeout):
+        runs.append(code)
+        return {"stdout": "ok\n", "stderr": "", "exit_code": 0}
+
+    monkeypatch.setattr(sandbox, "run_python", fake_run)
+    monkeypatch.setattr(sandbox, "_pool", None)
+    monkeypatch.setattr(sandbox, "_scheduler", sandbox.SandboxScheduler(max_concurrency=4))
+    return runs
+
+
+def _warmup(client, **kwargs) -> SandboxWarmup:
+    return SandboxWarmup(client_factory=lambda: client, **kwargs)
+
+
+@pytest.mark.warmup
+def test_warmup_pulls_missing_image_and_records_baselines(oneshot, monkeypatch):
+    """A missing image is pulled; the one-shot and warm smoke runs set the baselines and fill the pool."""
+    client = FakeDocker(present=False)
+    pool = FakePool()
+    monkeypatch.setattr(sandbox, "_pool", pool)
+    warmup = _warmup(client)
+    assert warmup.status()["state"] == PENDING and not warmup.status()["ready"]
+
+    assert warmup.run_once()
+    assert client.images.pulls == [("python", "3.12-slim")]
+    assert oneshot == [SMOKE_CODE] and pool.runs == [SMOKE_CODE]
+    report = warmup.status()
+    assert report["ready"] and report["state"] == READY and report["reasons"] == []
+    assert report["image"] == {"name": "python:3.12-slim", "id": "sha256:image", "pulled": True, "digest": None}
+    assert report["cold_start_seconds"] >= 0 and report["warm_start_seconds"] >= 0
+    assert report["capacity"]["pool"]["idle"] == 2
+    assert report["capacity"]["scheduler"]["free"] == 4
+
+
+@pytest.mark.warmup
+def test_unreachable_docker_fails_and_retries_until_ready(oneshot):
+    client = FakeDocker()
+    client.reachable = False
+    warmup = _warmup(client)
+    assert not warmup.run_once()
+    report = warmup.status()
+    assert report["state"] == FAILED
+    assert report["docker"] == {"reachable": False}
+    assert "Docker unreachable" in report["reasons"]
+    assert oneshot == []
+
+    client.reachable = True
+    assert warmup.run_once()
+    assert warmup.status()["ready"] and warmup.attempts == 2
+
+
+@pytest.mark.warmup
+def test_missing_image_without_pull_and_digest_mismatch_fail(oneshot):
+    warmup = _warmup(FakeDocker(present=False), pull=False)
+    assert not warmup.run_once()
+    assert "pulling is disabled" in warmup.error
+
+    warmup = _warmup(FakeDocker(digests=["sha256:other"]), digest="sha256:pinned")
+    assert not warmup.run_once()
+    assert "does not match digest" in warmup.error
+    assert _warmup(FakeDocker(digests=["sha256:pinned"]), digest="sha256:pinned").run_once()
+
+
+@pytest.mark.warmup
+def test_failed_smoke_run_is_not_ready(monkeypatch, oneshot):
+    monkeypatch.setattr(sandbox, "run_python", lambda code, timeout: {"stdout": "", "stderr": "boom", "exit_code": 1})
+    warmup = _warmup(FakeDocker())
+    assert not warmup.run_once()
+    assert "smoke test failed (exit 1): boom" in warmup.error
+    assert _warmup(FakeDocker(), smoke_test=False).run_once()
+
+
+@pytest.mark.warmup
+def test_ready_replica_drops_out_when_docker_or_pool_goes_away(oneshot, monkeypatch):
+    """After warmup, status() re-pings Docker and checks that warm containers still exist."""
+    client = FakeDocker()
+    warmup = _warmup(client, recheck_interval=0)
+    assert warmup.run_once()
+    client.reachable = False
+    report = warmup.status()
+    assert not report["ready"] and report["reasons"] == ["Docker unreachable"]
+
+    client.reachable = True
+    empty = FakePool()
+    monkeypatch.setattr(sandbox, "_pool", empty)
+    assert warmup.status()["reasons"] == ["no warm containers"]
+
+
+@pytest.mark.warmup
+def test_status_reuses_recent_ping(oneshot):
+    client = FakeDocker()
+    warmup = _warmup(client, recheck_interval=60)
+    assert warmup.run_once()
+    pings = client.pings
+    for _ in range(5):
+        warmup.status()
+    assert client.pings == pings
+
+
+@pytest.mark.warmup
+def test_real_pool_refill_counts_as_warm_capacity(oneshot, monkeypatch):
+    """The warmup fills a ``ContainerPool`` to ``min_size`` before reporting ready."""
+
+    class Container:
+        id = "c1"
+
+        def remove(self, force=False):
+            pass
+
+    class Api:
+        def exec_create(self, container_id, cmd, user=""):
+            return {"Id": "e1"}
+
+        def exec_start(self, exec_id, stream=False, demux=False):
+            return iter([(b"ok\n", None)])
+
+        def exec_inspect(self, exec_id):
+            return {"ExitCode": 0}
+
+    client = FakeDocker()
+    client.containers = client
+    client.api = Api()
+    client.run = lambda **kwargs: Container()
+    pool = ContainerPool(min_size=2, max_size=2, client_factory=lambda: client)
+    monkeypatch.setattr(sandbox, "_pool", pool)
+    warmup = _warmup(client)
+    assert warmup.run_once()
+    assert warmup.status()["capacity"]["pool"]["idle"] == 2